@@ -46,4 +46,19 @@ GO
 CREATE TABLE bronze.currency_rates (
     trade_date        DATE,
     rate              FLOAT,
+);
+
+GO
+
+IF OBJECT_ID('bronze.quarantine', 'U') IS NOT NULL
+    DROP TABLE bronze.quarantine;
+GO
+
+-- Rows rejected by validation.py, kept instead of being loaded
+CREATE TABLE bronze.quarantine (
+    dataset           NVARCHAR(50),
+    row_date          DATE,
+    reason            NVARCHAR(200),
+    payload           NVARCHAR(4000),
+    quarantined_at    DATETIME
 );
\ No newline at end of file
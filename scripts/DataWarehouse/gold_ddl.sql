@@ -0,0 +1,26 @@
+/*
+===============================================================================
+DDL Script: Create Gold Tables
+===============================================================================
+Script Purpose:
+    This script creates tables in the 'gold' schema, dropping existing tables 
+    if they already exist.
+	  gold.fuel_features holds one row per Gulf sales date, joined as-of with the
+	  latest Brent price and GEL/USD rate on or before that date. It is kept up to
+	  date incrementally by scripts/gold_features.py.
+===============================================================================
+*/
+
+IF OBJECT_ID('gold.fuel_features', 'U') IS NOT NULL
+    DROP TABLE gold.fuel_features;
+GO
+
+CREATE TABLE gold.fuel_features (
+    feature_date      DATE NOT NULL PRIMARY KEY,
+    super             FLOAT,
+    premium           FLOAT,
+    g_force_regular   FLOAT,
+    regular           FLOAT,
+    oil_price         FLOAT,
+    currency_rate     FLOAT
+);
@@ -1,11 +1,9 @@
+-- Reads the materialized join kept up to date by scripts/gold_features.py.
+-- Brent and currency values are as-of: the latest value on or before each date.
 SELECT
-g.sales_date AS [Date],
-g.premium AS Fuel_price,
-bo.price AS Oil_price,
-cr.rate AS Currency_rate
-FROM bronze.gulf g
-LEFT JOIN bronze.brent_oil bo
-ON bo.trade_date = g.sales_date
-LEFT JOIN bronze.currency_rates cr
-ON cr.trade_date = g.sales_date
-WHERE bo.price IS NOT NULL
\ No newline at end of file
+f.feature_date AS [Date],
+f.premium AS Fuel_price,
+f.oil_price AS Oil_price,
+f.currency_rate AS Currency_rate
+FROM gold.fuel_features f
+ORDER BY f.feature_date
\ No newline at end of file
@@ -1,100 +1,171 @@
 # Loading the data
 
-import pandas as pd
-import pyodbc
-
-conn = pyodbc.connect(
-    'Driver={SQL Server};'
-    'Server=GPAGHAVA\\GPAGAVA;'
-    'Database=OilDataWarehouse;'
-    'Trusted_Connection=yes;'
-)
-
-query = """
-SELECT
-    g.sales_date AS [Date],
-    g.premium AS Fuel_price,
-    bo.price AS Oil_price,
-    cr.rate AS Currency_rate
-FROM bronze.gulf g
-LEFT JOIN bronze.brent_oil bo
-    ON bo.trade_date = g.sales_date
-LEFT JOIN bronze.currency_rates cr
-    ON cr.trade_date = g.sales_date
-WHERE bo.price IS NOT NULL
-"""
-
-df = pd.read_sql(query, conn)
-
-df.head()
-
-
-# Basic data quality checks
-
-print(df.describe())
-print(df.isna().sum())
-
-# Correlation check
-"""
-Correlation 0.7–1.0 → strong relationship
-
-Correlation 0.3–0.7 → medium
-
-Correlation <0.3 → weak
-"""
-df.drop('Date', axis = 1).corr()
-
-# Regression model
-
-import statsmodels.api as sm
-
-X = df[['Oil_price', 'Currency_rate']]
-X = sm.add_constant(X)
-y = df['Fuel_price']
-
-model = sm.OLS(y, X).fit()
-print(model.summary())
-
-# Evaluate model with RMSE
-
-from sklearn.metrics import mean_squared_error
+import argparse
 import numpy as np
+import pandas as pd
+import db
+from gold_features import refresh_gold_features, read_features
 
-pred = model.predict(X)
-rmse = np.sqrt(mean_squared_error(y, pred))
-rmse
-
-# Predict future fuel prices
-"""
-Case scenario: Brent oil price increases to 90 and GEL to USD currency rate increases to 2.75
-"""
-model.params.index
-new_data = pd.DataFrame({
-    'const': [1],
-    'Oil_price': [90],
-    'Currency_rate': [2.75]
-})
-new_data = sm.add_constant(new_data)
+# Set to e.g. 50_000 (or pass --chunk-size) to only run the chunked statistics, never holding the whole table
+CHUNK_SIZE = None
 
-predicted_price = model.predict(new_data)
-predicted_price
 
-# Visualizations
+def chunked_statistics(conn, chunk_size):
+    # Summary, correlations and OLS chunk by chunk with float32 chunks
+    # (chunked_analytics.py): memory stays bounded by chunk_size, not the history
+    from chunked_analytics import analyze, read_chunks
 
-import matplotlib.pyplot as plt
+    streamed = analyze(read_chunks(conn, chunksize=chunk_size), y='premium', x=['oil_price', 'currency_rate'])
+    print(streamed['stats'])
+    print(streamed['corr'])
+    print(streamed['ols']['params'], f"RMSE: {streamed['ols']['rmse']:.4f}")
+    return streamed
 
-# Fuel vs Oil
 
-plt.scatter(df['Oil_price'], df['Fuel_price'])
-plt.plot(df['Oil_price'], pred, linewidth=2)
-plt.xlabel('Oil Price')
-plt.ylabel('Fuel Price')
-plt.show()
+def full_analysis(conn):
+    # Everything below needs the whole table in memory.
+    # gold.fuel_features is read once; df is the premium model's columns of it
+    features = read_features(conn)
+    df = features[['feature_date', 'premium', 'oil_price', 'currency_rate']].rename(columns={
+        'feature_date': 'Date',
+        'premium': 'Fuel_price',
+        'oil_price': 'Oil_price',
+        'currency_rate': 'Currency_rate',
+    })
 
-# Fuel vs Currency rates
+    print(df.head())
+
+
+    # Basic data quality checks
+
+    print(df.describe())
+    print(df.isna().sum())
 
-plt.scatter(df['Currency_rate'], df['Fuel_price'])
-plt.plot(df['Currency_rate'], pred, linewidth=2)
-plt.xlabel('Currency Rate')
-plt.ylabel('Fuel Price')
-plt.show()
+    # Correlation check
+    """
+    Correlation 0.7–1.0 → strong relationship
+
+    Correlation 0.3–0.7 → medium
+
+    Correlation <0.3 → weak
+    """
+    print(df.drop('Date', axis = 1).corr())
+
+    # Correlation at every lag (how many business days until Brent / GEL moves reach the pump)
+    from lag_analysis import lag_table, peak_lags
+
+    lags = lag_table(features, max_lag=60, kind='returns')
+    print(peak_lags(lags))
+
+    # Regression model
+
+    import statsmodels.api as sm
+
+    X = df[['Oil_price', 'Currency_rate']]
+    X = sm.add_constant(X)
+    y = df['Fuel_price']
+
+    model = sm.OLS(y, X).fit()
+    print(model.summary())
+
+    # Evaluate model with RMSE
+
+    pred = model.predict(X)
+    rmse = np.sqrt(np.mean((y - pred) ** 2))
+    print(f"RMSE: {rmse:.4f}")
+
+    # Predict future fuel prices
+    """
+    Case scenario: Brent oil price increases to 90 and GEL to USD currency rate increases to 2.75
+    """
+    new_data = pd.DataFrame({
+        'const': [1],
+        'Oil_price': [90],
+        'Currency_rate': [2.75]
+    })
+    new_data = sm.add_constant(new_data)
+
+    predicted_price = model.predict(new_data)
+    print(predicted_price)
+
+    # Whole grids of scenarios, with 90% prediction bands
+    from forecasting import scenario_grid, predict_grid, simulate
+
+    scenarios = scenario_grid(Oil_price=np.linspace(60, 120, 13), Currency_rate=np.linspace(2.5, 3.0, 11))
+    grid = predict_grid(scenarios, model.params, model.cov_params(), np.sqrt(model.scale))
+    print(grid.pivot(index='Oil_price', columns='Currency_rate', values='mean'))
+
+    # Monte Carlo: 30 business days ahead from bootstrapped Brent / GEL paths
+    bands = simulate(df, model.params, model.cov_params(), np.sqrt(model.scale), horizon=30, n_paths=100_000)
+    print(bands)
+
+    # Every grade, with lagged Brent / currency terms
+    """
+    Pump prices react to Brent with a delay: fit each grade on several lag sets and
+    rank the models by out-of-sample RMSE on the last 20% of dates
+    """
+    from model_search import search
+
+    leaderboard = search(features)
+    print(leaderboard.drop(columns='coefficients').head(10))
+
+    # Time-varying pass-through
+    """
+    Same regression refitted on a trailing window of 250 trading days (about a year),
+    to see how the oil and currency coefficients move over time
+    """
+    from rolling_ols import rolling_ols
+
+    rolling = rolling_ols(df['Fuel_price'], df[['Oil_price', 'Currency_rate']], window=250)
+    rolling.index = df['Date']
+    print(rolling[['Oil_price', 'Currency_rate', 'r2']].dropna().resample('MS').last())
+
+    # Visualizations
+    """
+    Rendered headlessly to report/ (PNG files + index.html): every grade over time,
+    Brent, GEL/USD, every grade against Brent and against GEL/USD with the fitted
+    price, and the rolling coefficients. Long series are downsampled and the
+    scatter plots are drawn as density grids (see report_charts.py)
+    """
+    from report_charts import default_charts, render_report
+
+    # features and df are both gold.fuel_features in date order, so rolling lines up row by row
+    report = features.assign(oil_coefficient=rolling['Oil_price'].to_numpy(),
+                             currency_coefficient=rolling['Currency_rate'].to_numpy())
+    charts = default_charts(report.columns) + [{
+        'name': 'rolling_coefficients', 'kind': 'line', 'title': 'Rolling coefficients (250 trading days)',
+        'x': 'feature_date', 'y': ['oil_coefficient', 'currency_coefficient'], 'ylabel': 'Coefficient',
+    }]
+    render_report(report, out_dir='report', charts=charts)
+    return model
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Analyse gold.fuel_features: statistics, regression, forecasts, charts.")
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE,
+                        help="only compute the chunked statistics, reading this many rows at a time")
+    parser.add_argument('--no-refresh', action='store_true',
+                        help="use gold.fuel_features as it is (pipeline.py refreshes it in its gold stage)")
+    args = parser.parse_args(argv)
+
+    # SQL Server by default; FUEL_DB_BACKEND=sqlite / duckdb runs against a local copy (see db.py)
+    conn = db.connect()
+    try:
+        # The three-way join is materialized in gold.fuel_features (see gold_features.py);
+        # refreshing it only processes dates newer than its watermark
+        if not args.no_refresh:
+            refresh_gold_features(conn)
+
+        # Rows validation.py held back from bronze, by dataset and reason
+        print(db.read_sql(conn, "SELECT dataset, reason, COUNT(*) AS n_rows FROM bronze.quarantine GROUP BY dataset, reason"))
+
+        if args.chunk_size:
+            chunked_statistics(conn, args.chunk_size)
+        else:
+            full_analysis(conn)
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,364 @@
+"""
+- Offline benchmark suite for every pipeline stage, on synthetic inputs
+- Generators for Gulf price pages (HTML), NBG payloads (JSON), Brent
+  history (scraped strings and CSV) and the GEL/USD rate spreadsheet, at
+  any multiple of today's size (default 1x, 100x and 10,000x)
+- Stages: extract_page (served from localhost), the business-day gap-fill,
+  get_usd_candidate_list, normalize_dataframe, the Excel and CSV appends,
+  the bronze.gulf load into SQLite and DuckDB, and the OLS fit from analysis.py
+- Inputs are generated before the clock starts; each stage is timed over
+  --repeat runs (best and median kept)
+- The append stages time one row written to a file of the scaled size:
+  their rows/sec counts that row, and the file size is kept as file_rows
+- Sizes that cannot exist are capped and flagged in the report: Excel's
+  row limit, the gap-fill's date span (pandas' date range) and --max-rows;
+  elsewhere, dates beyond that range simply repeat
+- Results go to a JSON report (with run metadata); --compare prints the
+  speed ratio against an earlier report
+
+Run directly:
+    python benchmark_suite.py --scales 1 100 10000 --report bench.json
+    python benchmark_suite.py --stages gap_fill ols_fit --compare bench.json
+"""
+
+import argparse
+import contextlib
+import functools
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import tempfile
+import time
+from datetime import datetime
+import numpy as np
+import pandas as pd
+
+# --- CONFIG ---
+# Today's sizes (the "1x" scale) of each stage's input
+BASE_ROWS = {
+    "extract_page": 20,      # rows on one Gulf price page
+    "gap_fill": 164,         # Gulf price changes crawled so far
+    "usd_candidates": 43,    # currencies in one NBG payload
+    "normalize": 1067,       # rows of the Brent history
+    "excel_append": 1505,    # rows of the GEL/USD spreadsheet
+    "csv_append": 1067,      # rows of the Brent CSV
+    "sql_load": 1344,        # bronze.gulf rows after the weekday fill
+    "sql_load_duckdb": 1344, # the same load into DuckDB
+    "ols_fit": 1344,         # rows analysis.py fits on
+}
+DEFAULT_SCALES = (1, 100, 10_000)
+DEFAULT_MAX_ROWS = 2_000_000
+EXCEL_MAX_ROWS = 1_048_575   # one header row + data rows per sheet
+END_DATE = pd.Timestamp("2025-11-14")
+# Business days from END_DATE back to the earliest date pandas can represent
+MAX_DATED_ROWS = int(np.busday_count(np.datetime64("1678-01-01"), np.datetime64(END_DATE.date(), "D")))
+GAP_FILL_SPACING_DAYS = 9    # average days between Gulf price changes
+# Stages whose timed run writes a fixed number of rows into a scaled file;
+# rows/sec counts those, and the file size is reported as file_rows
+APPENDED_ROWS = {"excel_append": 1, "csv_append": 1}
+
+
+# --- Generators ---
+def _dates(rows, freq="B"):
+    """
+    rows dates ending at END_DATE (newest last), business or calendar days.
+    Past the representable range they wrap around, so dates repeat.
+    """
+    back = np.arange(rows)[::-1] % MAX_DATED_ROWS
+    end = np.datetime64(END_DATE.date(), "D")
+    days = np.busday_offset(end, -back, roll="backward") if freq == "B" else end - back
+    return pd.DatetimeIndex(days.astype("datetime64[ns]"))
+
+
+def gulf_page_html(rows, seed=0):
+    """One Gulf price page: a <tbody> of rows x (date, 4 prices), newest first."""
+    rng = np.random.default_rng(seed)
+    days = _dates(rows, "D")[::-1].strftime("%Y-%m-%d")
+    prices = rng.uniform(2.5, 3.5, size=(rows, 4)).round(2)
+    body = "".join(
+        f"<tr><td>{d}</td><td>{p[0]}</td><td>{p[1]}</td><td>{p[2]}</td><td>{p[3]}</td></tr>"
+        for d, p in zip(days, prices)
+    )
+    return ("<html><body><table><thead><tr><th>Date</th><th>Super</th><th>Premium</th>"
+            "<th>G-Force Regular</th><th>Regular</th></tr></thead>"
+            f"<tbody>{body}</tbody></table></body></html>").encode("utf-8")
+
+
+def gulf_price_changes(rows, seed=0):
+    """Crawled Gulf rows (Date + 4 grades) every few days, newest first, as crawl() returns them."""
+    rng = np.random.default_rng(seed)
+    days = pd.DatetimeIndex(END_DATE - pd.to_timedelta(
+        np.cumsum(rng.integers(1, 2 * GAP_FILL_SPACING_DAYS, rows)), unit="D"))
+    prices = rng.uniform(2.5, 3.5, size=(rows, 4)).round(2)
+    return pd.DataFrame({"Date": days, "Super": prices[:, 0], "Premium": prices[:, 1],
+                         "G-Force Regular": prices[:, 2], "Regular": prices[:, 3]})
+
+
+def nbg_payload(currencies, seed=0):
+    """NBG JSON with `currencies` entries: containers of 43 currencies, one per date."""
+    from nbg_backfill import mock_payload
+
+    rng = np.random.default_rng(seed)
+    codes = ["USD"] + [f"C{i:02d}" for i in range(BASE_ROWS["usd_candidates"] - 1)]
+    payload = []
+    n_days = -(-currencies // len(codes))
+    for day in _dates(n_days, "D"):
+        payload.extend(mock_payload(day, {c: float(rng.uniform(0.5, 5.0)) for c in codes}))
+    # trim the last container so the entry count is exact
+    extra = n_days * len(codes) - currencies
+    if extra:
+        payload[-1]["currencies"] = payload[-1]["currencies"][:len(codes) - extra]
+    return payload
+
+
+def brent_scraped_frame(rows, seed=0):
+    """Brent rows as scraped from investing.com: every column still a string."""
+    rng = np.random.default_rng(seed)
+    days = _dates(rows)
+    price = 60 + rng.normal(0, 1, rows).cumsum() % 60
+    return pd.DataFrame({
+        "Date": days.strftime("%b %d, %Y"),
+        "Price": [f"{p:,.2f}" for p in price],
+        "Open": [f"{p:,.2f}" for p in price - 0.3],
+        "High": [f"{p:,.2f}" for p in price + 0.8],
+        "Low": [f"{p:,.2f}" for p in price - 0.9],
+        "Vol.": [f"{v:.2f}K" for v in rng.uniform(100, 400, rows)],
+        "Change %": [f"{c:.2f}%" for c in rng.normal(0, 1.5, rows)],
+    })
+
+
+def write_brent_csv(path, rows, seed=0):
+    """The Brent CSV as brent_oil_scraper writes it (ISO dates, clean numbers)."""
+    df = brent_scraped_frame(rows, seed)
+    df["Date"] = _dates(rows).strftime("%Y-%m-%d")
+    for col in ["Price", "Open", "High", "Low"]:
+        df[col] = df[col].str.replace(",", "", regex=False)
+    df["Change %"] = df["Change %"].str.rstrip("%")
+    df.iloc[::-1].to_csv(path, index=False)
+
+
+def write_rates_excel(path, rows, seed=0):
+    """The GEL/USD spreadsheet: Date as MM/DD/YYYY text and rate, newest first."""
+    rng = np.random.default_rng(seed)
+    days = _dates(rows)[::-1]
+    rates = 2.7 + rng.normal(0, 0.002, rows).cumsum()
+    pd.DataFrame({"Date": days.strftime("%m/%d/%Y"), "rate": rates.round(4)}).to_excel(path, index=False)
+
+
+def gold_frame(rows, seed=0):
+    """gold.fuel_features-like rows for the regression."""
+    rng = np.random.default_rng(seed)
+    oil = 80 + rng.normal(0, 1, rows).cumsum() % 40
+    rate = 2.7 + rng.normal(0, 0.005, rows).cumsum() % 0.5
+    fuel = 0.5 + 0.02 * oil + 0.2 * rate + rng.normal(0, 0.02, rows)
+    return pd.DataFrame({"Fuel_price": fuel, "Oil_price": oil, "Currency_rate": rate})
+
+
+# --- Stages ---
+# Each setup(rows, workdir, stack) builds the input outside the timing and
+# returns the callable to time; stack closes servers/connections afterwards.
+def _setup_extract_page(rows, workdir, stack):
+    from gulf_crawler import FixturePageServer, TABLE_ATTRIBS
+    from gulf_scraper_to_sql import extract_page
+
+    with open(os.path.join(workdir, "page_1.html"), "wb") as f:
+        f.write(gulf_page_html(rows))
+    server = stack.enter_context(FixturePageServer(workdir))
+    url = f"{server.base_url}1"
+    return lambda: extract_page(url, TABLE_ATTRIBS)
+
+
+def _setup_gap_fill(rows, workdir, stack):
+    from gap_fill import fill_business_days
+
+    changes = gulf_price_changes(rows)
+    return lambda: fill_business_days(changes, "Date", end=END_DATE, ascending=False)
+
+
+def _setup_usd_candidates(rows, workdir, stack):
+    from gel_to_usd_rates_to_sql import get_usd_candidate_list
+
+    payload = nbg_payload(rows)
+    return lambda: get_usd_candidate_list(payload)
+
+
+def _setup_normalize(rows, workdir, stack):
+    from brent_oil_scraper import normalize_dataframe
+
+    raw = brent_scraped_frame(rows)
+    return lambda: normalize_dataframe(raw)
+
+
+def _setup_excel_append(rows, workdir, stack):
+    from gel_to_usd_rates_to_sql import append_rate_to_excel
+
+    template = os.path.join(workdir, "rates_template.xlsx")
+    path = os.path.join(workdir, "rates.xlsx")
+    write_rates_excel(template, rows)
+    new_day = (END_DATE + pd.offsets.BDay(1)).strftime("%m/%d/%Y")
+
+    def run():
+        # every run appends to the same starting file
+        with open(template, "rb") as src, open(path, "wb") as dst:
+            dst.write(src.read())
+        append_rate_to_excel(path, new_day, 2.7123)
+    return run
+
+
+def _setup_csv_append(rows, workdir, stack):
+    from brent_oil_scraper import append_rows_to_csv
+
+    path = os.path.join(workdir, "brent.csv")
+    write_brent_csv(path, rows)
+    size = os.path.getsize(path)
+    new_rows = pd.read_csv(path, nrows=1)
+    new_rows["Date"] = END_DATE + pd.offsets.BDay(1)
+
+    def run():
+        append_rows_to_csv(new_rows, path)
+        with open(path, "rb+") as f:
+            f.truncate(size)
+    return run
+
+
+def _setup_sql_load(rows, workdir, stack, backend="sqlite"):
+    from bulk_loader import bulk_load
+    from db import local_connection
+    from gulf_scraper_to_sql import to_sql_frame
+
+    prices = np.random.default_rng(0).uniform(2.5, 3.5, size=(rows, 4)).round(2)
+    crawled = pd.DataFrame(prices, columns=["Super", "Premium", "G-Force Regular", "Regular"])
+    crawled.insert(0, "Date", _dates(rows))
+    frame = to_sql_frame(crawled)
+    frame["sales_date"] = frame["sales_date"].dt.date
+    conn = local_connection(backend)
+    stack.callback(conn.close)
+    columns = ["sales_date", "super", "premium", "g_force_regular", "regular"]
+    return lambda: bulk_load(frame, conn, "bronze.gulf", columns, truncate=True, verbose=False)
+
+
+def _setup_ols_fit(rows, workdir, stack):
+    import statsmodels.api as sm
+
+    df = gold_frame(rows)
+    X = sm.add_constant(df[["Oil_price", "Currency_rate"]])
+    return lambda: sm.OLS(df["Fuel_price"], X).fit()
+
+
+# name -> (setup, row cap besides --max-rows, why)
+STAGES = {
+    "extract_page": (_setup_extract_page, None, None),
+    "gap_fill": (_setup_gap_fill, MAX_DATED_ROWS // GAP_FILL_SPACING_DAYS, "dates must fit pandas' range"),
+    "usd_candidates": (_setup_usd_candidates, None, None),
+    "normalize": (_setup_normalize, None, None),
+    "excel_append": (_setup_excel_append, EXCEL_MAX_ROWS, "Excel sheet row limit"),
+    "csv_append": (_setup_csv_append, None, None),
+    "sql_load": (_setup_sql_load, None, None),
+    "sql_load_duckdb": (functools.partial(_setup_sql_load, backend="duckdb"), None, None),
+    "ols_fit": (_setup_ols_fit, None, None),
+}
+
+
+def run_stage(name, scale, max_rows=DEFAULT_MAX_ROWS, repeat=3):
+    """Benchmark one stage at one scale and return its report row."""
+    setup, cap, cap_reason = STAGES[name]
+    wanted = BASE_ROWS[name] * scale
+    rows = min(wanted, max_rows, cap or wanted)
+    result = {"stage": name, "scale": scale, "rows_wanted": wanted, "rows": rows, "capped": rows < wanted}
+    if rows < wanted:
+        result["cap_reason"] = cap_reason if cap is not None and rows == cap else "--max-rows"
+    if name in APPENDED_ROWS:
+        result["file_rows"] = rows
+        result["rows"] = APPENDED_ROWS[name]
+
+    with tempfile.TemporaryDirectory() as workdir, contextlib.ExitStack() as stack:
+        try:
+            start = time.perf_counter()
+            target = setup(rows, workdir, stack)
+            result["setup_seconds"] = time.perf_counter() - start
+
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                # stages print progress ("Appended ...") we do not want in the timing output
+                with contextlib.redirect_stdout(io.StringIO()):
+                    target()
+                timings.append(time.perf_counter() - start)
+        except Exception as e:
+            result["error"] = f"{type(e).__name__}: {e}"
+            return result
+
+    result["seconds"] = min(timings)
+    result["median_seconds"] = statistics.median(timings)
+    result["rows_per_sec"] = result["rows"] / result["seconds"] if result["seconds"] > 0 else None
+    return result
+
+
+def _metadata():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                                text=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        commit = ""
+    return {
+        "started": datetime.now().isoformat(timespec="seconds"),
+        "git_commit": commit or None,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+    }
+
+
+def compare(results, previous):
+    """Table of (stage, scale) with seconds now, before and the speed-up."""
+    old = {(r["stage"], r["scale"]): r for r in previous.get("results", []) if "seconds" in r}
+    rows = []
+    for r in results:
+        before = old.get((r["stage"], r["scale"]))
+        if before is None or "seconds" not in r:
+            continue
+        rows.append({"stage": r["stage"], "scale": r["scale"], "seconds": r["seconds"],
+                     "previous_seconds": before["seconds"], "speedup": before["seconds"] / r["seconds"]})
+    return pd.DataFrame(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark every pipeline stage on synthetic data.")
+    parser.add_argument("--stages", nargs="+", choices=list(STAGES), default=list(STAGES))
+    parser.add_argument("--scales", type=int, nargs="+", default=list(DEFAULT_SCALES))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--max-rows", type=int, default=DEFAULT_MAX_ROWS)
+    parser.add_argument("--report", default=f"benchmark_{datetime.now():%Y%m%d_%H%M%S}.json")
+    parser.add_argument("--compare", help="earlier report to compare against")
+    args = parser.parse_args()
+
+    report = {"metadata": _metadata(), "base_rows": BASE_ROWS, "results": []}
+    for name in args.stages:
+        for scale in args.scales:
+            result = run_stage(name, scale, args.max_rows, args.repeat)
+            report["results"].append(result)
+            if "error" in result:
+                print(f"❌ {name:<15} {scale:>6}x: {result['error']}")
+                continue
+            capped = f" (capped: {result['cap_reason']})" if result["capped"] else ""
+            into = f" into a {result['file_rows']:,}-row file" if "file_rows" in result else ""
+            print(f"⏱ {name:<15} {scale:>6}x {result['rows']:>10,} rows: {result['seconds']:9.4f}s "
+                  f"({result['rows_per_sec']:>14,.0f} rows/sec){into}{capped}")
+
+    with open(args.report, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, default=str)
+    print(f"✅ Report written to {args.report}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            table = compare(report["results"], json.load(f))
+        print(table.round(4).to_string(index=False) if not table.empty else "Nothing to compare.")
+
+
+if __name__ == "__main__":
+    main()
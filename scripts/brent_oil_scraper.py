@@ -1,70 +1,188 @@
 """
 - Updates local Brent Oil historical data CSV from investing.com
 - Scrapes the latest rows (all columns)
+- Skips unchanged pages: conditional GET (ETag / Last-Modified) on a
+  persistent session, then a hash of the raw <table> before any parsing
+- Selenium fallback reuses one long-lived headless browser and waits for
+  the table to appear instead of sleeping a fixed time; Selenium is only
+  imported when that fallback runs
 - Appends only missing rows by comparing dates
-- Sorts the final CSV with the newest date on top
+- Keeps the history in a partitioned Parquet store (columnar_store), so an
+  append writes only the new rows; the CSV is appended to, not rewritten
+- Prints the time spent in each branch (fetch, parse, Selenium, writes)
 """
 
+import argparse
+import atexit
+import hashlib
+import json
 import os
-import shutil
 import time
+from contextlib import contextmanager
 import requests
 import pandas as pd
 from datetime import datetime
-from bs4 import BeautifulSoup
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
-from webdriver_manager.chrome import ChromeDriverManager
+from html_tables import iter_table_rows, rows_to_frame
+import columnar_store
+from instrumentation import span
+from date_parsing import parse_date_column
 
 # --- CONFIG ---
 URL = "https://www.investing.com/commodities/brent-oil-historical-data"
 CSV_PATH = r"C:\\Users\\gpaghava\\Desktop\\Gulf fuel prices analysis\\Brent Oil Futures Historical Data.csv"
-BACKUP_PATH = CSV_PATH + ".bak"
+STORE_PATH = r"C:\\Users\\gpaghava\\Desktop\\Gulf fuel prices analysis\\store\\brent_oil"
+FETCH_STATE_PATH = CSV_PATH + ".fetch_state.json"
 COLUMNS = ["Date", "Price", "Open", "High", "Low", "Vol.", "Change %"]
+SELENIUM_TIMEOUT = 20
+
+# --- Timing ---
+@contextmanager
+def timed(label, span_name=None):
+    """Print how long the block took; with span_name it is also recorded as an instrumentation span."""
+    start = time.perf_counter()
+    try:
+        if span_name:
+            with span(span_name, source="brent", step=label) as s:
+                yield s
+        else:
+            yield None
+    finally:
+        print(f"⏱ {label}: {time.perf_counter() - start:.3f}s")
 
 # --- Scraping via requests ---
-def get_table_via_requests():
-    headers = {"User-Agent": "Mozilla/5.0"}
-    r = requests.get(URL, headers=headers, timeout=20)
-    r.raise_for_status()
-    soup = BeautifulSoup(r.text, "lxml")
-
-    table = soup.find("table")
-    if not table:
-        raise RuntimeError("No table found in HTML via requests.")
-    rows = table.find_all("tr")
-
-    data = []
-    for row in rows[1:]:
-        cols = [td.get_text(strip=True) for td in row.find_all("td")]
-        if len(cols) == len(COLUMNS):
-            data.append(cols)
-    if not data:
+_session = None
+
+def get_session():
+    """One requests.Session per process, so connections are kept alive between fetches."""
+    global _session
+    if _session is None:
+        _session = requests.Session()
+        _session.headers.update({"User-Agent": "Mozilla/5.0"})
+    return _session
+
+def load_fetch_state(path=None):
+    path = path or FETCH_STATE_PATH
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+def save_fetch_state(state, path=None):
+    with open(path or FETCH_STATE_PATH, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+
+def table_hash(content):
+    """sha256 of the raw first <table>...</table> bytes (the whole page if there is none)."""
+    start = content.find(b"<table")
+    end = content.find(b"</table>", start)
+    if start != -1 and end != -1:
+        content = content[start:end]
+    return hashlib.sha256(content).hexdigest()
+
+def parse_table(content):
+    # Stream the rows of the first <table>; header rows have no <td> and are skipped
+    data = rows_to_frame(
+        iter_table_rows(content, scope="table", n_cells=len(COLUMNS), exact=True),
+        COLUMNS,
+    )
+    if data.empty:
         raise RuntimeError("No rows extracted via requests.")
-    return pd.DataFrame(data, columns=COLUMNS)
+    return data
+
+def fetch_table_if_changed(url=URL, state=None, session=None):
+    """
+    Conditional fetch. Returns (DataFrame or None, new_state); None means the
+    page (304) or its table (same hash as last time) has not changed.
+    Persist new_state only once the rows have been stored.
+    """
+    session = session or get_session()
+    state = dict(state or {})
+    headers = {}
+    if state.get("etag"):
+        headers["If-None-Match"] = state["etag"]
+    if state.get("last_modified"):
+        headers["If-Modified-Since"] = state["last_modified"]
+
+    with timed("requests fetch", "http_fetch") as s:
+        r = session.get(url, headers=headers, timeout=20)
+        s.add(bytes=len(r.content))
+    if r.status_code == 304:
+        return None, state
+    r.raise_for_status()
+
+    new_state = {
+        "etag": r.headers.get("ETag"),
+        "last_modified": r.headers.get("Last-Modified"),
+        "table_hash": table_hash(r.content),
+    }
+    if new_state["table_hash"] == state.get("table_hash"):
+        return None, new_state
+
+    with timed("parse", "parse") as s:
+        data = parse_table(r.content)
+        s.add(rows=len(data), bytes=len(r.content))
+    return data, new_state
+
+def get_table_via_requests(url=URL, session=None):
+    session = session or get_session()
+    with span("http_fetch", source="brent", step="requests fetch") as s:
+        r = session.get(url, timeout=20)
+        r.raise_for_status()
+        s.add(bytes=len(r.content))
+    with span("parse", source="brent", step="parse") as s:
+        data = parse_table(r.content)
+        s.add(rows=len(data), bytes=len(r.content))
+    return data
 
 # --- Selenium fallback ---
-def get_table_via_selenium(headless=True):
-    options = Options()
-    if headless:
-        options.add_argument("--headless")
-    options.add_argument("--no-sandbox")
-    options.add_argument("--disable-dev-shm-usage")
-
-    service = Service(ChromeDriverManager().install())
-    driver = webdriver.Chrome(service=service, options=options)
-    driver.get(URL)
-    time.sleep(5)
-
-    rows = driver.find_elements(By.CSS_SELECTOR, "table tbody tr")
-    data = []
-    for row in rows:
-        tds = [td.text.strip() for td in row.find_elements(By.TAG_NAME, "td")]
-        if len(tds) == len(COLUMNS):
-            data.append(tds)
-    driver.quit()
+_driver = None
+
+def get_driver(headless=True):
+    """Start Chrome once per process and reuse it; it is closed at exit."""
+    global _driver
+    if _driver is None:
+        # Selenium is only imported when the requests path fails
+        from selenium import webdriver
+        from selenium.webdriver.chrome.options import Options
+        from selenium.webdriver.chrome.service import Service
+        from webdriver_manager.chrome import ChromeDriverManager
+
+        options = Options()
+        if headless:
+            options.add_argument("--headless")
+        options.add_argument("--no-sandbox")
+        options.add_argument("--disable-dev-shm-usage")
+
+        service = Service(ChromeDriverManager().install())
+        _driver = webdriver.Chrome(service=service, options=options)
+        atexit.register(close_driver)
+    return _driver
+
+def close_driver():
+    global _driver
+    if _driver is not None:
+        _driver.quit()
+        _driver = None
+
+def get_table_via_selenium(headless=True, url=URL, timeout=SELENIUM_TIMEOUT):
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support import expected_conditions as EC
+    from selenium.webdriver.support.ui import WebDriverWait
+
+    driver = get_driver(headless)
+    driver.get(url)
+    # Wait until the first data cell is rendered rather than a fixed sleep
+    WebDriverWait(driver, timeout).until(
+        EC.presence_of_element_located((By.CSS_SELECTOR, "table tbody tr td"))
+    )
+
+    # Read every cell in one round trip instead of one WebDriver call per <td>
+    rows = driver.execute_script(
+        "return Array.from(document.querySelectorAll('table tbody tr'))"
+        ".map(tr => Array.from(tr.querySelectorAll('td')).map(td => td.innerText.trim()));"
+    )
+    data = [row for row in rows if len(row) == len(COLUMNS)]
 
     if not data:
         raise RuntimeError("No rows extracted via Selenium.")
@@ -73,7 +191,7 @@ def get_table_via_selenium(headless=True):
 # --- Normalize data types ---
 def normalize_dataframe(df):
     df = df.copy()
-    df["Date"] = pd.to_datetime(df["Date"], errors="coerce").dt.date
+    df["Date"] = parse_date_column(df["Date"]).dt.date
 
     def clean_numeric_col(s):
         return (
@@ -97,44 +215,88 @@ def normalize_dataframe(df):
     return df
 
 # --- Main ---
-def main():
-    if not os.path.exists(CSV_PATH):
-        raise FileNotFoundError(f"CSV not found at {CSV_PATH}")
+def seed_store_from_csv(csv_path=CSV_PATH, store_path=STORE_PATH):
+    """One-off import of the existing CSV history into the columnar store."""
+    if not os.path.exists(csv_path):
+        raise FileNotFoundError(f"CSV not found at {csv_path}")
+    old_df = normalize_dataframe(pd.read_csv(csv_path))
+    seeded = columnar_store.append(store_path, old_df)
+    print(f"🗂 Seeded {len(seeded)} rows from {csv_path} into {store_path}")
+
+
+def append_rows_to_csv(rows, csv_path):
+    """Append rows to the end of the CSV without reading or rewriting what is there."""
+    with span("file_write", path=os.path.basename(csv_path), format="csv") as s:
+        to_save = rows.copy()
+        to_save["Date"] = pd.to_datetime(to_save["Date"]).dt.strftime("%Y-%m-%d")
+        exists = os.path.exists(csv_path) and os.path.getsize(csv_path) > 0
+        size_before = os.path.getsize(csv_path) if exists else 0
+        if exists:
+            with open(csv_path, "rb+") as f:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) not in (b"\n", b"\r"):
+                    f.write(b"\n")
+        to_save[COLUMNS].to_csv(csv_path, mode="a", header=not exists, index=False)
+        s.add(rows=len(to_save), bytes=os.path.getsize(csv_path) - size_before)
 
-    old_df = pd.read_csv(CSV_PATH)
-    old_df = normalize_dataframe(old_df)
 
-    # Scrape fresh data
+def main(export_csv=True, rebuild_csv=False):
+    existing_dates = columnar_store.dates(STORE_PATH)
+    if existing_dates.empty:
+        seed_store_from_csv(CSV_PATH, STORE_PATH)
+        existing_dates = columnar_store.dates(STORE_PATH)
+
+    # Scrape fresh data, skipping the work when investing.com has nothing new
+    state = load_fetch_state(FETCH_STATE_PATH)
     try:
-        new_df = get_table_via_requests()
+        new_df, state = fetch_table_if_changed(URL, state)
+        if new_df is None:
+            print("✅ Page unchanged since the last run — nothing to parse.")
+            save_fetch_state(state, FETCH_STATE_PATH)
+            return
     except Exception as e:
         print("Requests scraping failed, trying Selenium fallback:", e)
-        new_df = get_table_via_selenium()
-    new_df = normalize_dataframe(new_df)
+        with timed("selenium", "http_fetch") as s:
+            new_df = get_table_via_selenium()
+            s.add(rows=len(new_df))
+    with timed("normalize", "normalize") as s:
+        new_df = normalize_dataframe(new_df)
+        s.add(rows=len(new_df))
+    # Validation and quarantine happen once, when load_brent_oil_incremental loads the store
 
     # Filter new rows
-    existing_dates = set(old_df["Date"].dropna())
+    existing_dates = set(existing_dates.dt.date)
     new_df = new_df[new_df["Date"].notnull()]
     rows_to_append = new_df[~new_df["Date"].isin(existing_dates)]
 
     if rows_to_append.empty:
-        print("✅ No new rows to append — CSV is already up to date.")
+        print("✅ No new rows to append — store is already up to date.")
+        save_fetch_state(state, FETCH_STATE_PATH)
         return
 
-    # Append and sort by Date DESC (newest first)
+    # Append only the new rows as a new partition file
     print(f"📅 Appending {len(rows_to_append)} new rows...")
-    updated_df = pd.concat([old_df, rows_to_append], ignore_index=True)
-    updated_df = updated_df.sort_values("Date", ascending=False).reset_index(drop=True)
-
-    # Backup and save
-    shutil.copy2(CSV_PATH, BACKUP_PATH)
-    to_save = updated_df.copy()
-    to_save["Date"] = pd.to_datetime(to_save["Date"]).dt.strftime("%Y-%m-%d")
-    to_save.to_csv(CSV_PATH, index=False)
-    print(f"✅ CSV updated and saved to {CSV_PATH}")
-    print(f"🗂 Backup saved to {BACKUP_PATH}")
-    print("⬇️ Newest data is now at the top of your CSV.")
+    with timed("store append"):
+        columnar_store.append(STORE_PATH, rows_to_append)
+    print(f"✅ Store updated at {STORE_PATH}")
 
-if __name__ == "__main__":
-    main()
+    # bronze.load_brent_oil still BULK INSERTs from the CSV
+    if rebuild_csv:
+        with timed("csv rebuild"):
+            columnar_store.export_csv(STORE_PATH, CSV_PATH, date_format="%Y-%m-%d")
+        print(f"✅ CSV regenerated at {CSV_PATH}")
+        print("⬇️ Newest data is now at the top of your CSV.")
+    elif export_csv:
+        with timed("csv append"):
+            append_rows_to_csv(rows_to_append, CSV_PATH)
+        print(f"✅ {len(rows_to_append)} rows appended to {CSV_PATH}")
 
+    save_fetch_state(state, FETCH_STATE_PATH)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Update Brent oil history from investing.com.")
+    parser.add_argument("--no-csv", action="store_true", help="do not touch the CSV, only the store")
+    parser.add_argument("--rebuild-csv", action="store_true",
+                        help="regenerate the whole CSV (newest first) from the store instead of appending")
+    args = parser.parse_args()
+    main(export_csv=not args.no_csv, rebuild_csv=args.rebuild_csv)
@@ -1,32 +1,143 @@
-import pyodbc
+"""
+- Loads new Brent oil rows into bronze.brent_oil without emptying the table
+- Reads MAX(trade_date) from the table, streams only newer rows (from the
+  columnar store, or a CSV read in chunks) into a staging table and merges
+  them on trade_date in one transaction
+- Validates the new rows and quarantines failures (the scraper does not)
+- Returns the per-stage durations the stored procedure used to PRINT as a dict
+- --procedure runs the old bronze.load_brent_oil (TRUNCATE + BULK INSERT) instead
+"""
 
-# Connection settings
-server = r"GPAGHAVA\GPAGAVA"
-database = "OilDataWarehouse"
+import argparse
+import time
+import pandas as pd
+import columnar_store
+import db
+from bulk_loader import get_watermark, merge_load
+from date_parsing import parse_date_column
+from validation import validate_and_quarantine
 
-# Create connection using Windows Authentication
-conn = pyodbc.connect(
-    rf"DRIVER={{ODBC Driver 17 for SQL Server}};"
-    rf"SERVER={server};"
-    rf"DATABASE={database};"
-    rf"Trusted_Connection=yes;"
-)
+STORE_PATH = r"C:\Users\gpaghava\Desktop\Gulf fuel prices analysis\store\brent_oil"
+TABLE = "bronze.brent_oil"
+CSV_CHUNK_ROWS = 50_000
 
-cursor = conn.cursor()
+# Store / CSV column -> bronze.brent_oil column
+COLUMN_MAP = {
+    "Date": "trade_date",
+    "Price": "price",
+    "Open": "open_price",
+    "High": "high_price",
+    "Low": "low_price",
+    "Vol.": "vol",
+    "Change %": "change_percentage",
+}
 
-try:
-    # Execute the stored procedure
-    cursor.execute("EXEC bronze.load_brent_oil")
 
-    # Commit if stored procedure does INSERT/UPDATE/DELETE
-    conn.commit()
+def read_new_rows_from_store(store_path, after):
+    """Rows dated after `after` (None = everything); only later partitions are opened."""
+    start = None if after is None else pd.Timestamp(after) + pd.Timedelta(days=1)
+    return columnar_store.read(store_path, "Date", start=start)
 
-    print("Stored procedure executed successfully.")
 
-except Exception as e:
-    print("Error executing stored procedure:", e)
+def read_new_rows_from_csv(csv_path, after, chunk_rows=CSV_CHUNK_ROWS):
+    """Stream the CSV in chunks and keep only rows dated after `after`."""
+    keep = []
+    for chunk in pd.read_csv(csv_path, chunksize=chunk_rows):
+        chunk["Date"] = parse_date_column(chunk["Date"])
+        if after is not None:
+            chunk = chunk[chunk["Date"] > pd.Timestamp(after)]
+        if not chunk.empty:
+            keep.append(chunk)
+    if not keep:
+        return pd.DataFrame(columns=list(COLUMN_MAP))
+    return pd.concat(keep, ignore_index=True)
 
-finally:
-    cursor.close()
-    conn.close()
 
+def load_brent_oil_incremental(conn, store_path=STORE_PATH, csv_path=None):
+    """
+    Merge rows newer than the table's watermark into bronze.brent_oil.
+    Rows failing validation go to bronze.quarantine instead.
+    Returns timings: {watermark, read_source, validate, staging, merge, total} in seconds,
+    plus rows and the watermark date used.
+    """
+    timings = {}
+    started = time.perf_counter()
+
+    t = time.perf_counter()
+    watermark = get_watermark(conn, TABLE, "trade_date")
+    timings["watermark"] = time.perf_counter() - t
+
+    t = time.perf_counter()
+    if csv_path is not None:
+        df = read_new_rows_from_csv(csv_path, watermark)
+    else:
+        df = read_new_rows_from_store(store_path, watermark)
+    timings["read_source"] = time.perf_counter() - t
+
+    t = time.perf_counter()
+    if not df.empty:
+        # The only validation of scraped Brent rows (the scraper stores them as they
+        # come); duplicate dates are quarantined too, the first one is loaded
+        df = validate_and_quarantine(df, "brent_oil", conn)
+    df = df.rename(columns=COLUMN_MAP)
+    if not df.empty:
+        df["trade_date"] = pd.to_datetime(df["trade_date"]).dt.date
+    timings["validate"] = time.perf_counter() - t
+
+    if df.empty:
+        timings["staging"] = timings["merge"] = 0.0
+    else:
+        stats = merge_load(df, conn, TABLE, list(COLUMN_MAP.values()),
+                           key_columns=["trade_date"], verbose=False)
+        timings["staging"] = stats["staging_seconds"]
+        timings["merge"] = stats["merge_seconds"]
+
+    timings["total"] = time.perf_counter() - started
+    timings["rows"] = len(df)
+    timings["watermark_date"] = None if watermark is None else watermark.isoformat()
+    return timings
+
+
+def exec_stored_procedure(conn):
+    """Old path: TRUNCATE + BULK INSERT of the whole CSV inside SQL Server."""
+    cursor = conn.cursor()
+    try:
+        start = time.perf_counter()
+        # Execute the stored procedure
+        cursor.execute("EXEC bronze.load_brent_oil")
+
+        # Commit if stored procedure does INSERT/UPDATE/DELETE
+        conn.commit()
+        return {"total": time.perf_counter() - start}
+    finally:
+        cursor.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load new Brent oil rows into bronze.brent_oil.")
+    parser.add_argument("--csv", help="read from this CSV (in chunks) instead of the columnar store")
+    parser.add_argument("--procedure", action="store_true",
+                        help="run the old bronze.load_brent_oil stored procedure (full reload)")
+    args = parser.parse_args()
+
+    conn = db.connect()
+    try:
+        if args.procedure:
+            timings = exec_stored_procedure(conn)
+            print("Stored procedure executed successfully.")
+        else:
+            timings = load_brent_oil_incremental(conn, csv_path=args.csv)
+            print(f"Merged {timings['rows']} new rows (after {timings['watermark_date']}).")
+        for stage, value in timings.items():
+            if isinstance(value, float):
+                print(f">> {stage}: {value:.3f} seconds")
+
+    except Exception as e:
+        print("Error loading Brent oil data:", e)
+
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
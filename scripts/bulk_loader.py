@@ -0,0 +1,282 @@
+"""
+- Batched DataFrame -> SQL loader shared by the *_to_sql.py scripts
+- Sends rows in configurable batches with array-bound parameters
+  (pyodbc fast_executemany on SQL Server, executemany on SQLite, an Arrow
+  batch on DuckDB, whose executemany runs row by row)
+- Optional staging-table path: load into a #temp / staging table first,
+  then move everything into the target with one INSERT ... SELECT
+- Merge path for incremental loads: staging table + MERGE (upsert) on key columns
+- Watermark helper returning the latest date already loaded into a table
+- Reports rows/sec so load throughput can be compared between runs
+- Works against every db.py backend (SQL Server, and the SQLite / DuckDB
+  warehouses that mirror the bronze and gold DDL for local benchmarks)
+
+Run directly to benchmark the loader against an in-memory local warehouse:
+    python bulk_loader.py --rows 100000 --batch-size 5000 [--backend duckdb]
+"""
+
+import argparse
+import time
+import numpy as np
+import pandas as pd
+from db import backend_of, cursor as db_cursor, is_local, local_connection
+from instrumentation import span
+
+# --- CONFIG ---
+DEFAULT_BATCH_SIZE = 5000
+
+
+def truncate_sql(conn, table):
+    """TRUNCATE on SQL Server, DELETE on the local backends (SQLite has no TRUNCATE)."""
+    if is_local(conn):
+        return f"DELETE FROM {table};"
+    return f"TRUNCATE TABLE {table};"
+
+
+# --- Helpers ---
+def _column_values(series):
+    """
+    Convert one column to plain Python values the drivers accept, as a list.
+    Whole column at a time: datetimes become date (all at midnight) or
+    datetime, numpy numbers become int/float, and missing values become None.
+    """
+    if pd.api.types.is_datetime64_any_dtype(series):
+        at_midnight = (series.isna() | series.eq(series.dt.normalize())).all()
+        values = pd.Series(series.dt.date if at_midnight else series.dt.to_pydatetime(),
+                           index=series.index, dtype=object)
+    else:
+        # astype(object) turns numpy scalars into Python ones
+        values = series.astype(object)
+    return values.where(series.notna(), None).tolist()
+
+
+def dataframe_to_rows(df, columns):
+    """Return the DataFrame as a list of plain tuples in column order (no iterrows)."""
+    return list(zip(*(_column_values(df[c]) for c in columns)))
+
+
+def _batches(rows, batch_size):
+    for start in range(0, len(rows), batch_size):
+        yield rows[start:start + batch_size]
+
+
+def _insert_rows(conn, cursor, target, columns, rows, batch_size):
+    """INSERT rows into target, batch by batch."""
+    column_list = ", ".join(columns)
+    if backend_of(conn) == "duckdb":
+        import pyarrow as pa
+
+        for batch in _batches(rows, batch_size):
+            cursor.register("_batch", pa.table(dict(zip(columns, map(list, zip(*batch))))))
+            cursor.execute(f"INSERT INTO {target} ({column_list}) SELECT {column_list} FROM _batch")
+            cursor.unregister("_batch")
+        return
+    placeholders = ", ".join("?" for _ in columns)
+    insert_sql = f"INSERT INTO {target} ({column_list}) VALUES ({placeholders})"
+    for batch in _batches(rows, batch_size):
+        cursor.executemany(insert_sql, batch)
+
+
+# --- Loader ---
+def bulk_load(df, conn, table, columns, batch_size=DEFAULT_BATCH_SIZE,
+              truncate=False, use_staging=False, verbose=True):
+    """
+    Insert df[columns] into table in batches and commit once at the end.
+
+    truncate     -- empty the target table first, in the same transaction
+    use_staging  -- load into a temporary staging table, then copy into the
+                    target with a single INSERT ... SELECT
+
+    Returns a dict with rows, seconds and rows_per_sec.
+    """
+    rows = dataframe_to_rows(df, columns)
+    column_list = ", ".join(columns)
+
+    # pyodbc: bind each batch as a parameter array instead of row by row
+    cursor = db_cursor(conn)
+
+    with span("db_load", table=table, mode="bulk") as s:
+        start = time.perf_counter()
+        try:
+            if truncate:
+                cursor.execute(truncate_sql(conn, table))
+
+            if use_staging:
+                staging = _create_staging_table(conn, cursor, table)
+                target = staging
+            else:
+                target = table
+
+            _insert_rows(conn, cursor, target, columns, rows, batch_size)
+
+            if use_staging:
+                cursor.execute(
+                    f"INSERT INTO {table} ({column_list}) SELECT {column_list} FROM {staging}"
+                )
+                cursor.execute(f"DROP TABLE {staging}")
+
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+        s.add(rows=len(rows))
+    elapsed = time.perf_counter() - start
+
+    stats = {
+        "table": table,
+        "rows": len(rows),
+        "seconds": elapsed,
+        "rows_per_sec": len(rows) / elapsed if elapsed > 0 else float("inf"),
+    }
+    if verbose:
+        print(f"⏱ Loaded {stats['rows']} rows into {table} in {elapsed:.3f}s "
+              f"({stats['rows_per_sec']:,.0f} rows/sec)")
+    return stats
+
+
+def merge_load(df, conn, table, columns, key_columns, batch_size=DEFAULT_BATCH_SIZE, verbose=True):
+    """
+    Upsert df[columns] into table: rows whose key_columns already exist are
+    updated, the rest inserted. If df repeats a key, its last row wins. Rows go
+    through a staging table and are merged in one statement (MERGE on SQL
+    Server, UPDATE ... FROM + INSERT on SQLite), all in a single transaction.
+
+    Returns the same stats dict as bulk_load, plus staging_seconds and
+    merge_seconds (merge includes the commit).
+    """
+    # One row per key: duplicates would be inserted twice locally and make MERGE fail
+    df = df.drop_duplicates(subset=key_columns, keep="last")
+    rows = dataframe_to_rows(df, columns)
+    column_list = ", ".join(columns)
+    value_columns = [c for c in columns if c not in key_columns]
+    on_clause = " AND ".join(f"t.{c} = s.{c}" for c in key_columns)
+
+    cursor = db_cursor(conn)
+
+    with span("db_load", table=table, mode="merge") as s:
+        start = time.perf_counter()
+        try:
+            staging = _create_staging_table(conn, cursor, table)
+            _insert_rows(conn, cursor, staging, columns, rows, batch_size)
+            staged = time.perf_counter()
+
+            if is_local(conn):
+                if value_columns:
+                    set_clause = ", ".join(f"{c} = s.{c}" for c in value_columns)
+                    on_where = " AND ".join(f"{table}.{c} = s.{c}" for c in key_columns)
+                    cursor.execute(f"UPDATE {table} SET {set_clause} FROM {staging} AS s WHERE {on_where}")
+                cursor.execute(
+                    f"INSERT INTO {table} ({column_list}) SELECT {column_list} FROM {staging} AS s "
+                    f"WHERE NOT EXISTS (SELECT 1 FROM {table} AS t WHERE {on_clause})"
+                )
+            else:
+                update_clause = ""
+                if value_columns:
+                    set_clause = ", ".join(f"t.{c} = s.{c}" for c in value_columns)
+                    update_clause = f"WHEN MATCHED THEN UPDATE SET {set_clause} "
+                source_values = ", ".join(f"s.{c}" for c in columns)
+                cursor.execute(
+                    f"MERGE {table} AS t USING {staging} AS s ON {on_clause} "
+                    f"{update_clause}"
+                    f"WHEN NOT MATCHED BY TARGET THEN INSERT ({column_list}) VALUES ({source_values});"
+                )
+            cursor.execute(f"DROP TABLE {staging}")
+
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+        s.add(rows=len(rows))
+    end = time.perf_counter()
+    elapsed = end - start
+
+    stats = {
+        "table": table,
+        "rows": len(rows),
+        "seconds": elapsed,
+        "staging_seconds": staged - start,
+        "merge_seconds": end - staged,
+        "rows_per_sec": len(rows) / elapsed if elapsed > 0 else float("inf"),
+    }
+    if verbose:
+        print(f"⏱ Merged {stats['rows']} rows into {table} in {elapsed:.3f}s "
+              f"({stats['rows_per_sec']:,.0f} rows/sec)")
+    return stats
+
+
+def get_watermark(conn, table, date_column):
+    """Return the latest date already loaded into table (datetime.date), or None if empty."""
+    cursor = conn.cursor()
+    try:
+        cursor.execute(f"SELECT MAX({date_column}) FROM {table}")
+        value = cursor.fetchone()[0]
+    finally:
+        cursor.close()
+    if value is None:
+        return None
+    # SQLite hands dates back as ISO text, pyodbc and DuckDB as date/datetime
+    return pd.Timestamp(value).date()
+
+
+def _create_staging_table(conn, cursor, table):
+    """Create an empty staging copy of table and return its name."""
+    name = table.split(".")[-1]
+    if is_local(conn):
+        staging = f"temp.stg_{name}"
+        cursor.execute(f"DROP TABLE IF EXISTS {staging}")
+        cursor.execute(f"CREATE TEMP TABLE stg_{name} AS SELECT * FROM {table} LIMIT 0")
+    else:
+        staging = f"#stg_{name}"
+        cursor.execute(f"IF OBJECT_ID('tempdb..{staging}') IS NOT NULL DROP TABLE {staging};")
+        cursor.execute(f"SELECT TOP 0 * INTO {staging} FROM {table};")
+    return staging
+
+
+# --- Local benchmark ---
+def _synthetic_gulf_frame(n_rows):
+    rng = np.random.default_rng(0)
+    dates = pd.bdate_range(end=pd.Timestamp("2025-11-14"), periods=n_rows)
+    prices = rng.uniform(2.5, 3.5, size=(n_rows, 4)).round(2)
+    return pd.DataFrame({
+        "sales_date": dates,
+        "super": prices[:, 0],
+        "premium": prices[:, 1],
+        "g_force_regular": prices[:, 2],
+        "regular": prices[:, 3],
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark bulk_load against an in-memory local warehouse.")
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--backend", choices=["sqlite", "duckdb"], default="sqlite")
+    args = parser.parse_args()
+
+    df = _synthetic_gulf_frame(args.rows)
+    columns = ["sales_date", "super", "premium", "g_force_regular", "regular"]
+
+    conn = local_connection(args.backend)
+    insert_sql = "INSERT INTO bronze.gulf (sales_date, super, premium, g_force_regular, regular) VALUES (?, ?, ?, ?, ?)"
+    cursor = conn.cursor()
+    start = time.perf_counter()
+    for row in dataframe_to_rows(df, columns):
+        cursor.execute(insert_sql, row)
+    conn.commit()
+    per_row = time.perf_counter() - start
+    print(f"per-row execute:  {args.rows / per_row:,.0f} rows/sec")
+
+    for use_staging in (False, True):
+        stats = bulk_load(df, conn, "bronze.gulf", columns, batch_size=args.batch_size,
+                          truncate=True, use_staging=use_staging, verbose=False)
+        label = "staging" if use_staging else "batched"
+        print(f"{label + ':':<17} {stats['rows_per_sec']:,.0f} rows/sec")
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,322 @@
+"""
+- Out-of-core analytics over gold.fuel_features: summary statistics,
+  correlations and the OLS fit computed chunk by chunk, so memory is bounded
+  by the chunk size rather than by the history
+- Chunks are read with db.read_sql(chunksize=...) and made compact:
+  feature_date as int32 days since 1970-01-01, prices as float32 (half the
+  size of float64 / object columns)
+- Every accumulator is float64 whatever the chunk dtype, and only one chunk
+  is held at a time:
+    RunningStats      count / missing / mean / std / min / max per column,
+                      merged chunk by chunk with Chan's update
+    PairwiseMoments   shifted sums of products over the rows where both
+                      columns are present, i.e. what DataFrame.corr() computes
+    NormalEquations   XᵀX, Xᵀy and yᵀy over complete rows; solve() gives the
+                      coefficients, standard errors, R² and RMSE
+- Quantiles need the whole column, so the summary has no 25% / 50% / 75% rows
+- Results match the in-memory path (describe(), corr(), OLS) to float
+  rounding; --compare prints the largest differences
+
+Run directly (reads gold.fuel_features):
+    python chunked_analytics.py [--chunksize 50000] [--compare]
+    python chunked_analytics.py --benchmark --rows 1000000 10000000
+"""
+
+import argparse
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+
+# --- CONFIG ---
+FEATURE_COLUMNS = ["feature_date", "super", "premium", "g_force_regular", "regular",
+                   "oil_price", "currency_rate"]
+DATE_COLUMN = "feature_date"
+DEFAULT_CHUNK_ROWS = 50_000
+DEFAULT_Y = "premium"
+DEFAULT_X = ("oil_price", "currency_rate")
+
+
+# --- Reading ---
+def compact(chunk, date_column=DATE_COLUMN):
+    """A chunk with the date as int32 days since 1970-01-01 and every other column float32."""
+    out = {}
+    for column in chunk.columns:
+        if column == date_column:
+            days = pd.to_datetime(chunk[column]).to_numpy(dtype="datetime64[D]")
+            out[column] = days.astype(np.int32)
+        else:
+            values = pd.to_numeric(chunk[column], errors="coerce")
+            out[column] = values.to_numpy(dtype=np.float32, na_value=np.nan)
+    return pd.DataFrame(out)
+
+
+def read_chunks(conn, columns=FEATURE_COLUMNS, chunksize=DEFAULT_CHUNK_ROWS, compact_dtypes=True):
+    """gold.fuel_features as an iterator of (compact) chunks of at most chunksize rows."""
+    import db
+
+    sql = f"SELECT {', '.join(columns)} FROM gold.fuel_features"
+    for chunk in db.read_sql(conn, sql, chunksize=chunksize):
+        yield compact(chunk) if compact_dtypes else chunk
+
+
+# --- Accumulators ---
+class RunningStats:
+    """Per-column count, missing, mean, std, min and max over any number of chunks."""
+
+    def __init__(self, columns):
+        self.columns = list(columns)
+        k = len(self.columns)
+        self.n = np.zeros(k)
+        self.missing = np.zeros(k, dtype=np.int64)
+        self.mean = np.zeros(k)
+        self.m2 = np.zeros(k)
+        self.min = np.full(k, np.nan)
+        self.max = np.full(k, np.nan)
+
+    def update(self, values):
+        """values: rows x columns array (any float dtype); NaN counts as missing."""
+        x = np.asarray(values, dtype=np.float64)
+        valid = ~np.isnan(x)
+        n_b = valid.sum(axis=0)
+        self.missing += len(x) - n_b
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean_b = np.where(valid, x, 0.0).sum(axis=0) / n_b
+            m2_b = np.where(valid, (x - mean_b) ** 2, 0.0).sum(axis=0)
+            # Chan et al.: merge the chunk's mean and squared deviations into the running ones
+            n = self.n + n_b
+            delta = mean_b - self.mean
+            has = n_b > 0
+            self.mean = np.where(has, self.mean + delta * n_b / n, self.mean)
+            self.m2 = np.where(has, self.m2 + m2_b + delta ** 2 * self.n * n_b / n, self.m2)
+        self.n = n
+        if len(x):
+            self.min = np.fmin(self.min, np.fmin.reduce(x, axis=0))
+            self.max = np.fmax(self.max, np.fmax.reduce(x, axis=0))
+
+    def result(self):
+        """describe()-style frame: count, mean, std, min, max (and missing) per column."""
+        with np.errstate(invalid="ignore", divide="ignore"):
+            std = np.sqrt(self.m2 / (self.n - 1))
+        mean = np.where(self.n > 0, self.mean, np.nan)
+        return pd.DataFrame([self.n, mean, std, self.min, self.max, self.missing],
+                            index=["count", "mean", "std", "min", "max", "missing"], columns=self.columns)
+
+
+class PairwiseMoments:
+    """
+    Covariance and correlation over pairwise-complete rows, like
+    DataFrame.cov() / corr(). Sums are taken around a shift (the first
+    chunk's means), which keeps them small and the subtraction exact enough.
+    """
+
+    def __init__(self, columns):
+        self.columns = list(columns)
+        k = len(self.columns)
+        self.shift = None
+        self.pairs = np.zeros((k, k))   # rows where both i and j are present
+        self.sums = np.zeros((k, k))    # sum of z_i over those rows
+        self.squares = np.zeros((k, k))  # sum of z_i² over those rows
+        self.products = np.zeros((k, k))  # sum of z_i z_j
+
+    def update(self, values):
+        x = np.asarray(values, dtype=np.float64)
+        present = ~np.isnan(x)
+        if self.shift is None:
+            with np.errstate(invalid="ignore"):
+                shift = np.where(present, x, 0.0).sum(axis=0) / present.sum(axis=0)
+            self.shift = np.nan_to_num(shift)
+        mask = present.astype(np.float64)
+        z = np.where(present, x - self.shift, 0.0)
+        self.pairs += mask.T @ mask
+        self.sums += z.T @ mask
+        self.squares += (z * z).T @ mask
+        self.products += z.T @ z
+
+    def covariance(self):
+        with np.errstate(invalid="ignore", divide="ignore"):
+            cov = (self.products - self.sums * self.sums.T / self.pairs) / (self.pairs - 1)
+        return pd.DataFrame(cov, index=self.columns, columns=self.columns)
+
+    def correlation(self):
+        n = self.pairs
+        with np.errstate(invalid="ignore", divide="ignore"):
+            cov = (self.products - self.sums * self.sums.T / n) / (n - 1)
+            # var[i, j]: variance of column i over the rows where j is present too
+            var = (self.squares - self.sums ** 2 / n) / (n - 1)
+            corr = cov / np.sqrt(var * var.T)
+        corr = np.clip(corr, -1.0, 1.0)
+        np.fill_diagonal(corr, np.where(np.diag(n) > 1, 1.0, np.nan))
+        return pd.DataFrame(corr, index=self.columns, columns=self.columns)
+
+
+class NormalEquations:
+    """OLS of y on a constant and x, from XᵀX, Xᵀy and yᵀy summed over complete rows."""
+
+    def __init__(self, x_columns):
+        self.names = ["const", *x_columns]
+        k = len(self.names)
+        self.xtx = np.zeros((k, k))
+        self.xty = np.zeros(k)
+        self.yty = 0.0
+        self.y_sum = 0.0
+        self.n = 0
+
+    def update(self, x, y):
+        x = np.asarray(x, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        ok = ~np.isnan(y) & ~np.isnan(x).any(axis=1)
+        if not ok.all():
+            x, y = x[ok], y[ok]
+        X = np.column_stack([np.ones(len(y)), x])
+        self.xtx += X.T @ X
+        self.xty += X.T @ y
+        self.yty += float(y @ y)
+        self.y_sum += float(y.sum())
+        self.n += len(y)
+
+    def solve(self):
+        """params, bse (standard errors), rsquared, rmse, scale and nobs."""
+        k = len(self.names)
+        if self.n <= k:
+            raise ValueError(f"OLS needs more than {k} complete rows, got {self.n}.")
+        beta = np.linalg.solve(self.xtx, self.xty)
+        ssr = max(self.yty - float(beta @ self.xty), 0.0)
+        tss = self.yty - self.y_sum ** 2 / self.n
+        scale = ssr / (self.n - k)
+        bse = np.sqrt(np.diag(np.linalg.inv(self.xtx)) * scale)
+        return {
+            "params": pd.Series(beta, index=self.names),
+            "bse": pd.Series(bse, index=self.names),
+            "rsquared": 1 - ssr / tss if tss > 0 else np.nan,
+            "rmse": float(np.sqrt(ssr / self.n)),
+            "scale": scale,
+            "nobs": self.n,
+        }
+
+
+def analyze(chunks, y=DEFAULT_Y, x=DEFAULT_X, date_column=DATE_COLUMN):
+    """
+    One pass over an iterable of chunks (DataFrames with the same columns):
+    summary statistics and correlations of the numeric columns, and the OLS
+    of y on x. Returns {"stats", "corr", "ols", "rows", "chunks"}.
+    """
+    x = list(x)
+    stats = moments = ols = None
+    rows = n_chunks = 0
+    for chunk in chunks:
+        if stats is None:
+            columns = [c for c in chunk.columns if c != date_column]
+            stats, moments, ols = RunningStats(columns), PairwiseMoments(columns), NormalEquations(x)
+        values = chunk[columns].to_numpy(dtype=np.float64)
+        stats.update(values)
+        moments.update(values)
+        ols.update(chunk[x].to_numpy(), chunk[y].to_numpy())
+        rows += len(chunk)
+        n_chunks += 1
+    if stats is None:
+        raise ValueError("No rows to analyze.")
+    return {"stats": stats.result(), "corr": moments.correlation(), "ols": ols.solve(),
+            "rows": rows, "chunks": n_chunks}
+
+
+def in_memory(df, y=DEFAULT_Y, x=DEFAULT_X, date_column=DATE_COLUMN):
+    """The same results from one DataFrame (describe(), corr(), least squares), for comparison."""
+    numeric = df.drop(columns=date_column, errors="ignore").astype(np.float64)
+    described = numeric.describe().loc[["count", "mean", "std", "min", "max"]]
+    data = numeric[[y, *x]].dropna()
+    X = np.column_stack([np.ones(len(data)), data[list(x)].to_numpy()])
+    beta = np.linalg.lstsq(X, data[y].to_numpy(), rcond=None)[0]
+    return {"stats": described, "corr": numeric.corr(), "params": pd.Series(beta, index=["const", *x])}
+
+
+def differences(streamed, reference):
+    """Largest absolute difference of stats, corr and params against in_memory()."""
+    stats = streamed["stats"].loc[reference["stats"].index, reference["stats"].columns]
+    return {
+        "stats": float(np.nanmax(np.abs(stats.to_numpy() - reference["stats"].to_numpy()))),
+        "corr": float(np.nanmax(np.abs(streamed["corr"].to_numpy() - reference["corr"].to_numpy()))),
+        "params": float(np.max(np.abs(streamed["ols"]["params"] - reference["params"]))),
+    }
+
+
+# --- Benchmark ---
+def synthetic_chunks(rows, chunksize=DEFAULT_CHUNK_ROWS, seed=0):
+    """gold.fuel_features-like compact chunks, generated one at a time."""
+    rng = np.random.default_rng(seed)
+    for start in range(0, rows, chunksize):
+        n = min(chunksize, rows - start)
+        i = np.arange(start, start + n)
+        oil = 80 + 20 * np.sin(i / 5_000) + rng.normal(0, 1, n)
+        rate = 2.7 + 0.2 * np.sin(i / 20_000) + rng.normal(0, 0.01, n)
+        chunk = {DATE_COLUMN: (18_900 + i).astype(np.int32)}
+        for k, grade in enumerate(["super", "premium", "g_force_regular", "regular"]):
+            chunk[grade] = (0.5 + 0.02 * oil + 0.2 * rate + 0.1 * k + rng.normal(0, 0.02, n)).astype(np.float32)
+        chunk["oil_price"] = oil.astype(np.float32)
+        chunk["currency_rate"] = rate.astype(np.float32)
+        # a few gaps, as with missing Brent / NBG days
+        chunk["oil_price"][rng.random(n) < 0.001] = np.nan
+        yield pd.DataFrame(chunk)
+
+
+def _peak(func):
+    """(result, seconds, peak traced bytes) of func()."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        result = func()
+        seconds = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, seconds, peak
+
+
+def _print_results(result):
+    with pd.option_context("display.width", 140, "display.max_columns", 20):
+        print(result["stats"].round(4))
+        print(result["corr"].round(4))
+    ols = result["ols"]
+    print(pd.DataFrame({"coef": ols["params"], "std err": ols["bse"]}).round(6))
+    print(f"R²: {ols['rsquared']:.4f}, RMSE: {ols['rmse']:.4f}, nobs: {ols['nobs']:,}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Summary, correlations and OLS over gold.fuel_features in chunks.")
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNK_ROWS)
+    parser.add_argument("--y", default=DEFAULT_Y)
+    parser.add_argument("--x", nargs="+", default=list(DEFAULT_X))
+    parser.add_argument("--compare", action="store_true", help="also run the in-memory path and print differences")
+    parser.add_argument("--benchmark", action="store_true", help="use synthetic data of --rows sizes instead")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000_000])
+    args = parser.parse_args(argv)
+
+    if not args.benchmark:
+        import db
+
+        with db.connect() as conn:
+            start = time.perf_counter()
+            result = analyze(read_chunks(conn, chunksize=args.chunksize), args.y, args.x)
+            print(f"⏱ {result['rows']:,} rows in {result['chunks']} chunks, {time.perf_counter() - start:.2f}s")
+            _print_results(result)
+            if args.compare:
+                from gold_features import read_features
+                diff = differences(result, in_memory(read_features(conn), args.y, args.x))
+                print("Largest differences vs in-memory: " + ", ".join(f"{k}={v:.2e}" for k, v in diff.items()))
+        return
+
+    for rows in args.rows:
+        streamed, seconds, peak = _peak(
+            lambda: analyze(synthetic_chunks(rows, args.chunksize), args.y, args.x))
+        print(f"⏱ {rows:>11,} rows streamed: {seconds:6.2f}s, peak {peak / 2**20:8.1f} MiB")
+        # Same data, as one float64 frame
+        reference, seconds, peak = _peak(
+            lambda: in_memory(pd.concat(synthetic_chunks(rows, args.chunksize), ignore_index=True),
+                              args.y, args.x))
+        print(f"⏱ {rows:>11,} rows in memory: {seconds:6.2f}s, peak {peak / 2**20:8.1f} MiB")
+        diff = differences(streamed, reference)
+        print("   largest differences: " + ", ".join(f"{k}={v:.2e}" for k, v in diff.items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+- Local columnar store for the scraped series (Brent prices, NBG rates)
+- Each dataset is a directory of Parquet files partitioned by date:
+    <root>/year=2025/month=11/part-<ns>.parquet
+- Appends only write new files for the new rows; existing partitions are
+  never read back in full or rewritten
+- Reads go through pyarrow.dataset on a memory-mapped filesystem, with the
+  date filter pushed down so unrelated partitions are skipped
+- export_csv / export_excel regenerate the old working files on demand
+"""
+
+import os
+import time
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from pyarrow.fs import LocalFileSystem
+from instrumentation import span
+
+PARTITION_COLUMNS = ['year', 'month']
+
+
+def _dataset(root):
+    return ds.dataset(root, format='parquet', partitioning='hive',
+                      filesystem=LocalFileSystem(use_mmap=True))
+
+
+def _has_data(root):
+    return os.path.isdir(root) and any(files for _, _, files in os.walk(root))
+
+
+def read(root, date_column='Date', columns=None, start=None, end=None):
+    """
+    Read a dataset (optionally only some columns) as a DataFrame sorted by date.
+    start / end are inclusive date bounds; partitions outside them are not opened.
+    """
+    if not _has_data(root):
+        return pd.DataFrame(columns=columns or [date_column])
+
+    expr = None
+    for bound, op in ((start, 'ge'), (end, 'le')):
+        if bound is None:
+            continue
+        bound = pd.Timestamp(bound)
+        year = ds.field('year')
+        date = ds.field(date_column)
+        if op == 'ge':
+            cond = (year >= bound.year) & (date >= pa.scalar(bound.to_pydatetime()))
+        else:
+            cond = (year <= bound.year) & (date <= pa.scalar(bound.to_pydatetime()))
+        expr = cond if expr is None else expr & cond
+
+    if columns is not None and date_column not in columns:
+        columns = [date_column] + list(columns)
+    table = _dataset(root).to_table(columns=columns, filter=expr)
+    df = table.to_pandas()
+    df = df.drop(columns=[c for c in PARTITION_COLUMNS if c in df.columns])
+    return df.sort_values(date_column, kind='stable').reset_index(drop=True)
+
+
+def append(root, df, date_column='Date'):
+    """
+    Add rows whose date is not in the dataset yet. Only the partitions the new
+    rows fall into are touched, and only by adding a file. Returns the rows written.
+    """
+    df = df.copy()
+    df[date_column] = pd.to_datetime(df[date_column]).dt.normalize()
+    df = df.dropna(subset=[date_column]).drop_duplicates(date_column)
+    if df.empty:
+        return df
+
+    existing = read(root, date_column, columns=[date_column],
+                    start=df[date_column].min(), end=df[date_column].max())
+    new = df[~df[date_column].isin(existing[date_column])]
+
+    with span("file_write", path=os.path.basename(os.path.normpath(root)), format="parquet") as s:
+        dates = new[date_column].dt
+        for (year, month), part in new.groupby([dates.year, dates.month]):
+            directory = os.path.join(root, f'year={year}', f'month={month:02d}')
+            os.makedirs(directory, exist_ok=True)
+            table = pa.Table.from_pandas(part.reset_index(drop=True), preserve_index=False)
+            path = os.path.join(directory, f'part-{time.time_ns()}.parquet')
+            pq.write_table(table, path)
+            s.add(rows=len(part), bytes=os.path.getsize(path))
+    return new.reset_index(drop=True)
+
+
+def dates(root, date_column='Date'):
+    """Just the date column, as a Series (cheap: one column, memory-mapped)."""
+    return read(root, date_column, columns=[date_column])[date_column]
+
+
+# --- Exporters ---
+def _export_frame(root, date_column, date_format, ascending):
+    df = read(root, date_column).sort_values(date_column, ascending=ascending, kind='stable')
+    df[date_column] = df[date_column].dt.strftime(date_format)
+    return df
+
+
+def export_csv(root, path, date_column='Date', date_format='%Y-%m-%d', ascending=False):
+    """Regenerate a CSV working file from the dataset (newest first by default)."""
+    with span("file_write", path=os.path.basename(path), format="csv") as s:
+        df = _export_frame(root, date_column, date_format, ascending)
+        df.to_csv(path, index=False)
+        s.add(rows=len(df), bytes=os.path.getsize(path))
+
+
+def export_excel(root, path, date_column='Date', date_format='%m/%d/%Y', ascending=False):
+    """Regenerate an Excel working file from the dataset (newest first by default)."""
+    with span("file_write", path=os.path.basename(path), format="excel") as s:
+        df = _export_frame(root, date_column, date_format, ascending)
+        df.to_excel(path, index=False)
+        s.add(rows=len(df), bytes=os.path.getsize(path))
@@ -0,0 +1,139 @@
+"""
+- Shared date normalization for the Excel/CSV/scraped date columns
+- Detects the column's format once from a small sample of distinct values,
+  then parses the whole column vectorized with that explicit format
+- Repeated strings are parsed once (values are factorized first), and
+  detected formats are memoized across calls
+- Replaces parse_mixed_dates (pandas' removed infer_datetime_format) and
+  the format-less pd.to_datetime calls
+
+Run directly to benchmark on million-row columns:
+    python date_parsing.py --rows 1000000
+"""
+
+import argparse
+import time
+from functools import lru_cache
+import numpy as np
+import pandas as pd
+
+# Formats seen in our sources, most common first:
+# bronze/CSV ISO dates, the Excel MM/DD/YYYY strings, investing.com, NBG timestamps
+CANDIDATE_FORMATS = (
+    "%Y-%m-%d",
+    "%m/%d/%Y",
+    "%b %d, %Y",
+    "%Y-%m-%d %H:%M:%S",
+    "%Y-%m-%dT%H:%M:%S",
+    "%Y-%m-%dT%H:%M:%S.%f",
+    "%Y-%m-%d %H:%M:%S.%f",
+    "%m/%d/%Y %H:%M:%S",
+    "%d.%m.%Y",
+    "%d/%m/%Y",
+    "%m/%d/%y",
+)
+DEFAULT_SAMPLE_SIZE = 50
+
+
+@lru_cache(maxsize=256)
+def _detect_format_cached(sample, formats):
+    best, best_hits = None, 0
+    column = pd.Series(sample, dtype=object)
+    for fmt in formats:
+        hits = int(pd.to_datetime(column, format=fmt, errors="coerce").notna().sum())
+        if hits == len(sample):
+            return fmt
+        if hits > best_hits:
+            best, best_hits = fmt, hits
+    return best
+
+
+def detect_format(values, sample_size=DEFAULT_SAMPLE_SIZE, formats=CANDIDATE_FORMATS):
+    """
+    Return the format that parses the most values of an evenly spaced sample
+    (the first one parsing all of them wins early), or None if none parses any.
+    """
+    values = [v for v in values if isinstance(v, str) and v.strip()]
+    if not values:
+        return None
+    step = max(1, len(values) // sample_size)
+    sample = tuple(v.strip() for v in values[::step][:sample_size])
+    return _detect_format_cached(sample, tuple(formats))
+
+
+def parse_date_column(series, fmt=None, sample_size=DEFAULT_SAMPLE_SIZE, formats=CANDIDATE_FORMATS):
+    """
+    Parse a column of dates to datetime64 (unparseable -> NaT).
+
+    Distinct strings are parsed once with an explicit format detected from a
+    sample (or fmt if given). Strings the detected format misses (a column
+    that mixes formats) get their own detection pass. Values that are
+    already dates/timestamps are converted directly.
+    """
+    series = pd.Series(series)
+    if pd.api.types.is_datetime64_any_dtype(series.dtype):
+        return series
+
+    codes, uniques = pd.factorize(series)
+    uniques = pd.Series(uniques, dtype=object)
+    is_text = uniques.map(lambda v: isinstance(v, str))
+
+    parsed = pd.Series(pd.NaT, index=uniques.index, dtype="datetime64[ns]")
+    if (~is_text).any():
+        parsed[~is_text] = pd.to_datetime(uniques[~is_text], errors="coerce")
+
+    pending = uniques[is_text].str.strip()
+    pending = pending[pending != ""]
+    first = True
+    while not pending.empty:
+        use_fmt = fmt if (first and fmt is not None) else detect_format(pending.tolist(), sample_size, formats)
+        first = False
+        if use_fmt is None:
+            break
+        attempt = pd.to_datetime(pending, format=use_fmt, errors="coerce")
+        ok = attempt.notna()
+        if not ok.any():
+            break
+        parsed[ok[ok].index] = attempt[ok]
+        pending = pending[~ok]
+
+    # factorize marks missing values with -1, which take() turns into NaT
+    values = pd.DatetimeIndex(parsed).take(codes, allow_fill=True, fill_value=pd.NaT)
+    return pd.Series(values, index=series.index, name=series.name)
+
+
+# --- Benchmark ---
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark parse_date_column against the current parsing.")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    days = pd.date_range("2021-10-01", periods=1500, freq="D")
+    rng = np.random.default_rng(0)
+    picks = days[rng.integers(0, len(days), size=args.rows)]
+
+    cases = {
+        "Excel MM/DD/YYYY": pd.Series(picks.strftime("%m/%d/%Y")),
+        "investing.com 'Nov 14, 2025'": pd.Series(picks.strftime("%b %d, %Y")),
+        "CSV ISO YYYY-MM-DD": pd.Series(picks.strftime("%Y-%m-%d")),
+    }
+    for label, column in cases.items():
+        start = time.perf_counter()
+        # normalize_dataframe: no explicit format
+        try:
+            old = pd.to_datetime(column, errors="coerce")
+        except ValueError:
+            old = None
+        old_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        new = parse_date_column(column)
+        new_s = time.perf_counter() - start
+
+        same = "n/a" if old is None else bool(old.equals(new.astype(old.dtype)))
+        print(f"{label:<30} {args.rows:,} rows: no-format {old_s:7.3f}s, "
+              f"detected+memoized {new_s:7.3f}s ({old_s / new_s:5.1f}x), same result: {same}")
+
+
+if __name__ == "__main__":
+    main()
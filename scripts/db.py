@@ -0,0 +1,416 @@
+"""
+- One database module for every script instead of a pyodbc.connect per file
+- Settings come from FUEL_DB_* environment variables, then an optional INI
+  file ([database] section of FUEL_DB_CONFIG, default db.ini next to the
+  scripts), then the defaults below (the original SQL Server warehouse)
+- Backends:
+    sqlserver  pyodbc, cursors created with fast_executemany
+    sqlite     local file (or :memory:), bronze/gold emulated with attached databases
+    duckdb     local file (or :memory:), bronze/gold as real schemas
+  The local backends create the bronze and gold tables from the same DDL
+  as DataWarehouse/*.sql, so pipelines and benchmarks run without SQL Server
+- connect() hands out connections from a per-process pool; close() returns
+  the connection to the pool, so stages reuse the same few connections
+- read_sql() reads a query into a DataFrame, optionally in chunks
+
+Run directly to print the effective settings and check the connection:
+    python db.py [--backend sqlite --path warehouse.sqlite]
+"""
+
+import argparse
+import atexit
+import configparser
+import os
+import queue
+import re
+import sqlite3
+import threading
+import time
+from datetime import date, datetime
+import pandas as pd
+
+# --- CONFIG ---
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+CONFIG_PATH = os.path.join(SCRIPTS_DIR, "db.ini")
+ENV_PREFIX = "FUEL_DB_"
+DEFAULTS = {
+    "backend": "sqlserver",
+    "driver": "ODBC Driver 17 for SQL Server",
+    "server": r"GPAGHAVA\GPAGAVA",
+    "database": "OilDataWarehouse",
+    "username": "",
+    "password": "",
+    "extra": "",  # appended to the ODBC connection string, e.g. "Encrypt=no;"
+    "path": "",  # sqlite/duckdb file; empty = local_warehouse.<backend> next to the scripts
+    "pool_size": "4",
+    "timeout": "30",  # seconds to wait for a free pooled connection
+}
+BACKENDS = ("sqlserver", "sqlite", "duckdb")
+DEFAULT_CHUNK_ROWS = 50_000
+
+# Same tables as DataWarehouse/bronze_ddl.sql and gold_ddl.sql
+BRONZE_DDL = [
+    """
+    CREATE TABLE IF NOT EXISTS bronze.gulf (
+        sales_date        DATE,
+        super             FLOAT,
+        premium           FLOAT,
+        g_force_regular   FLOAT,
+        regular           FLOAT
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS bronze.brent_oil (
+        trade_date         DATE,
+        price              FLOAT,
+        open_price         FLOAT,
+        high_price         FLOAT,
+        low_price          FLOAT,
+        vol                NVARCHAR(50),
+        change_percentage  FLOAT
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS bronze.currency_rates (
+        trade_date        DATE,
+        rate              FLOAT
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS bronze.quarantine (
+        dataset           NVARCHAR(50),
+        row_date          DATE,
+        reason            NVARCHAR(200),
+        payload           NVARCHAR(4000),
+        quarantined_at    DATETIME
+    )
+    """,
+]
+
+GOLD_DDL = [
+    """
+    CREATE TABLE IF NOT EXISTS gold.fuel_features (
+        feature_date      DATE NOT NULL PRIMARY KEY,
+        super             FLOAT,
+        premium           FLOAT,
+        g_force_regular   FLOAT,
+        regular           FLOAT,
+        oil_price         FLOAT,
+        currency_rate     FLOAT
+    )
+    """,
+]
+
+# SQLite stores DATE/DATETIME as ISO text
+sqlite3.register_adapter(date, date.isoformat)
+sqlite3.register_adapter(datetime, lambda dt: dt.isoformat(" "))
+
+
+# --- Settings ---
+def settings(**overrides):
+    """Effective settings: overrides, then FUEL_DB_* env vars, then the INI file, then DEFAULTS."""
+    merged = dict(DEFAULTS)
+    parser = configparser.ConfigParser(interpolation=None)
+    parser.read(os.environ.get(ENV_PREFIX + "CONFIG", CONFIG_PATH), encoding="utf-8")
+    if parser.has_section("database"):
+        merged.update({k: v for k, v in parser.items("database") if k in DEFAULTS})
+    merged.update({k: os.environ[ENV_PREFIX + k.upper()] for k in DEFAULTS if ENV_PREFIX + k.upper() in os.environ})
+    merged.update({k: str(v) for k, v in overrides.items() if v is not None})
+
+    unknown = set(overrides) - set(DEFAULTS)
+    if unknown:
+        raise ValueError(f"Unknown database setting(s) {sorted(unknown)}.")
+    merged["backend"] = merged["backend"].lower()
+    if merged["backend"] not in BACKENDS:
+        raise ValueError(f"Unknown backend {merged['backend']!r}; choose from {BACKENDS}.")
+    if merged["backend"] != "sqlserver" and not merged["path"]:
+        merged["path"] = os.path.join(SCRIPTS_DIR, f"local_warehouse.{merged['backend']}")
+    return merged
+
+
+def odbc_connection_string(config):
+    parts = [f"DRIVER={{{config['driver']}}};", f"SERVER={config['server']};", f"DATABASE={config['database']};"]
+    if config["username"]:
+        parts.append(f"UID={config['username']};PWD={config['password']};")
+    else:
+        # Windows Authentication
+        parts.append("Trusted_Connection=yes;")
+    return "".join(parts) + config["extra"]
+
+
+# --- Local backends ---
+def sqlite_connection(path=":memory:"):
+    """
+    Open a SQLite connection with the bronze and gold tables created.
+    Each schema is emulated with an attached database so the same
+    '<schema>.<table>' names used against SQL Server work unchanged.
+    """
+    conn = sqlite3.connect(path, check_same_thread=False)
+    for schema in ("bronze", "gold"):
+        schema_path = ":memory:" if path == ":memory:" else f"{path}.{schema}"
+        conn.execute(f"ATTACH DATABASE ? AS {schema}", (schema_path,))
+    for ddl in BRONZE_DDL + GOLD_DDL:
+        conn.execute(ddl)
+    conn.commit()
+    return conn
+
+
+def duckdb_connection(path=":memory:"):
+    """Open a DuckDB connection with the bronze and gold schemas and tables created."""
+    import duckdb
+
+    conn = duckdb.connect(path)
+    for schema in ("bronze", "gold"):
+        conn.execute(f"CREATE SCHEMA IF NOT EXISTS {schema}")
+    for ddl in BRONZE_DDL + GOLD_DDL:
+        # SQL Server FLOAT is double precision; DuckDB's FLOAT is single
+        conn.execute(re.sub(r"\bFLOAT\b", "DOUBLE", re.sub(r"\bNVARCHAR\b", "VARCHAR", ddl)))
+    return conn
+
+
+def local_connection(backend="sqlite", path=":memory:"):
+    """A standalone (unpooled) sqlite or duckdb connection with the warehouse tables created."""
+    if backend == "sqlite":
+        return sqlite_connection(path)
+    if backend == "duckdb":
+        return duckdb_connection(path)
+    raise ValueError(f"{backend!r} is not a local backend; choose 'sqlite' or 'duckdb'.")
+
+
+def _sqlserver_connection(config):
+    import pyodbc
+
+    return pyodbc.connect(odbc_connection_string(config))
+
+
+# --- Pool ---
+class PooledConnection:
+    """
+    A borrowed connection. Behaves like the driver connection; close() (or
+    leaving a with block) rolls back anything uncommitted and returns it to the pool.
+    """
+
+    def __init__(self, pool, raw):
+        self._pool = pool
+        self.raw = raw
+
+    def __getattr__(self, name):
+        if self.raw is None:
+            raise RuntimeError("Connection has been returned to the pool.")
+        return getattr(self.raw, name)
+
+    def close(self):
+        if self.raw is not None:
+            raw, self.raw = self.raw, None
+            self._pool.release(raw)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.raw is not None:
+            if exc_type is None:
+                self.raw.commit()
+            self.close()
+        return False
+
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
+
+
+class ConnectionPool:
+    """Up to `size` open connections for one backend, created on demand and reused."""
+
+    def __init__(self, config):
+        self.config = config
+        self.backend = config["backend"]
+        self.size = max(1, int(config["pool_size"]))
+        self.timeout = float(config["timeout"])
+        if self.backend == "sqlite" and config["path"] == ":memory:":
+            # Every in-memory SQLite connection is its own database, so share one
+            self.size = 1
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+        self._root = None
+
+    def _open(self):
+        if self.backend == "sqlserver":
+            return _sqlserver_connection(self.config)
+        if self.backend == "sqlite":
+            conn = sqlite_connection(self.config["path"])
+            conn.execute(f"PRAGMA busy_timeout = {int(self.timeout * 1000)}")
+            return conn
+        # DuckDB: further connections are cursors of the first, i.e. the same database
+        if self._root is None:
+            self._root = duckdb_connection(self.config["path"])
+        return self._root.cursor()
+
+    def acquire(self):
+        try:
+            return PooledConnection(self, self._idle.get_nowait())
+        except queue.Empty:
+            pass
+        with self._lock:
+            create = self._created < self.size
+            if create:
+                self._created += 1
+        if create:
+            try:
+                return PooledConnection(self, self._open())
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+        try:
+            return PooledConnection(self, self._idle.get(timeout=self.timeout))
+        except queue.Empty:
+            raise TimeoutError(f"No free {self.backend} connection after {self.timeout:.0f}s "
+                               f"(pool size {self.size}).") from None
+
+    def release(self, raw):
+        try:
+            raw.rollback()
+        except Exception:
+            # Broken (or, for DuckDB, no open transaction): keep it only if it still answers
+            try:
+                raw.cursor().execute("SELECT 1").fetchall()
+            except Exception:
+                self._discard(raw)
+                return
+        self._idle.put(raw)
+
+    def _discard(self, raw):
+        with self._lock:
+            self._created -= 1
+        try:
+            raw.close()
+        except Exception:
+            pass
+
+    def close(self):
+        while True:
+            try:
+                self._discard(self._idle.get_nowait())
+            except queue.Empty:
+                break
+        if self._root is not None:
+            self._root.close()
+            self._root = None
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(**overrides):
+    """The pool for the effective settings (one per process and settings)."""
+    config = settings(**overrides)
+    key = (os.getpid(), tuple(sorted(config.items())))
+    with _pools_lock:
+        if key not in _pools:
+            _pools[key] = ConnectionPool(config)
+        return _pools[key]
+
+
+def connect(**overrides):
+    """Borrow a connection from the pool; close() it (or use `with`) to give it back."""
+    return get_pool(**overrides).acquire()
+
+
+@atexit.register
+def close_pools():
+    with _pools_lock:
+        pools = [p for (pid, _), p in _pools.items() if pid == os.getpid()]
+        _pools.clear()
+    for pool in pools:
+        pool.close()
+
+
+# --- Helpers ---
+def raw_connection(conn):
+    """The driver connection behind a pooled one (or conn itself)."""
+    return conn.raw if isinstance(conn, PooledConnection) else conn
+
+
+def backend_of(conn):
+    raw = raw_connection(conn)
+    if isinstance(raw, sqlite3.Connection):
+        return "sqlite"
+    if type(raw).__module__.lstrip("_").startswith("duckdb"):
+        return "duckdb"
+    return "sqlserver"
+
+
+def is_local(conn):
+    """True for the SQLite / DuckDB backends, which use the local SQL dialect paths."""
+    return backend_of(conn) != "sqlserver"
+
+
+def cursor(conn):
+    """A cursor; on SQL Server with fast_executemany, so executemany binds whole parameter arrays."""
+    cur = raw_connection(conn).cursor()
+    if backend_of(conn) == "sqlserver":
+        cur.fast_executemany = True
+    return cur
+
+
+def _fetch_chunks(conn, sql, params, chunksize):
+    cur = raw_connection(conn).cursor()
+    try:
+        cur.execute(sql, list(params))
+        columns = [d[0] for d in cur.description]
+        while True:
+            rows = cur.fetchmany(chunksize)
+            if not rows:
+                break
+            yield pd.DataFrame.from_records([tuple(r) for r in rows], columns=columns)
+    finally:
+        cur.close()
+
+
+def read_sql(conn, sql, params=(), chunksize=None):
+    """
+    Run a query and return a DataFrame. With chunksize, return an iterator of
+    DataFrames of at most chunksize rows, fetched one chunk at a time.
+    """
+    if chunksize is not None:
+        return _fetch_chunks(conn, sql, params, chunksize)
+    if backend_of(conn) == "duckdb":
+        return raw_connection(conn).execute(sql, list(params)).df()
+    chunks = list(_fetch_chunks(conn, sql, params, DEFAULT_CHUNK_ROWS))
+    if chunks:
+        return pd.concat(chunks, ignore_index=True) if len(chunks) > 1 else chunks[0]
+    cur = raw_connection(conn).cursor()
+    try:
+        cur.execute(sql, list(params))
+        return pd.DataFrame(columns=[d[0] for d in cur.description])
+    finally:
+        cur.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Show the database settings and test the connection.")
+    parser.add_argument("--backend", choices=BACKENDS)
+    parser.add_argument("--path", help="sqlite/duckdb file")
+    args = parser.parse_args()
+
+    config = settings(backend=args.backend, path=args.path)
+    shown = (DEFAULTS if config["backend"] == "sqlserver"
+             else {k: None for k in ("backend", "path", "pool_size", "timeout")})
+    for key, value in ((k, config[k]) for k in shown):
+        print(f"{key:>10}: {'***' if key == 'password' and value else value}")
+    start = time.perf_counter()
+    with connect(backend=args.backend, path=args.path) as conn:
+        counts = {table: read_sql(conn, f"SELECT COUNT(*) AS n FROM {table}")["n"].iloc[0]
+                  for table in ("bronze.gulf", "bronze.brent_oil", "bronze.currency_rates", "gold.fuel_features")}
+    print(f"✅ Connected to {config['backend']} in {time.perf_counter() - start:.3f}s")
+    for table, n in counts.items():
+        print(f"   {table}: {n:,} rows")
+
+
+if __name__ == "__main__":
+    main()
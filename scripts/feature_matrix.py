@@ -0,0 +1,68 @@
+"""
+- Shared by the scripts that work on the whole gold feature history
+  (model_search.py, report_charts.py, forecasting.py)
+- load_features() reads gold.fuel_features, or a CSV export of it, in date order
+- pool_map() runs tasks on a process pool over one float64 matrix: the
+  matrix is placed once in shared memory and every worker maps it
+  read-only, so it is never pickled per task
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import numpy as np
+import pandas as pd
+
+# --- CONFIG ---
+DATE_COLUMN = "feature_date"
+
+# Attached in each worker by _attach(): (SharedMemory, ndarray view, column names)
+_shared = None
+
+
+def load_features(csv_path=None, columns=None):
+    """Gold features from a CSV export, or from gold.fuel_features, sorted by date."""
+    if csv_path:
+        df = pd.read_csv(csv_path, usecols=columns)
+    else:
+        import db
+        from gold_features import read_features
+        conn = db.connect()
+        try:
+            df = read_features(conn, columns=columns)
+        finally:
+            conn.close()
+    return df.sort_values(DATE_COLUMN).reset_index(drop=True)
+
+
+# --- Shared-memory process pool ---
+def _attach(name, shape, columns):
+    global _shared
+    shm = shared_memory.SharedMemory(name=name)
+    data = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+    data.flags.writeable = False
+    _shared = (shm, data, columns)
+
+
+def _call_in_worker(task):
+    func, arg = task
+    _, data, columns = _shared
+    return func(data, columns, arg)
+
+
+def pool_map(func, data, columns, args, workers, chunksize=1):
+    """
+    [func(data, columns, arg) for arg in args], run on workers processes.
+    func must be a module-level function; data is copied into shared memory
+    once, and the shared block is released when the pool is done.
+    """
+    data = np.asarray(data, dtype=np.float64)
+    shm = shared_memory.SharedMemory(create=True, size=max(data.nbytes, 1))
+    try:
+        np.ndarray(data.shape, dtype=np.float64, buffer=shm.buf)[:] = data
+        tasks = [(func, arg) for arg in args]
+        with ProcessPoolExecutor(max_workers=workers, initializer=_attach,
+                                 initargs=(shm.name, data.shape, columns)) as pool:
+            return list(pool.map(_call_in_worker, tasks, chunksize=chunksize))
+    finally:
+        shm.close()
+        shm.unlink()
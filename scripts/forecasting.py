@@ -0,0 +1,244 @@
+"""
+- Scenario pricing and Monte Carlo forecasts for the fuel-price regression
+- predict_grid() prices any number of (Oil_price, Currency_rate, ...)
+  scenarios as one matrix product per chunk, with prediction bands from the
+  coefficient covariance and the residual spread
+- simulate() draws Brent and GEL paths by bootstrapping historical daily
+  log returns (both on the same days, so their co-movement is kept), draws
+  coefficients from the fitted covariance per path, and returns quantile
+  bands of the fuel price per step ahead
+- Work is done in chunks of rows/paths. predict_grid() keeps one result row
+  per scenario; simulate() folds each chunk of paths into per-step
+  histograms, so its memory does not grow with the number of paths
+
+Run from the command line (fits premium ~ Oil_price + Currency_rate first):
+    python forecasting.py grid --oil 60 120 13 --rate 2.5 3.0 11
+    python forecasting.py simulate --horizon 60 --paths 1000000
+"""
+
+import argparse
+import time
+from statistics import NormalDist
+import numpy as np
+import pandas as pd
+from feature_matrix import load_features
+
+QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+DEFAULT_CHUNK_ROWS = 250_000
+DEFAULT_BINS = 4096  # per-step histogram bins in simulate()
+
+
+def _quantile_columns(quantiles):
+    return [f"q{q * 100:g}" for q in quantiles]
+
+
+def _regressors(params):
+    """Coefficient names other than the intercept, in params order."""
+    return [name for name in params.index if name != "const"]
+
+
+def _design(values, params):
+    """[1, x1, x2, ...] in the same order as params."""
+    columns = []
+    it = iter(values.T)
+    for name in params.index:
+        columns.append(np.ones(values.shape[0]) if name == "const" else next(it))
+    return np.column_stack(columns)
+
+
+def scenario_grid(**axes):
+    """
+    Every combination of the given values, e.g.
+    scenario_grid(Oil_price=np.linspace(60, 120, 13), Currency_rate=[2.6, 2.7, 2.8]).
+    """
+    names = list(axes)
+    values = [np.asarray(v, dtype=float) for v in axes.values()]
+    mesh = np.meshgrid(*values, indexing="ij")
+    return pd.DataFrame({name: m.ravel() for name, m in zip(names, mesh)})
+
+
+def predict_grid(scenarios, params, cov=None, residual_sd=None, quantiles=QUANTILES,
+                 chunk_rows=DEFAULT_CHUNK_ROWS):
+    """
+    Predicted fuel price for every row of scenarios (one column per regressor
+    in params). Returns scenarios plus 'mean' and one column per quantile.
+
+    Bands are normal: their variance is x' cov x (coefficient uncertainty)
+    plus residual_sd**2 (a single day's noise); with neither, they collapse
+    onto the mean.
+    """
+    params = pd.Series(params)
+    names = _regressors(params)
+    missing = [n for n in names if n not in scenarios.columns]
+    if missing:
+        raise ValueError(f"scenarios has no column(s) {missing}")
+
+    beta = params.to_numpy(dtype=float)
+    cov_m = None if cov is None else pd.DataFrame(cov).loc[params.index, params.index].to_numpy(dtype=float)
+    z = np.array([NormalDist().inv_cdf(q) for q in quantiles])
+    values = scenarios[names].to_numpy(dtype=float)
+
+    mean = np.empty(len(values))
+    bands = np.empty((len(values), len(quantiles)))
+    for lo in range(0, len(values), chunk_rows):
+        X = _design(values[lo:lo + chunk_rows], params)
+        mu = X @ beta
+        var = np.zeros(len(X)) if cov_m is None else np.einsum("ij,jk,ik->i", X, cov_m, X)
+        if residual_sd is not None:
+            var += residual_sd ** 2
+        mean[lo:lo + len(X)] = mu
+        bands[lo:lo + len(X)] = mu[:, None] + np.sqrt(var)[:, None] * z
+
+    out = scenarios.reset_index(drop=True).copy()
+    out["mean"] = mean
+    out[_quantile_columns(quantiles)] = bands
+    return out
+
+
+def _histogram_quantiles(counts, lo, width, quantiles):
+    """
+    Quantiles per row of counts (steps x bins, bins of width starting at lo),
+    interpolating linearly inside the bin a quantile falls in.
+    """
+    cdf = np.cumsum(counts, axis=1)
+    steps = np.arange(len(counts))
+    out = np.empty((len(counts), len(quantiles)))
+    for i, q in enumerate(quantiles):
+        target = q * cdf[:, -1]
+        j = np.minimum((cdf < target[:, None]).sum(axis=1), counts.shape[1] - 1)
+        below = np.where(j > 0, cdf[steps, j - 1], 0)
+        frac = (target - below) / np.maximum(counts[steps, j], 1)
+        out[:, i] = lo + (j + frac) * width
+    return out
+
+
+def simulate(history, params, cov=None, residual_sd=None, horizon=20, n_paths=100_000,
+             quantiles=QUANTILES, chunk_paths=50_000, seed=None, bins=DEFAULT_BINS):
+    """
+    Monte Carlo fuel-price bands for steps 1..horizon ahead.
+
+    history: regressor columns (e.g. Oil_price, Currency_rate) in date order.
+    Each path starts from the last row and applies whole days of historical
+    log returns drawn with replacement; each path also gets its own
+    coefficient draw from N(params, cov), and residual_sd adds daily noise.
+
+    Returns a DataFrame indexed by step with 'mean' and one column per
+    quantile. Paths are simulated chunk by chunk and each chunk is folded
+    into a running sum and a histogram per step (horizon x bins counts), so
+    memory depends on chunk_paths and bins, not n_paths. The bin range is
+    the first chunk's spread padded by half of it on either side; later
+    prices outside it are counted in the end bins. Quantiles are read off
+    the merged histograms, accurate to about one bin width.
+    """
+    params = pd.Series(params)
+    names = _regressors(params)
+    levels = history[names].astype(float).dropna()
+    returns = np.diff(np.log(levels.to_numpy()), axis=0)
+    if len(returns) == 0:
+        raise ValueError("history needs at least two complete rows.")
+    last = levels.to_numpy()[-1]
+
+    beta = params.to_numpy(dtype=float)
+    cov_m = None if cov is None else pd.DataFrame(cov).loc[params.index, params.index].to_numpy(dtype=float)
+    rng = np.random.default_rng(seed)
+
+    total = np.zeros(horizon)
+    counts = np.zeros((horizon, bins), dtype=np.int64)
+    offsets = np.arange(horizon) * bins
+    lo = width = None
+    for start in range(0, n_paths, chunk_paths):
+        size = min(chunk_paths, n_paths - start)
+        days = rng.integers(0, len(returns), size=(size, horizon))
+        # (paths, steps, regressors): cumulated log returns from the last observed level
+        paths = last * np.exp(np.cumsum(returns[days], axis=1))
+        if cov_m is None:
+            betas = np.broadcast_to(beta, (size, len(beta)))
+        else:
+            betas = rng.multivariate_normal(beta, cov_m, size=size, method="cholesky")
+
+        X = _design(paths.reshape(-1, len(names)), params).reshape(size, horizon, len(beta))
+        chunk = np.einsum("psk,pk->ps", X, betas)
+        if residual_sd is not None:
+            chunk += rng.normal(0.0, residual_sd, size=chunk.shape)
+
+        if lo is None:
+            low, high = chunk.min(axis=0), chunk.max(axis=0)
+            pad = np.maximum((high - low) / 2, np.abs(high) * 1e-6 + 1e-9)
+            lo = low - pad
+            width = (high + pad - lo) / bins
+        index = np.clip(((chunk - lo) / width).astype(np.int64), 0, bins - 1)
+        counts += np.bincount((index + offsets).ravel(), minlength=horizon * bins).reshape(horizon, bins)
+        total += chunk.sum(axis=0)
+
+    out = pd.DataFrame(_histogram_quantiles(counts, lo, width, quantiles), columns=_quantile_columns(quantiles))
+    out.insert(0, "mean", total / n_paths)
+    out.index = pd.RangeIndex(1, horizon + 1, name="step")
+    return out
+
+
+# --- Command line ---
+FEATURE_TO_REGRESSOR = {"oil_price": "Oil_price", "currency_rate": "Currency_rate"}
+
+
+def load_history(csv_path=None, grade="premium"):
+    """Complete rows of the grade and its regressors, from feature_matrix.load_features."""
+    df = load_features(csv_path, columns=["feature_date", grade, *FEATURE_TO_REGRESSOR])
+    return df.rename(columns=FEATURE_TO_REGRESSOR).dropna().reset_index(drop=True)
+
+
+def _linspace_arg(values):
+    start, stop, num = values
+    return np.linspace(float(start), float(stop), int(num))
+
+
+def fit_ols(history, grade="premium"):
+    """statsmodels OLS of grade on a constant, Oil_price and Currency_rate."""
+    import statsmodels.api as sm
+
+    X = sm.add_constant(history[list(FEATURE_TO_REGRESSOR.values())])
+    return sm.OLS(history[grade], X).fit()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Scenario and Monte Carlo fuel-price forecasts.")
+    parser.add_argument("--csv", help="gold feature CSV (default: read gold.fuel_features)")
+    parser.add_argument("--grade", default="premium",
+                        choices=["super", "premium", "g_force_regular", "regular"])
+    parser.add_argument("--out", help="write the result to this CSV")
+    parser.add_argument("--quantiles", type=float, nargs="+", default=list(QUANTILES))
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    grid = sub.add_parser("grid", help="price a grid of Brent x GEL/USD scenarios")
+    grid.add_argument("--oil", nargs=3, metavar=("START", "STOP", "NUM"), default=[60, 120, 13])
+    grid.add_argument("--rate", nargs=3, metavar=("START", "STOP", "NUM"), default=[2.5, 3.0, 11])
+
+    sim = sub.add_parser("simulate", help="Monte Carlo bands from bootstrapped Brent/GEL paths")
+    sim.add_argument("--horizon", type=int, default=30, help="business days ahead")
+    sim.add_argument("--paths", type=int, default=100_000)
+    sim.add_argument("--seed", type=int)
+    args = parser.parse_args(argv)
+
+    history = load_history(args.csv, args.grade)
+    model = fit_ols(history, args.grade)
+    residual_sd = float(np.sqrt(model.scale))
+
+    start = time.perf_counter()
+    if args.command == "grid":
+        scenarios = scenario_grid(Oil_price=_linspace_arg(args.oil), Currency_rate=_linspace_arg(args.rate))
+        result = predict_grid(scenarios, model.params, model.cov_params(), residual_sd, args.quantiles)
+        label = f"{len(result):,} scenarios"
+    else:
+        result = simulate(history, model.params, model.cov_params(), residual_sd,
+                          horizon=args.horizon, n_paths=args.paths, quantiles=args.quantiles, seed=args.seed)
+        label = f"{args.paths:,} paths x {args.horizon} steps"
+    print(f"⏱ {label} in {time.perf_counter() - start:.2f}s")
+
+    with pd.option_context("display.max_rows", 40, "display.width", 120):
+        print(result.round(4))
+    if args.out:
+        result.to_csv(args.out, index=args.command == "simulate")
+        print(f"✅ Saved to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
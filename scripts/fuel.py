@@ -0,0 +1,194 @@
+"""
+- One command-line entry point for the ingestion and analysis tools
+- Subcommands: ingest (gulf / brent / nbg), gold, fit, stats, forecast,
+  plot; stats, forecast and plot pass their arguments on to
+  chunked_analytics.py, forecasting.py and report_charts.py
+- Nothing heavy is imported at module level. Each subcommand's handler
+  imports only what that command uses (an ingest never loads statsmodels,
+  matplotlib or Selenium), then returns the work to run
+- --imports-only stops after that import phase; bench-imports runs every
+  subcommand that way in fresh interpreters and compares the cold start
+  with importing everything up front, as analysis.py and the Selenium
+  imports of brent_oil_scraper.py used to
+
+Run directly:
+    python fuel.py ingest gulf nbg
+    python fuel.py gold
+    python fuel.py fit --grade regular
+    python fuel.py stats --chunksize 50000
+    python fuel.py forecast simulate --horizon 60
+    python fuel.py plot --out-dir report --formats png svg
+    python fuel.py bench-imports --repeat 5
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+# --- CONFIG ---
+GRADES = ["super", "premium", "g_force_regular", "regular"]
+SCRIPT_PATH = os.path.abspath(__file__)
+SCRIPTS_DIR = os.path.dirname(SCRIPT_PATH)
+# What a run paid before: analysis.py's imports plus brent_oil_scraper's Selenium imports
+EAGER_IMPORTS = ["pandas", "numpy", "db", "statsmodels.api", "matplotlib.pyplot",
+                 "selenium.webdriver", "webdriver_manager.chrome"]
+PASSTHROUGH = ("stats", "forecast", "plot")
+BENCH_COMMANDS = [
+    ["ingest", "gulf"],
+    ["ingest", "brent"],
+    ["ingest", "nbg"],
+    ["gold"],
+    ["fit"],
+    ["stats"],
+    ["forecast", "grid"],
+    ["plot"],
+]
+
+
+# --- Subcommands ---
+# Each handler does its imports and returns a callable with the actual work.
+def _ingest(args):
+    import pipeline
+
+    steps = []
+    if "gulf" in args.sources:
+        import gulf_scraper_to_sql  # noqa: F401
+        steps.append(pipeline.run_gulf)
+    if "brent" in args.sources:
+        import brent_oil_scraper  # noqa: F401
+        import brent_oli_sql_exec_stored_procedure  # noqa: F401
+        steps += [pipeline.run_brent_scrape, pipeline.run_brent_load]
+    if "nbg" in args.sources:
+        import gel_to_usd_rates_to_sql  # noqa: F401
+        steps.append(pipeline.run_nbg)
+
+    def run():
+        for step in steps:
+            step()
+    return run
+
+
+def _gold(args):
+    import gold_features  # noqa: F401
+    import pipeline
+
+    return pipeline.run_gold
+
+
+def _fit(args):
+    import numpy as np
+    import statsmodels.api  # noqa: F401
+    from forecasting import fit_ols, load_history
+
+    def run():
+        model = fit_ols(load_history(args.csv, args.grade), args.grade)
+        print(model.summary())
+        print(f"RMSE: {np.sqrt(np.mean(model.resid ** 2)):.4f}")
+    return run
+
+
+def _stats(args):
+    import chunked_analytics
+
+    return lambda: chunked_analytics.main(args.passthrough)
+
+
+def _forecast(args):
+    import statsmodels.api  # noqa: F401
+    import forecasting
+
+    return lambda: forecasting.main(args.passthrough)
+
+
+def _plot(args):
+    import matplotlib
+    # Files only; never open a window
+    matplotlib.use("Agg")
+    import matplotlib.pyplot  # noqa: F401
+    import report_charts
+
+    return lambda: report_charts.main(args.passthrough)
+
+
+def _time_command(argv, repeat):
+    """Best wall time of a fresh interpreter running argv, or None if it fails."""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        # from the scripts folder, so `import db` resolves like it does for the scripts
+        done = subprocess.run(argv, capture_output=True, cwd=SCRIPTS_DIR)
+        elapsed = time.perf_counter() - start
+        if done.returncode != 0:
+            return None
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def _bench_imports(args):
+    def run():
+        floor = _time_command([sys.executable, "-c", "pass"], args.repeat)
+        eager = _time_command([sys.executable, "-c", "import " + ", ".join(EAGER_IMPORTS)], args.repeat)
+        print(f"⏱ {'python -c pass':<20} {floor:7.3f}s")
+        if eager is None:
+            print("⚠️ Could not import every eager module; comparing against nothing")
+        else:
+            print(f"⏱ {'eager imports':<20} {eager:7.3f}s")
+        for command in BENCH_COMMANDS:
+            seconds = _time_command([sys.executable, SCRIPT_PATH, "--imports-only", *command], args.repeat)
+            name = " ".join(command)
+            if seconds is None:
+                print(f"❌ {name:<20} failed to import")
+                continue
+            ratio = f" ({eager / seconds:4.1f}x faster)" if eager else ""
+            print(f"⏱ {name:<20} {seconds:7.3f}s{ratio}")
+    return run
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="fuel.py", description="Fuel price ingestion and analysis tools.")
+    parser.add_argument("--imports-only", action="store_true",
+                        help="import what the command needs, then exit (for timing cold starts)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    ingest = sub.add_parser("ingest", help="scrape a source and load it into bronze")
+    ingest.add_argument("sources", nargs="+", choices=["gulf", "brent", "nbg"])
+    ingest.set_defaults(handler=_ingest)
+
+    gold = sub.add_parser("gold", help="refresh gold.fuel_features")
+    gold.set_defaults(handler=_gold)
+
+    fit = sub.add_parser("fit", help="fit grade ~ Oil_price + Currency_rate and print RMSE")
+    fit.add_argument("--csv", help="gold feature CSV (default: read gold.fuel_features)")
+    fit.add_argument("--grade", default="premium", choices=GRADES)
+    fit.set_defaults(handler=_fit)
+
+    # Everything after these goes to the module's own parser
+    for name, handler, help_text in [
+            ("stats", _stats, "summary, correlations and OLS in chunks (see chunked_analytics.py)"),
+            ("forecast", _forecast, "scenario grid or Monte Carlo bands (see forecasting.py)"),
+            ("plot", _plot, "render the chart report headlessly (see report_charts.py)")]:
+        command = sub.add_parser(name, help=help_text, add_help=False)
+        command.set_defaults(handler=handler)
+
+    bench = sub.add_parser("bench-imports", help="time every subcommand's cold start")
+    bench.add_argument("--repeat", type=int, default=5)
+    bench.set_defaults(handler=_bench_imports)
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args, extra = parser.parse_known_args(argv)
+    if args.command in PASSTHROUGH:
+        args.passthrough = extra
+    elif extra:
+        parser.error(f"unrecognized arguments: {' '.join(extra)}")
+    work = args.handler(args)
+    if not args.imports_only:
+        work()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,106 +1,37 @@
+import argparse
+import os
 import requests
 import pandas as pd
 from datetime import datetime
-import pyodbc
+import columnar_store
+import db
+import nbg_backfill
+from date_parsing import parse_date_column
+from nbg_rates import extract_rates, latest_rates_wide
+from bulk_loader import bulk_load, merge_load, get_watermark
+from instrumentation import span
+from validation import validate_and_quarantine
 
 EXCEL_PATH = r"C:\Users\gpaghava\Desktop\Gulf fuel prices analysis\gel_to_usd_rates_2021_present.xlsx"
+STORE_PATH = r"C:\Users\gpaghava\Desktop\Gulf fuel prices analysis\store\gel_to_usd_rates"
+CURRENCIES_STORE_PATH = r"C:\Users\gpaghava\Desktop\Gulf fuel prices analysis\store\nbg_currencies"
 NBG_URL = "https://nbg.gov.ge/gw/api/ct/monetarypolicy/currencies/en/json"
 
-def parse_iso_date(s):
-    """Parse various ISO-like date strings to a datetime object (naive)."""
-    if s is None:
-        return None
-    s = s.strip()
-    # remove trailing Z if present
-    if s.endswith("Z"):
-        s = s[:-1]
-    # some values might be like "2025-11-13T17:01:11.812" or "2025-11-14 00:00:00.000"
-    try:
-        return datetime.fromisoformat(s)
-    except Exception:
-        # fallback: try common patterns
-        for fmt in ("%Y-%m-%dT%H:%M:%S.%f", "%Y-%m-%d %H:%M:%S.%f", "%Y-%m-%dT%H:%M:%S", "%Y-%m-%d"):
-            try:
-                return datetime.strptime(s, fmt)
-            except Exception:
-                continue
-    return None
-
 def get_usd_candidate_list(json_data):
     """
     Walk the JSON list and return candidate tuples (date_dt, rate)
     where date_dt is chosen from validFromDate (prefer) or date field.
     """
-    candidates = []
-
-    if not isinstance(json_data, list):
-        raise ValueError("Unexpected JSON structure: expected a list at top level.")
-
-    for entry in json_data:
-        # Case A: entry is a container with "currencies": [...]
-        if isinstance(entry, dict) and "currencies" in entry and isinstance(entry["currencies"], list):
-            # the entry may have its own 'date' or 'validFromDate' fields, but currencies may also have them
-            container_date = None
-            # try container-level validFromDate or date if exists
-            if "validFromDate" in entry:
-                container_date = parse_iso_date(entry.get("validFromDate"))
-            elif "date" in entry:
-                container_date = parse_iso_date(entry.get("date"))
-
-            for cur in entry["currencies"]:
-                try:
-                    if cur.get("code") == "USD":
-                        # prefer currency-level validFromDate if present
-                        cand_date = None
-                        if cur.get("validFromDate"):
-                            cand_date = parse_iso_date(cur.get("validFromDate"))
-                        elif cur.get("date"):
-                            cand_date = parse_iso_date(cur.get("date"))
-                        else:
-                            cand_date = container_date
-                        # rate may be numeric or a string — coerce to float
-                        rate_val = cur.get("rate")
-                        try:
-                            rate_val = float(rate_val)
-                        except Exception:
-                            # maybe rate is nested in rateFormated
-                            rf = cur.get("rateFormated")
-                            rate_val = float(rf.replace(",", "")) if rf else None
-                        candidates.append((cand_date, rate_val))
-                except Exception:
-                    continue
-
-        # Case B: entry itself might be a currency object with "code"
-        elif isinstance(entry, dict) and "code" in entry:
-            try:
-                if entry.get("code") == "USD":
-                    # pick validFromDate or date on this object
-                    cand_date = None
-                    if entry.get("validFromDate"):
-                        cand_date = parse_iso_date(entry.get("validFromDate"))
-                    elif entry.get("date"):
-                        cand_date = parse_iso_date(entry.get("date"))
-                    rate_val = entry.get("rate")
-                    try:
-                        rate_val = float(rate_val)
-                    except Exception:
-                        rf = entry.get("rateFormated")
-                        rate_val = float(rf.replace(",", "")) if rf else None
-                    candidates.append((cand_date, rate_val))
-            except Exception:
-                continue
-        else:
-            # Unknown entry shape — ignore
-            continue
-
-    return candidates
-
-def get_latest_usd_rate_and_date():
-    """Main helper: return (date_str_mmddyyyy, rate_float) or raise if not found."""
-    resp = requests.get(NBG_URL, timeout=15)
-    resp.raise_for_status()
-    data = resp.json()
-
+    with span("parse", source="nbg") as s:
+        usd = extract_rates(json_data, codes=["USD"])
+        s.add(rows=len(usd))
+    return [
+        (None if pd.isna(d) else d.to_pydatetime(), None if pd.isna(r) else float(r))
+        for d, r in zip(usd["date"], usd["rate"])
+    ]
+
+def usd_rate_from_payload(data):
+    """Return (date_dt, rate_float) of the most recent USD entry in one NBG payload."""
     candidates = get_usd_candidate_list(data)
     if not candidates:
         raise ValueError("No USD candidates found in JSON. Example JSON snippet needed.")
@@ -118,6 +49,21 @@ def get_latest_usd_rate_and_date():
     # if date is None but rate not None, those will be after filtering; prefer those with date
     best = max(filtered, key=lambda x: x[0] if x[0] is not None else datetime.min)
     best_date_dt, best_rate = best
+    return best_date_dt, float(best_rate)
+
+def fetch_nbg_payload():
+    with span("http_fetch", source="nbg") as s:
+        resp = requests.get(NBG_URL, timeout=15)
+        resp.raise_for_status()
+        s.add(bytes=len(resp.content))
+    return resp.json()
+
+def get_latest_usd_rate_and_date(data=None):
+    """Main helper: return (date_str_mmddyyyy, rate_float) or raise if not found."""
+    if data is None:
+        data = fetch_nbg_payload()
+
+    best_date_dt, best_rate = usd_rate_from_payload(data)
 
     if best_date_dt is None:
         # if still none, fall back to today
@@ -129,94 +75,186 @@ def get_latest_usd_rate_and_date():
 
 def parse_mixed_dates(series):
     """Safely parse mixed-format date column to datetime (naive)."""
-    return pd.to_datetime(series, errors="coerce", infer_datetime_format=True)
+    return parse_date_column(series)
 
 def append_rate_to_excel(excel_path, date_str_mmddyyyy, rate):
     """Append new row if date not present; write Excel back sorted newest first."""
     df = pd.read_excel(excel_path)
 
-    # normalize existing dates to datetime
+    # normalize existing dates to datetime (once; the new row is parsed on its own)
     df["Date_parsed"] = parse_mixed_dates(df["Date"])
     new_dt = datetime.strptime(date_str_mmddyyyy, "%m/%d/%Y")
 
     # check duplicates using parsed datetimes
-    if new_dt in df["Date_parsed"].values:
+    if (df["Date_parsed"] == new_dt).any():
         print("No new data — this date already exists in Excel.")
         return False
 
     # append new row (store Date as MM/DD/YYYY string to match your format)
-    new_row = {"Date": date_str_mmddyyyy, "rate": rate}
+    new_row = {"Date": date_str_mmddyyyy, "rate": rate, "Date_parsed": pd.Timestamp(new_dt)}
     df = pd.concat([df, pd.DataFrame([new_row])], ignore_index=True)
 
     # sort by parsed date descending
-    df["Date_parsed"] = parse_mixed_dates(df["Date"])
-    df = df.sort_values("Date_parsed", ascending=False).drop(columns=["Date_parsed"])
+    df = df.sort_values("Date_parsed", ascending=False)
 
     # ensure Date column formatting MM/DD/YYYY
-    df["Date"] = pd.to_datetime(df["Date"]).dt.strftime("%m/%d/%Y")
+    df["Date"] = df["Date_parsed"].dt.strftime("%m/%d/%Y")
+    df = df.drop(columns=["Date_parsed"])
 
     # Save back to Excel
-    df.to_excel(excel_path, index=False)
+    with span("file_write", path=os.path.basename(excel_path), format="excel") as s:
+        df.to_excel(excel_path, index=False)
+        s.add(rows=len(df), bytes=os.path.getsize(excel_path))
     print(f"Appended {date_str_mmddyyyy} -> {rate} to Excel.")
     return True
 
-def load_excel_into_sql_server(excel_path):
-    """Load the entire Excel file into SQL Server table bronze.currency_rates."""
-    
-    # 1. Read Excel
+def seed_store_from_excel(excel_path, store_path=STORE_PATH):
+    """One-off import of the existing Excel history into the columnar store."""
     df = pd.read_excel(excel_path)
-
-    # Normalize date column
-    df["Date"] = pd.to_datetime(df["Date"], errors="coerce").dt.date
+    df["Date"] = parse_date_column(df["Date"])
     df["rate"] = df["rate"].astype(float)
+    seeded = columnar_store.append(store_path, df[["Date", "rate"]])
+    print(f"Seeded {len(seeded)} rows from {excel_path} into {store_path}.")
+
+def append_rate_to_store(store_path, date_str_mmddyyyy, rate):
+    """Append the new rate as its own partition file if the date is not stored yet."""
+    new_row = pd.DataFrame({"Date": [datetime.strptime(date_str_mmddyyyy, "%m/%d/%Y")], "rate": [float(rate)]})
+    written = columnar_store.append(store_path, new_row)
+    if written.empty:
+        print("No new data — this date already exists in the store.")
+        return False
+    print(f"Appended {date_str_mmddyyyy} -> {rate} to the store.")
+    return True
 
-    # 2. Connect to SQL Server
-    conn_str = (
-        "DRIVER={ODBC Driver 17 for SQL Server};"
-        "SERVER=GPAGHAVA\\GPAGAVA;"
-        "DATABASE=OilDataWarehouse;"
-        "Trusted_Connection=yes;"
-    )
-
-    conn = pyodbc.connect(conn_str)
-    cursor = conn.cursor()
-
-    # 3. Insert rows
-    insert_sql = """
-        INSERT INTO bronze.currency_rates (trade_date, rate)
-        VALUES (?, ?)
+def load_store_into_sql_server(store_path=STORE_PATH, full_rebuild=False, conn=None):
     """
+    Load the columnar store into bronze.currency_rates. By default only the
+    partitions after the latest trade_date already in the table are read and
+    merged in (incremental); full_rebuild=True truncates the table and
+    reloads the whole store. An empty store leaves the table untouched.
+    Returns the number of rows loaded.
+    """
+    own_conn = conn is None
+    if own_conn:
+        conn = db.connect()
 
-    for idx, row in df.iterrows():
-        cursor.execute(insert_sql, row["Date"], row["rate"])
-
-    conn.commit()
-    cursor.close()
-    conn.close()
-
-    print("✔ All Excel rows loaded into SQL Server successfully.")
+    try:
+        watermark = None if full_rebuild else get_watermark(conn, "bronze.currency_rates", "trade_date")
+        start = None if watermark is None else pd.Timestamp(watermark) + pd.Timedelta(days=1)
+        df = columnar_store.read(store_path, "Date", start=start)
+        if df.empty:
+            if full_rebuild:
+                # Nothing to rebuild from: leave the table as it is
+                print(f"⚠️ The store at {store_path} is empty; bronze.currency_rates left unchanged.")
+            else:
+                print(f"✔ bronze.currency_rates already up to date (latest {watermark}).")
+            return 0
+        # Rows quarantined by an earlier run are not added to bronze.quarantine again
+        df = validate_and_quarantine(df, "currency_rates", conn)
+        df = df.rename(columns={"Date": "trade_date"})
+        df["trade_date"] = pd.to_datetime(df["trade_date"]).dt.date
+
+        if full_rebuild:
+            bulk_load(df, conn, "bronze.currency_rates", ["trade_date", "rate"], truncate=True)
+            print("✔ All stored rows reloaded into SQL Server successfully.")
+        elif df.empty:
+            print(f"✔ bronze.currency_rates already up to date (latest {watermark}).")
+        else:
+            merge_load(df, conn, "bronze.currency_rates", ["trade_date", "rate"], key_columns=["trade_date"])
+            print(f"✔ {len(df)} new rows merged into SQL Server (after {watermark}).")
+        return len(df)
+    finally:
+        if own_conn:
+            conn.close()
 
 
-def main():
+def merge_rows_into_sql_server(df, conn):
+    """
+    Upsert specific store rows (Date, rate) into bronze.currency_rates,
+    whatever the watermark, e.g. a backfilled range older than the latest trade_date.
+    """
+    if df.empty:
+        return 0
+    df = validate_and_quarantine(df.sort_values("Date"), "currency_rates", conn)
+    df = df.rename(columns={"Date": "trade_date"})
+    df["trade_date"] = pd.to_datetime(df["trade_date"]).dt.date
+    if not df.empty:
+        merge_load(df, conn, "bronze.currency_rates", ["trade_date", "rate"], key_columns=["trade_date"])
+        print(f"✔ {len(df)} backfilled rows merged into SQL Server "
+              f"({df['trade_date'].min()}..{df['trade_date'].max()}).")
+    return len(df)
+
+
+def update_rates(full_rebuild=False, export_excel=False, backfill=None,
+                 workers=nbg_backfill.DEFAULT_WORKERS, conn=None):
+    """
+    Fetch today's NBG rates (and optionally backfill a date range) into the
+    store, then load new rows into bronze.currency_rates. Raises on failure;
+    only the extra-currency store is best effort.
+    """
+    # Seed before anything else writes to the store, or a backfill would make it look seeded
+    if columnar_store.dates(STORE_PATH).empty:
+        seed_store_from_excel(EXCEL_PATH)
+
+    backfilled = pd.DataFrame(columns=["Date", "rate"])
+    if backfill:
+        rates = nbg_backfill.backfill(*backfill, parse_payload=usd_rate_from_payload,
+                                      url=NBG_URL, workers=workers)
+        backfilled = columnar_store.append(STORE_PATH, rates)
+        print(f"Backfilled {len(backfilled)} new dates into the store.")
+        if rates.attrs.get("failed_dates"):
+            print(f"⚠️ {len(rates.attrs['failed_dates'])} backfill dates failed; re-run the range to retry them.")
+
+    data = fetch_nbg_payload()
+    date_str, rate = get_latest_usd_rate_and_date(data)
+
+    # EUR/TRY/RUB (and USD) from the same payload, GEL per unit, one row per date
     try:
-        date_str, rate = get_latest_usd_rate_and_date()
+        columnar_store.append(CURRENCIES_STORE_PATH, latest_rates_wide(data))
     except Exception as e:
-        print("Failed to fetch USD rate from NBG JSON:", e)
-        return
-
+        print("Failed to store NBG currency rates:", e)
+
+    success = append_rate_to_store(STORE_PATH, date_str, rate)
+    if success:
+        print("Store updated successfully.")
+    if export_excel:
+        columnar_store.export_excel(STORE_PATH, EXCEL_PATH, date_format="%m/%d/%Y")
+        print(f"Excel regenerated at {EXCEL_PATH}.")
+
+    # NEW PART: load new rows (or everything with full_rebuild) into SQL Server
+    own_conn = conn is None
+    if own_conn:
+        conn = db.connect()
     try:
-        success = append_rate_to_excel(EXCEL_PATH, date_str, rate)
-        if success:
-            print("Excel updated successfully.")
-    except Exception as e:
-        print("Failed to append to Excel:", e)
-        return
+        watermark = None if full_rebuild else get_watermark(conn, "bronze.currency_rates", "trade_date")
+        loaded = load_store_into_sql_server(STORE_PATH, full_rebuild=full_rebuild, conn=conn)
+        if watermark is None:
+            return loaded
+        # The incremental load only reads dates after the watermark; backfilled ones up to it are merged here
+        older = backfilled[pd.to_datetime(backfilled["Date"]) <= pd.Timestamp(watermark)]
+        return loaded + merge_rows_into_sql_server(older, conn)
+    finally:
+        if own_conn:
+            conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fetch the NBG USD rate and load rates into SQL Server.")
+    parser.add_argument("--full-rebuild", action="store_true",
+                        help="truncate bronze.currency_rates and reload the whole history")
+    parser.add_argument("--export-excel", action="store_true",
+                        help="regenerate the Excel file from the store after updating it")
+    parser.add_argument("--backfill", nargs=2, metavar=("START", "END"),
+                        help="fetch every date in START..END (YYYY-MM-DD) instead of only today")
+    parser.add_argument("--workers", type=int, default=nbg_backfill.DEFAULT_WORKERS,
+                        help="concurrent requests for --backfill")
+    args = parser.parse_args()
 
-    # NEW PART: load everything into SQL Server
     try:
-        load_excel_into_sql_server(EXCEL_PATH)
+        update_rates(full_rebuild=args.full_rebuild, export_excel=args.export_excel,
+                     backfill=args.backfill, workers=args.workers)
     except Exception as e:
-        print("Failed to load data into SQL Server:", e)
+        print("Failed to update USD rates:", e)
 
 
 if __name__ == "__main__":
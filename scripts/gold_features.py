@@ -0,0 +1,134 @@
+"""
+- Builds and incrementally refreshes gold.fuel_features, the joined,
+  date-indexed table analysis.py reads from
+- One row per Gulf sales date with all four fuel grades, plus the Brent
+  price and GEL/USD rate as of that date: the most recent value on or
+  before it, so dates without an exact match are aligned rather than dropped
+- Only dates after the gold watermark (minus a short look-back window, to
+  pick up late corrections in bronze) are recomputed and merged
+- read_features() returns the table, or an iterator over it in chunks
+
+Run directly to refresh the table:
+    python gold_features.py [--full-rebuild]
+"""
+
+import argparse
+import time
+from datetime import timedelta
+import pandas as pd
+import db
+from bulk_loader import bulk_load, get_watermark, merge_load
+
+# --- CONFIG ---
+GOLD_TABLE = "gold.fuel_features"
+REFRESH_LOOKBACK_DAYS = 31
+FEATURE_COLUMNS = ["feature_date", "super", "premium", "g_force_regular", "regular",
+                   "oil_price", "currency_rate"]
+
+
+def _read(conn, sql, params=(), date_column=None):
+    df = db.read_sql(conn, sql, params)
+    if date_column is not None:
+        df[date_column] = pd.to_datetime(df[date_column])
+    return df
+
+
+def _read_asof_source(conn, table, date_column, value_column, alias, since):
+    """
+    Rows of table from the last date on or before `since` onwards, so the
+    first new gold date still has a prior value to align to.
+    """
+    if since is None:
+        sql = f"SELECT {date_column} AS d, {value_column} AS {alias} FROM {table}"
+        params = ()
+    else:
+        sql = (
+            f"SELECT {date_column} AS d, {value_column} AS {alias} FROM {table} "
+            f"WHERE {date_column} >= COALESCE("
+            f"(SELECT MAX({date_column}) FROM {table} WHERE {date_column} <= ?), ?)"
+        )
+        params = (since, since)
+    df = _read(conn, sql, params, "d").dropna(subset=["d", alias])
+    return df.drop_duplicates("d", keep="last").sort_values("d")
+
+
+def build_features(conn, since=None):
+    """Gold rows for Gulf dates >= since (all dates when None), joined as-of."""
+    sql = ("SELECT sales_date AS feature_date, super, premium, g_force_regular, regular "
+           "FROM bronze.gulf")
+    params = ()
+    if since is not None:
+        sql += " WHERE sales_date >= ?"
+        params = (since,)
+    gulf = _read(conn, sql, params, "feature_date")
+    gulf = gulf.drop_duplicates("feature_date", keep="last").sort_values("feature_date")
+    if gulf.empty:
+        return pd.DataFrame(columns=FEATURE_COLUMNS)
+
+    oil = _read_asof_source(conn, "bronze.brent_oil", "trade_date", "price", "oil_price", since)
+    rates = _read_asof_source(conn, "bronze.currency_rates", "trade_date", "rate", "currency_rate", since)
+
+    features = pd.merge_asof(gulf, oil, left_on="feature_date", right_on="d", direction="backward")
+    features = features.drop(columns=["d"])
+    features = pd.merge_asof(features, rates, left_on="feature_date", right_on="d", direction="backward")
+    features = features.drop(columns=["d"])
+
+    # Same rule as the old query's WHERE bo.price IS NOT NULL: no Brent price yet, no row
+    features = features.dropna(subset=["oil_price"])
+    features["feature_date"] = features["feature_date"].dt.date
+    return features[FEATURE_COLUMNS].reset_index(drop=True)
+
+
+def refresh_gold_features(conn, full_rebuild=False, lookback_days=REFRESH_LOOKBACK_DAYS):
+    """
+    Bring gold.fuel_features up to date and return {rows, since, seconds}.
+    Incremental runs recompute from (watermark - lookback_days) and upsert.
+    """
+    start = time.perf_counter()
+    watermark = None if full_rebuild else get_watermark(conn, GOLD_TABLE, "feature_date")
+    since = None if watermark is None else watermark - timedelta(days=lookback_days)
+
+    features = build_features(conn, since)
+    if full_rebuild:
+        bulk_load(features, conn, GOLD_TABLE, FEATURE_COLUMNS, truncate=True, verbose=False)
+    elif not features.empty:
+        merge_load(features, conn, GOLD_TABLE, FEATURE_COLUMNS, key_columns=["feature_date"], verbose=False)
+
+    result = {"rows": len(features), "since": since, "seconds": time.perf_counter() - start}
+    print(f"✅ {GOLD_TABLE}: {result['rows']} rows refreshed"
+          f"{'' if since is None else f' from {since}'} in {result['seconds']:.2f}s")
+    return result
+
+
+def _with_dates(df):
+    if "feature_date" in df.columns:
+        df["feature_date"] = pd.to_datetime(df["feature_date"])
+    return df
+
+
+def read_features(conn, columns=None, chunksize=None):
+    """
+    Read gold.fuel_features ordered by date. With chunksize, return an
+    iterator of DataFrames of at most chunksize rows, fetched one at a time.
+    """
+    column_list = ", ".join(columns or FEATURE_COLUMNS)
+    sql = f"SELECT {column_list} FROM {GOLD_TABLE} ORDER BY feature_date"
+    if chunksize is None:
+        return _with_dates(db.read_sql(conn, sql))
+    return map(_with_dates, db.read_sql(conn, sql, chunksize=chunksize))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Refresh gold.fuel_features.")
+    parser.add_argument("--full-rebuild", action="store_true", help="recompute every date")
+    args = parser.parse_args()
+
+    conn = db.connect()
+    try:
+        refresh_gold_features(conn, full_rebuild=args.full_rebuild)
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
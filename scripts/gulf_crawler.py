@@ -0,0 +1,262 @@
+"""
+- Concurrent crawler for the paginated Gulf fuel price table (?page=N)
+- Fetches pages in waves over one pooled requests.Session with a bounded
+  number of worker threads
+- Stops as soon as a page reaches dates already loaded in the warehouse
+  (the watermark), or runs out of rows
+- With a page cache (per page: content hash of its <tbody> and the rows it
+  held), pages whose hash is unchanged are not parsed, and an unchanged page
+  ends an incremental crawl: nothing was published or shifted past it. A
+  new price pushes the oldest row of every page onto the next one, so after
+  a changed page the crawl goes on (past the watermark too) until it meets
+  an unchanged page or the end of the table
+- FixturePageServer serves saved Gulf HTML pages locally, so the crawler can
+  be exercised without hitting gulf.ge:
+    python gulf_crawler.py --fixtures path/to/pages --workers 4
+"""
+
+import argparse
+import hashlib
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import HTTPServer, SimpleHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter
+from instrumentation import span
+from html_tables import iter_table_rows, rows_to_frame, to_date, to_float
+
+# --- CONFIG ---
+BASE_URL = 'https://gulf.ge/ge/fuel_prices?page='
+TABLE_ATTRIBS = ['Date', 'Super', 'Premium', 'G-Force Regular', 'Regular']
+ROW_CONVERTERS = [to_date('%Y-%m-%d'), to_float, to_float, to_float, to_float]
+DEFAULT_WORKERS = 4
+MAX_PAGES = 500
+
+
+# --- Session ---
+def make_session(pool_size=DEFAULT_WORKERS):
+    """requests.Session whose connection pool is sized for the worker count."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=2)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers.update({'User-Agent': 'Mozilla/5.0'})
+    return session
+
+
+# --- Parsing ---
+def parse_gulf_page(html, table_attribs=TABLE_ATTRIBS):
+    """Return the rows of the first <tbody> on a Gulf price page as a typed DataFrame."""
+    with span("parse", source="gulf") as s:
+        rows = iter_table_rows(html, scope='tbody', n_cells=len(table_attribs), converters=ROW_CONVERTERS)
+        df = rows_to_frame(rows, table_attribs)
+        s.add(rows=len(df), bytes=len(html))
+    return df
+
+
+def page_hash(content):
+    """sha256 of the raw <tbody>...</tbody> bytes (the whole page if there is none)."""
+    start = content.find(b'<tbody')
+    end = content.find(b'</tbody>', start)
+    if start != -1 and end != -1:
+        content = content[start:end]
+    return hashlib.sha256(content).hexdigest()
+
+
+def _cache_rows(df):
+    """A parsed page as JSON-friendly rows: [ISO date, price, ...] with None for gaps."""
+    dates = pd.to_datetime(df['Date']).dt.strftime('%Y-%m-%d')
+    values = df.drop(columns='Date').astype(float)
+    return [[d if isinstance(d, str) else None, *(None if v != v else v for v in row)]
+            for d, row in zip(dates, values.itertuples(index=False, name=None))]
+
+
+def _cached_frame(rows, table_attribs=TABLE_ATTRIBS):
+    df = pd.DataFrame(rows, columns=table_attribs)
+    df['Date'] = pd.to_datetime(df['Date'])
+    return df.astype({c: float for c in table_attribs[1:]})
+
+
+def cache_frame(page_cache, table_attribs=TABLE_ATTRIBS):
+    """All rows held in a page cache, newest first, one per date (lower pages win)."""
+    frames = [_cached_frame(page_cache[p]['rows'], table_attribs) for p in sorted(page_cache)]
+    if not frames:
+        return pd.DataFrame(columns=table_attribs)
+    df = pd.concat(frames, ignore_index=True).dropna(subset=['Date'])
+    return df.drop_duplicates('Date').sort_values('Date', ascending=False).reset_index(drop=True)
+
+
+def fetch_page(session, base_url, page, timeout=20):
+    with span("http_fetch", source="gulf") as s:
+        response = session.get(f'{base_url}{page}', timeout=timeout)
+        response.raise_for_status()
+        s.add(bytes=len(response.content))
+    return response.content
+
+
+# --- Crawler ---
+def crawl(base_url=BASE_URL, stop_date=None, max_workers=DEFAULT_WORKERS,
+          max_pages=MAX_PAGES, session=None, parse_page=parse_gulf_page, verbose=True,
+          page_cache=None):
+    """
+    Fetch ?page=1, 2, ... concurrently (max_workers at a time) and return all
+    parsed rows as one DataFrame with 'Date' as datetime, newest first.
+
+    Crawling stops after the first page whose oldest date is <= stop_date
+    (that page is kept so the caller still has the last known price at the
+    watermark), after a page with no rows, or after max_pages pages.
+
+    page_cache: {page: {"hash": ..., "rows": [...]}} from the previous run,
+    updated in place. Pages with an unchanged hash reuse their cached rows
+    instead of being parsed. With stop_date and a cache, the crawl stops at
+    the first unchanged page rather than at the watermark: rows shift from
+    page to page, so the cached pages after a changed one are stale until an
+    unchanged page proves the shift ended. If the crawl ends at max_pages
+    instead, the cached pages after it are dropped for the same reason.
+    """
+    own_session = session is None
+    if own_session:
+        session = make_session(max_workers)
+    stop_ts = pd.Timestamp(stop_date) if stop_date is not None else None
+
+    frames = []
+    pages_fetched = 0
+    pages_reused = 0
+    start = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            next_page = 1
+            done = False
+            # With a cached page 1, fetch it alone first: unchanged, it is the only request
+            probe = stop_ts is not None and page_cache is not None and 1 in page_cache
+            while not done and next_page <= max_pages:
+                size = 1 if probe and next_page == 1 else max_workers
+                wave = range(next_page, min(next_page + size, max_pages + 1))
+                htmls = list(pool.map(lambda p: fetch_page(session, base_url, p), wave))
+                pages_fetched += len(wave)
+                next_page = wave[-1] + 1
+
+                # Walk the wave in page order so pages past the stop point are ignored
+                for page, html in zip(wave, htmls):
+                    unchanged = False
+                    if page_cache is not None:
+                        digest = page_hash(html)
+                        cached = page_cache.get(page)
+                        unchanged = cached is not None and cached['hash'] == digest
+                    if unchanged:
+                        page_df = _cached_frame(cached['rows'])
+                        pages_reused += not page_df.empty
+                    else:
+                        page_df = parse_page(html)
+                        if page_cache is not None:
+                            page_cache[page] = {'hash': digest, 'rows': _cache_rows(page_df)}
+                    if page_df.empty:
+                        if page_cache is not None:
+                            # the table got shorter: forget pages past its end
+                            for stale in [p for p in page_cache if p > page]:
+                                del page_cache[stale]
+                        done = True
+                        break
+                    page_df['Date'] = pd.to_datetime(page_df['Date'])
+                    frames.append(page_df)
+                    if stop_ts is not None:
+                        if page_cache is None:
+                            done = page_df['Date'].min() <= stop_ts
+                        else:
+                            done = unchanged
+                        if done:
+                            break
+    finally:
+        if own_session:
+            session.close()
+
+    if page_cache is not None and not done:
+        for stale in [p for p in page_cache if p >= next_page]:
+            del page_cache[stale]
+
+    if frames:
+        result = pd.concat(frames, ignore_index=True)
+        result = result.drop_duplicates('Date').sort_values('Date', ascending=False).reset_index(drop=True)
+    else:
+        result = pd.DataFrame(columns=TABLE_ATTRIBS)
+
+    if verbose:
+        elapsed = time.perf_counter() - start
+        reused = f", {pages_reused} unchanged" if page_cache is not None else ""
+        print(f"🌐 Crawled {pages_fetched} pages ({len(frames)} with data{reused}), "
+              f"{len(result)} rows in {elapsed:.2f}s")
+    return result
+
+
+# --- Local fixture server ---
+class _FixtureHandler(SimpleHTTPRequestHandler):
+    """Serve page_<N>.html for any path with ?page=N (empty page=... means page 1)."""
+
+    def do_GET(self):
+        query = parse_qs(urlparse(self.path).query, keep_blank_values=True)
+        page = (query.get('page') or ['1'])[0] or '1'
+        path = os.path.join(self.directory, f'page_{page}.html')
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                body = f.read()
+        else:
+            body = b'<html><body><table><tbody></tbody></table></body></html>'
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FixturePageServer:
+    """
+    Context manager serving saved Gulf pages (page_1.html, page_2.html, ...)
+    from a directory on a free localhost port. base_url is usable as crawl()'s base_url.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._server = None
+        self._thread = None
+
+    def __enter__(self):
+        handler = lambda *a, **kw: _FixtureHandler(*a, directory=self.directory, **kw)
+        self._server = HTTPServer(('127.0.0.1', 0), handler)
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address
+        return f'http://{host}:{port}/ge/fuel_prices?page='
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Crawl Gulf fuel price pages.")
+    parser.add_argument('--fixtures', help="directory of saved page_<N>.html files to serve locally")
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS)
+    parser.add_argument('--stop-date', help="stop at this already-loaded date (YYYY-MM-DD)")
+    args = parser.parse_args()
+
+    if args.fixtures:
+        with FixturePageServer(args.fixtures) as server:
+            df = crawl(server.base_url, stop_date=args.stop_date, max_workers=args.workers)
+    else:
+        df = crawl(stop_date=args.stop_date, max_workers=args.workers)
+    print(df.head())
+
+
+if __name__ == '__main__':
+    main()
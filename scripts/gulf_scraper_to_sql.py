@@ -1,135 +1,186 @@
+import argparse
+import json
+import os
 import requests
-from bs4 import BeautifulSoup
 import pandas as pd
-import pyodbc
-from datetime import timedelta, datetime
+from datetime import datetime
+import db
+from bulk_loader import merge_load, get_watermark
+from gulf_crawler import cache_frame, crawl, parse_gulf_page
+from gap_fill import fill_business_days
+from instrumentation import span
+from validation import quarantine, summarize, validate
 
 # ---------- SQL CONFIG ----------
-server = 'GPAGHAVA\GPAGAVA'
-database = 'OilDataWarehouse'
+# Connection settings live in db.py (FUEL_DB_* environment variables / db.ini)
 table = 'bronze.gulf'
+columns = ['sales_date', 'super', 'premium', 'g_force_regular', 'regular']
+
+# Page hashes + parsed rows, and a fingerprint of every bronze.gulf row as last written.
+# FUEL_GULF_FETCH_STATE overrides the default store/ folder next to the scripts
+FETCH_STATE_PATH = os.environ.get('FUEL_GULF_FETCH_STATE',
+                                  os.path.join(db.SCRIPTS_DIR, 'store', 'gulf_fetch_state.json'))
 
 # ---------- SCRAPER ----------
 base_url = 'https://gulf.ge/ge/fuel_prices?page='
 table_attribs = ['Date', 'Super', 'Premium', 'G-Force Regular', 'Regular']
 
-def extract_page(url, table_attribs):
-    page = requests.get(url).text
-    data = BeautifulSoup(page, 'html.parser')
-    df = pd.DataFrame(columns=table_attribs)
-    tables = data.find_all('tbody')
-    rows = tables[0].find_all('tr')
-    for row in rows:
-        col = row.find_all('td')
-        if len(col) != 0:
-            data_dict = {
-                'Date': col[0].get_text(strip=True),
-                'Super': col[1].get_text(strip=True),
-                'Premium': col[2].get_text(strip=True),
-                'G-Force Regular': col[3].get_text(strip=True),
-                'Regular': col[4].get_text(strip=True)
-            }
-            df1 = pd.DataFrame(data_dict, index=[0])
-            df = pd.concat([df, df1], ignore_index=True)
-    return df
-
-
-# --- SCRAPE PAGE 1 ---
-result = extract_page(base_url, table_attribs)
-
-# Convert 'Date' column to datetime
-result['Date'] = pd.to_datetime(result['Date'], format='%Y-%m-%d')
-
-# Sort by date ascending (oldest first)
-result = result.sort_values('Date').reset_index(drop=True)
-
-# Prepare list for expanded rows
-expanded_rows = []
-
-# Fill missing weekdays between dates (bottom-up)
-for i in range(len(result) - 1, 0, -1):
-    current_row = result.iloc[i]
-    prev_row = result.iloc[i - 1]
-    current_date = current_row['Date']
-    prev_date = prev_row['Date']
-
-    expanded_rows.append(current_row)
-
-    # Fill weekdays between current_date and prev_date
-    date_to_fill = current_date - timedelta(days=1)
-    while date_to_fill > prev_date:
-        if date_to_fill.weekday() < 5:  # Mon–Fri
-            filled_row = current_row.copy()
-            filled_row['Date'] = date_to_fill
-            expanded_rows.append(filled_row)
-        date_to_fill -= timedelta(days=1)
-
-# Add the oldest record
-expanded_rows.append(result.iloc[0])
-
-# Combine and sort descending (latest first)
-final_df = pd.DataFrame(expanded_rows)
-final_df = final_df.sort_values('Date', ascending=False).reset_index(drop=True)
-
-# --- EXTEND TO TODAY (SKIP WEEKENDS) ---
-last_known_row = final_df.iloc[0].copy()
-last_date = pd.to_datetime(final_df.iloc[0]['Date'], errors='coerce')
-today = pd.Timestamp(datetime.now().date())
-
-# Add missing weekdays until today
-date_to_add = last_date + timedelta(days=1)
-while date_to_add <= today:
-    if date_to_add.weekday() < 5:  # Mon–Fri only
-        new_row = last_known_row.copy()
-        new_row['Date'] = date_to_add
-        final_df = pd.concat([pd.DataFrame([new_row]), final_df], ignore_index=True)
-    date_to_add += timedelta(days=1)
-
-# ---------- CLEAN AND MAP TO SQL ----------
-final_df.rename(columns={
-    'Date': 'sales_date',
-    'Super': 'super',
-    'Premium': 'premium',
-    'G-Force Regular': 'g_force_regular',
-    'Regular': 'regular'
-}, inplace=True)
-
-# Ensure correct data types
-final_df['sales_date'] = pd.to_datetime(final_df['sales_date'])
-for col in ['super', 'premium', 'g_force_regular', 'regular']:
-    final_df[col] = pd.to_numeric(final_df[col], errors='coerce')
-
-# ---------- SQL CONNECTION ----------
-conn_str = (
-    'DRIVER={SQL Server};'
-    f'SERVER={server};'
-    f'DATABASE={database};'
-    'Trusted_Connection=yes;'
-)
-conn = pyodbc.connect(conn_str)
-cursor = conn.cursor()
-
-cursor.execute("TRUNCATE TABLE bronze.gulf;")
-conn.commit()
-
-# ---------- INSERT DATA ----------
-insert_query = """
-INSERT INTO bronze.gulf (sales_date, super, premium, g_force_regular, regular)
-VALUES (?, ?, ?, ?, ?)
-"""
-
-for _, row in final_df.iterrows():
-    cursor.execute(insert_query, 
-                   row['sales_date'], 
-                   row['super'], 
-                   row['premium'], 
-                   row['g_force_regular'], 
-                   row['regular'])
-conn.commit()
-
-cursor.close()
-conn.close()
-
-print("✅ Fuel prices expanded, extended to today, and saved to SQL Server successfully!")
-
-
+def extract_page(url, table_attribs, timeout=20):
+    page = requests.get(url, timeout=timeout).content
+    return parse_gulf_page(page, table_attribs)
+
+
+def expand_weekdays(result):
+    """Fill missing weekdays between price changes and extend to today, latest first."""
+    today = pd.Timestamp(datetime.now().date())
+    with span("gap_fill", source="gulf") as s:
+        filled = fill_business_days(result, 'Date', end=today, ascending=False)
+        s.add(rows=len(filled))
+    return filled
+
+
+def to_sql_frame(final_df):
+    """Rename to the bronze.gulf columns and cast types."""
+    with span("normalize", source="gulf") as s:
+        final_df = final_df.rename(columns={
+            'Date': 'sales_date',
+            'Super': 'super',
+            'Premium': 'premium',
+            'G-Force Regular': 'g_force_regular',
+            'Regular': 'regular'
+        })
+
+        # Ensure correct data types
+        final_df['sales_date'] = pd.to_datetime(final_df['sales_date'])
+        for col in ['super', 'premium', 'g_force_regular', 'regular']:
+            final_df[col] = pd.to_numeric(final_df[col], errors='coerce')
+        s.add(rows=len(final_df))
+    return final_df
+
+
+# ---------- CHANGE DETECTION ----------
+def load_fetch_state(path=FETCH_STATE_PATH):
+    try:
+        with open(path, encoding='utf-8') as f:
+            state = json.load(f)
+    except (FileNotFoundError, ValueError):
+        state = {}
+    return {
+        'pages': {int(page): entry for page, entry in state.get('pages', {}).items()},
+        'rows': state.get('rows', {}),
+        'quarantined': state.get('quarantined', []),
+    }
+
+
+def save_fetch_state(state, path=FETCH_STATE_PATH):
+    # Written to a temp file and renamed, so a crash never leaves half a state behind
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = f'{path}.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(state, f)
+    os.replace(tmp, path)
+
+
+def fingerprint_series(df, key='sales_date'):
+    """64-bit hash of each whole row, as a Series aligned to df.index."""
+    frame = df.astype({c: float for c in df.columns if c != key})
+    frame[key] = pd.to_datetime(frame[key]).astype('datetime64[ns]')
+    return pd.util.hash_pandas_object(frame, index=False)
+
+
+def row_keys(df, key='sales_date'):
+    """ISO date of each row, the key fingerprints are saved under."""
+    return pd.to_datetime(df[key]).dt.strftime('%Y-%m-%d')
+
+
+def row_fingerprints(df, key='sales_date'):
+    """{ISO date: 64-bit hash of the whole row} for the given columns' frame."""
+    return dict(zip(row_keys(df, key), fingerprint_series(df, key).tolist()))
+
+
+def read_fingerprints(conn):
+    """Fingerprints of the rows currently in bronze.gulf."""
+    return row_fingerprints(db.read_sql(conn, f"SELECT {', '.join(columns)} FROM {table}"))
+
+
+def run(conn, full_rebuild=False, url=base_url, workers=4, state_path=FETCH_STATE_PATH):
+    """
+    Crawl Gulf prices and write the bronze.gulf rows that are new or changed.
+
+    Incremental (default): crawl pages until the loaded watermark. Pages
+    whose content hash is unchanged are not parsed, and the first unchanged
+    page ends the crawl (after a changed page, rows may have shifted onto
+    the next one). full_rebuild: crawl every page and compare against
+    the table itself instead of the saved fingerprints.
+
+    Every price change seen so far is expanded to weekdays and fingerprinted.
+    Only rows whose fingerprint differs are merged, in one transaction, so the
+    table is never emptied and readers never see a partial load.
+    Returns the number of rows written.
+    """
+    state = load_fetch_state(state_path)
+    watermark = None if full_rebuild else get_watermark(conn, table, 'sales_date')
+    # No saved fingerprints yet (or a full rebuild): start from what the table holds
+    known = state['rows'] if state['rows'] and not full_rebuild else read_fingerprints(conn)
+
+    # ---------- SCRAPE ----------
+    crawl(url, stop_date=watermark, max_workers=workers, page_cache=state['pages'])
+    result = cache_frame(state['pages'], table_attribs)
+    if result.empty:
+        print('No fuel price rows scraped.')
+        return 0
+
+    # Bad rows go to bronze.quarantine (once, not on every run); the gap-fill then
+    # carries the last good price over their dates. Every run validates the whole
+    # cached history, so a big move held back as jump_pending on the newest date
+    # is loaded once the next price shows the new level holds
+    result, rejected = validate(result, 'gulf')
+    rejected_prints = pd.util.hash_pandas_object(rejected[table_attribs], index=False).tolist()
+    new_rejects = rejected[~pd.Series(rejected_prints, index=rejected.index).isin(state['quarantined'])]
+    if not new_rejects.empty:
+        print(f"⚠️ Quarantined {len(new_rejects)} gulf rows ({summarize(new_rejects)})")
+        quarantine(new_rejects, conn, 'gulf')
+    if result.empty:
+        print('No valid fuel price rows scraped.')
+        return 0
+
+    final_df = to_sql_frame(expand_weekdays(result))[columns]
+    # Compared row by row on final_df's index, so order and repeated dates cannot misalign it
+    fingerprints = fingerprint_series(final_df)
+    keys = row_keys(final_df)
+    # (object dtype: the uint64 hashes must not round-trip through float)
+    saved = keys.map(pd.Series(known, dtype=object))
+    changed = final_df[saved.ne(fingerprints.astype(object))]
+
+    # ---------- INSERT DATA ----------
+    if changed.empty:
+        print(f'✅ bronze.gulf already up to date ({len(final_df)} rows checked).')
+    else:
+        # Inserts the new days and updates changed ones in a single transaction
+        merge_load(changed, conn, table, columns, key_columns=['sales_date'])
+
+    state['rows'] = {**known, **dict(zip(keys, fingerprints.tolist()))}
+    state['quarantined'] = rejected_prints
+    save_fetch_state(state, state_path)
+    return len(changed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Scrape Gulf fuel prices into bronze.gulf.')
+    parser.add_argument('--full-rebuild', action='store_true',
+                        help='crawl every page and compare against the whole table (still only writes changes)')
+    parser.add_argument('--workers', type=int, default=4, help='concurrent page fetches')
+    args = parser.parse_args()
+
+    # ---------- SQL CONNECTION ----------
+    conn = db.connect()
+    try:
+        run(conn, full_rebuild=args.full_rebuild, workers=args.workers)
+    finally:
+        conn.close()
+
+    print("✅ Fuel prices expanded, extended to today, and saved to the warehouse successfully!")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,146 @@
+"""
+- Streaming HTML table row extractor shared by the Gulf and Brent scrapers
+- Uses lxml's iterparse, so rows are yielded as soon as each </tr> is parsed
+  and finished rows are freed: time and memory stay linear in the page size
+- Rows come out as tuples, optionally typed through per-column converters;
+  the DataFrame is built once at the end (rows_to_frame)
+
+Run directly to benchmark against the old BeautifulSoup + per-row pd.concat parser:
+    python html_tables.py --sizes 500 5000 50000
+"""
+
+import argparse
+import time
+from datetime import datetime
+from io import BytesIO
+import pandas as pd
+from lxml import etree
+
+
+# --- Converters ---
+def to_float(text):
+    """'1,234.5' -> 1234.5, anything unparseable -> None (same as errors='coerce')."""
+    try:
+        return float(text.replace(',', ''))
+    except (AttributeError, ValueError):
+        return None
+
+
+def to_date(fmt):
+    """Converter factory: parse text with an explicit strptime format, None on failure."""
+    def convert(text):
+        try:
+            return datetime.strptime(text, fmt)
+        except (TypeError, ValueError):
+            return None
+    return convert
+
+
+# --- Extractor ---
+def _cell_text(td):
+    # Same as BeautifulSoup's get_text(strip=True): stripped fragments joined with ''
+    return ''.join(s.strip() for s in td.itertext())
+
+
+def iter_table_rows(html, scope='tbody', n_cells=None, exact=False, converters=None):
+    """
+    Yield the <td> texts of every <tr> inside the first <scope> element
+    ('tbody' or 'table') of html as tuples.
+
+    n_cells    -- skip rows with fewer cells (or a different count if exact=True);
+                  longer rows are cut to n_cells
+    converters -- optional sequence of callables applied per column
+    """
+    encoding = None
+    if isinstance(html, str):
+        html, encoding = html.encode('utf-8'), 'utf-8'
+
+    first_scope = None
+    context = etree.iterparse(BytesIO(html), events=('end',), tag='tr', html=True,
+                              encoding=encoding, recover=True)
+    for _, tr in context:
+        owner = next(tr.iterancestors(scope), None)
+        if owner is None:
+            continue
+        if first_scope is None:
+            first_scope = owner
+        elif owner is not first_scope:
+            # trs are reported in document order, so the first scope has ended
+            break
+
+        cells = [_cell_text(td) for td in tr.iterchildren('td')]
+
+        # Free the finished row and everything before it
+        tr.clear()
+        parent = tr.getparent()
+        while tr.getprevious() is not None:
+            del parent[0]
+
+        if not cells:
+            continue
+        if n_cells is not None:
+            if len(cells) < n_cells or (exact and len(cells) != n_cells):
+                continue
+            cells = cells[:n_cells]
+        if converters is not None:
+            cells = [conv(value) if conv else value for conv, value in zip(converters, cells)]
+        yield tuple(cells)
+
+
+def rows_to_frame(rows, columns):
+    """Build the DataFrame once from an iterable of row tuples."""
+    return pd.DataFrame.from_records(list(rows), columns=columns)
+
+
+# --- Benchmark ---
+def _synthetic_table(n_rows):
+    days = pd.date_range('1950-01-01', periods=min(n_rows, 30_000)).strftime('%Y-%m-%d')
+    rows = ''.join(
+        f'<tr><td>{days[i % len(days)]}</td><td>3.{i % 10}9</td>'
+        f'<td>3.{i % 7}5</td><td>2.{i % 5}9</td><td>2.{i % 3}5</td></tr>'
+        for i in range(n_rows)
+    )
+    return f'<html><body><table><thead><tr><th>Date</th></tr></thead><tbody>{rows}</tbody></table></body></html>'
+
+
+def _old_extract(html, table_attribs):
+    # The original extract_page body: html.parser + one pd.concat per row
+    from bs4 import BeautifulSoup
+
+    data = BeautifulSoup(html, 'html.parser')
+    df = pd.DataFrame(columns=table_attribs)
+    for row in data.find_all('tbody')[0].find_all('tr'):
+        col = row.find_all('td')
+        if len(col) != 0:
+            df1 = pd.DataFrame({a: col[i].get_text(strip=True) for i, a in enumerate(table_attribs)}, index=[0])
+            df = pd.concat([df, df1], ignore_index=True)
+    return df
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the streaming table parser.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[500, 5_000, 50_000, 200_000])
+    parser.add_argument('--old-max', type=int, default=5_000, help="largest size to run the old parser on")
+    args = parser.parse_args()
+
+    columns = ['Date', 'Super', 'Premium', 'G-Force Regular', 'Regular']
+    converters = [to_date('%Y-%m-%d'), to_float, to_float, to_float, to_float]
+    print(f"{'rows':>8} {'streaming s':>12} {'us/row':>8} {'old s':>10} {'us/row':>8}")
+    for n in args.sizes:
+        html = _synthetic_table(n)
+        start = time.perf_counter()
+        df = rows_to_frame(iter_table_rows(html, n_cells=5, converters=converters), columns)
+        new_s = time.perf_counter() - start
+        assert len(df) == n
+
+        old = ''
+        if n <= args.old_max:
+            start = time.perf_counter()
+            _old_extract(html, columns)
+            old_s = time.perf_counter() - start
+            old = f"{old_s:>10.3f} {old_s / n * 1e6:>8.1f}"
+        print(f"{n:>8} {new_s:>12.3f} {new_s / n * 1e6:>8.1f} {old}")
+
+
+if __name__ == '__main__':
+    main()
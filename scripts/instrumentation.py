@@ -0,0 +1,248 @@
+"""
+- Shared instrumentation for the ingestion and analysis scripts
+- span(name, **labels) times one step (HTTP fetch, parse, normalize,
+  gap-fill, file write, DB load, ...); the step reports rows / bytes with
+  s.add(rows=..., bytes=...), and rows/sec, bytes/sec and peak memory are
+  derived from them
+- Peak memory is tracemalloc's, i.e. process-wide: the most traced Python
+  memory while the span was open, including spans nested in it. A span that
+  overlapped a span on another thread records none (null), since that peak
+  mixes both threads' allocations
+- Each finished span is appended as one JSON line; totals per span and
+  labels are written as a Prometheus textfile (for node_exporter's textfile
+  collector) when the process exits, or on flush()
+- Off by default. When disabled, span() returns a shared no-op object, so
+  the instrumented code only pays for one function call and one check
+- Enable with the FUEL_METRICS_DIR environment variable (read at import)
+  or enable(directory); FUEL_METRICS_MEMORY=0 turns off tracemalloc-based
+  peak memory tracking, which slows allocation-heavy code while on
+
+Usage:
+    from instrumentation import span
+    with span("db_load", table="bronze.gulf") as s:
+        ...
+        s.add(rows=len(df))
+"""
+
+import atexit
+import json
+import os
+import re
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+from datetime import datetime, timezone
+
+# --- CONFIG ---
+METRIC_PREFIX = "fuel_pipeline"
+JSONL_NAME = "spans.jsonl"
+
+_config = None
+_lock = threading.Lock()
+_local = threading.local()
+_open_spans = set()
+_totals = {}
+
+
+class _NoopSpan:
+    """What span() returns while instrumentation is off."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def add(self, rows=0, bytes=0):
+        pass
+
+
+_NOOP = _NoopSpan()
+
+
+class Span:
+    def __init__(self, name, labels):
+        self.name = name
+        self.labels = labels
+        self.rows = 0
+        self.bytes = 0
+        self.peak_memory = 0
+        self.parent = None
+        self.thread = threading.get_ident()
+        # Set when a span on another thread was open at the same time
+        self.overlapped = False
+
+    def add(self, rows=0, bytes=0):
+        """Count rows / bytes handled by this step (may be called repeatedly)."""
+        self.rows += int(rows or 0)
+        self.bytes += int(bytes or 0)
+
+    def __enter__(self):
+        stack = _stack()
+        self.parent = stack[-1].name if stack else None
+        stack.append(self)
+        _memory_checkpoint()
+        with _lock:
+            for s in _open_spans:
+                if s.thread != self.thread:
+                    s.overlapped = self.overlapped = True
+            _open_spans.add(self)
+        self._wall = datetime.now(timezone.utc)
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        seconds = time.perf_counter() - self._start
+        _memory_checkpoint()
+        with _lock:
+            _open_spans.discard(self)
+        stack = _stack()
+        if stack and stack[-1] is self:
+            stack.pop()
+        _record(self, seconds, "error" if exc_type else "ok")
+        return False
+
+
+def _stack():
+    if not hasattr(_local, "stack"):
+        _local.stack = []
+    return _local.stack
+
+
+def _memory_checkpoint():
+    """Fold the traced peak since the last checkpoint into every open span, then reset it."""
+    if not (_config and _config["trace_memory"] and tracemalloc.is_tracing()):
+        return
+    with _lock:
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        for s in _open_spans:
+            s.peak_memory = max(s.peak_memory, peak)
+
+
+def _record(s, seconds, status):
+    config = _config
+    if config is None:
+        return
+    event = {
+        "ts": s._wall.isoformat(timespec="milliseconds"),
+        "run_id": config["run_id"],
+        "script": config["script"],
+        "span": s.name,
+        "parent": s.parent,
+        "status": status,
+        "seconds": round(seconds, 6),
+        "rows": s.rows,
+        "bytes": s.bytes,
+        "rows_per_sec": round(s.rows / seconds, 3) if seconds > 0 and s.rows else None,
+        "bytes_per_sec": round(s.bytes / seconds, 3) if seconds > 0 and s.bytes else None,
+        "peak_memory_bytes": s.peak_memory if config["trace_memory"] and not s.overlapped else None,
+        **{k: str(v) for k, v in s.labels.items()},
+    }
+    key = (s.name, tuple(sorted((k, str(v)) for k, v in s.labels.items())))
+    with _lock:
+        with open(config["jsonl_path"], "a", encoding="utf-8") as f:
+            f.write(json.dumps(event) + "\n")
+        total = _totals.setdefault(key, {"count": 0, "errors": 0, "seconds": 0.0, "rows": 0, "bytes": 0,
+                                         "last_seconds": 0.0, "last_rows_per_sec": 0.0, "peak_memory": 0})
+        total["count"] += 1
+        total["errors"] += status == "error"
+        total["seconds"] += seconds
+        total["rows"] += s.rows
+        total["bytes"] += s.bytes
+        total["last_seconds"] = seconds
+        total["last_rows_per_sec"] = event["rows_per_sec"] or 0.0
+        total["peak_memory"] = max(total["peak_memory"], event["peak_memory_bytes"] or 0)
+
+
+# --- Public API ---
+def span(name, **labels):
+    """Context manager timing one step; a no-op unless instrumentation is enabled."""
+    if _config is None:
+        return _NOOP
+    return Span(name, labels)
+
+
+def is_enabled():
+    return _config is not None
+
+
+def enable(directory, script=None, trace_memory=True):
+    """Start writing spans to <directory>/spans.jsonl and totals to <directory>/<script>.prom."""
+    global _config
+    os.makedirs(directory, exist_ok=True)
+    script = script or os.path.splitext(os.path.basename(sys.argv[0] or "python"))[0] or "python"
+    if trace_memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    _config = {
+        "directory": directory,
+        "script": script,
+        "run_id": uuid.uuid4().hex[:12],
+        "trace_memory": trace_memory,
+        "jsonl_path": os.path.join(directory, JSONL_NAME),
+        "prom_path": os.path.join(directory, f"{re.sub(r'[^A-Za-z0-9_.-]', '_', script)}.prom"),
+    }
+
+
+def disable():
+    """Flush the textfile and stop recording."""
+    global _config
+    if _config is None:
+        return
+    flush()
+    if _config["trace_memory"] and tracemalloc.is_tracing():
+        tracemalloc.stop()
+    _config = None
+    _totals.clear()
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(script, name, labels):
+    pairs = [("script", script), ("span", name), *labels]
+    return "{" + ",".join(f'{re.sub(r"[^A-Za-z0-9_]", "_", k)}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+METRICS = [
+    # (suffix, type, help, field)
+    ("span_runs_total", "counter", "Finished spans.", "count"),
+    ("span_errors_total", "counter", "Spans that raised.", "errors"),
+    ("span_seconds_total", "counter", "Time spent in the span.", "seconds"),
+    ("span_rows_total", "counter", "Rows handled in the span.", "rows"),
+    ("span_bytes_total", "counter", "Bytes handled in the span.", "bytes"),
+    ("span_last_seconds", "gauge", "Duration of the most recent span.", "last_seconds"),
+    ("span_last_rows_per_second", "gauge", "Throughput of the most recent span.", "last_rows_per_sec"),
+    ("span_peak_memory_bytes", "gauge",
+     "Largest process-wide traced Python memory peak in the span (spans that overlapped another thread excluded).",
+     "peak_memory"),
+]
+
+
+def flush():
+    """Write the Prometheus textfile (atomically: temp file + rename)."""
+    config = _config
+    if config is None:
+        return
+    with _lock:
+        items = sorted(_totals.items())
+        lines = []
+        for suffix, kind, help_text, field in METRICS:
+            metric = f"{METRIC_PREFIX}_{suffix}"
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} {kind}")
+            for (name, labels), total in items:
+                lines.append(f"{metric}{_format_labels(config['script'], name, labels)} {total[field]}")
+    tmp = f"{config['prom_path']}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+    os.replace(tmp, config["prom_path"])
+
+
+atexit.register(flush)
+
+if os.environ.get("FUEL_METRICS_DIR"):
+    enable(os.environ["FUEL_METRICS_DIR"], trace_memory=os.environ.get("FUEL_METRICS_MEMORY", "1") != "0")
@@ -0,0 +1,169 @@
+"""
+- How many business days Brent and GEL/USD moves take to reach pump prices
+- Cross-correlation at every lag at once via FFT, for levels or log returns,
+  between each driver (oil_price, currency_rate) and each fuel column
+- Gaps are handled exactly: each lag uses only the pairs where both sides
+  were observed (same as Series.corr with shift), built from six FFT
+  correlations of the masked sums
+- Forward-filled rows (a driver repeating its previous value, e.g. Brent
+  copied over a holiday) can be masked out, so they do not add fake zero
+  returns
+
+Run directly to benchmark against a shift().corr() loop:
+    python lag_analysis.py --rows 10000 100000 --max-lag 250
+"""
+
+import argparse
+import time
+import numpy as np
+import pandas as pd
+
+GRADES = ("super", "premium", "g_force_regular", "regular")
+DRIVERS = ("oil_price", "currency_rate")
+DEFAULT_MAX_LAG = 60
+
+
+def xcorr(x, y, max_lag=DEFAULT_MAX_LAG):
+    """
+    Pearson correlation of x shifted by L rows with y, for L in
+    -max_lag..max_lag; equal to y.corr(x.shift(L)) for each L. Positive L:
+    x leads y by L rows. Missing values on either side are skipped per pair.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    if len(x) != len(y):
+        raise ValueError(f"x has {len(x)} rows, y has {len(y)}.")
+    n = len(x)
+    max_lag = min(max_lag, n - 1)
+    lags = np.arange(-max_lag, max_lag + 1)
+
+    mx, my = np.isfinite(x), np.isfinite(y)
+    # Center and scale first, so the sums below do not cancel catastrophically
+    if mx.any():
+        x = (x - x[mx].mean()) / (x[mx].std() or 1.0)
+    if my.any():
+        y = (y - y[my].mean()) / (y[my].std() or 1.0)
+    x = np.where(mx, x, 0.0)
+    y = np.where(my, y, 0.0)
+    mx, my = mx.astype(float), my.astype(float)
+
+    # c(a, b)[L] = sum_t a[t - L] * b[t]; zero-padded to avoid wrap-around,
+    # each input transformed once and reused across the six sums
+    nfft = 1 << int(np.ceil(np.log2(2 * n)))
+    pick = lags % nfft
+    fx = {k: np.conj(np.fft.rfft(v, nfft)) for k, v in (("m", mx), ("x", x), ("xx", x * x))}
+    fy = {k: np.fft.rfft(v, nfft) for k, v in (("m", my), ("y", y), ("yy", y * y))}
+
+    def c(a, b):
+        return np.fft.irfft(fx[a] * fy[b], nfft)[pick]
+
+    count = np.rint(c("m", "m"))
+    sx, sy = c("x", "m"), c("m", "y")
+    sxx, syy = c("xx", "m"), c("m", "yy")
+    sxy = c("x", "y")
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cov = sxy - sx * sy / count
+        var_x = sxx - sx ** 2 / count
+        var_y = syy - sy ** 2 / count
+        corr = cov / np.sqrt(var_x * var_y)
+    # Round-off can leave a tiny positive variance where the overlap is constant
+    tol = 1e-9 * np.maximum(count, 1)
+    corr[(count < 2) | (var_x <= tol) | (var_y <= tol)] = np.nan
+    return pd.Series(np.clip(corr, -1.0, 1.0), index=pd.Index(lags, name="lag"))
+
+
+def repeat_mask(series):
+    """True where a value is observed and differs from the previous row (False for forward-filled repeats)."""
+    series = pd.Series(series)
+    return series.notna() & series.ne(series.shift())
+
+
+def to_returns(series, observed=None):
+    """
+    Log returns between consecutive observed values, placed on the later
+    row; unobserved rows (observed False / NaN) become NaN.
+    """
+    series = pd.Series(series, dtype=float)
+    if observed is not None:
+        series = series.where(np.asarray(observed, dtype=bool))
+    previous = series.ffill().shift()
+    return np.log(series / previous).where(series.notna())
+
+
+def lag_table(features, drivers=DRIVERS, targets=GRADES, max_lag=DEFAULT_MAX_LAG,
+              kind="returns", drop_filled=True):
+    """
+    Cross-correlations of every driver with every target over -max_lag..max_lag.
+
+    features: gold.fuel_features columns in date order. kind: "returns"
+    (log returns) or "levels". drop_filled masks a driver's forward-filled
+    repeats. Returns a DataFrame indexed by lag with (driver, target) columns.
+    """
+    if kind not in ("returns", "levels"):
+        raise ValueError("kind must be 'returns' or 'levels'")
+    targets = [t for t in targets if t in features.columns]
+
+    def prepared(column, is_driver):
+        observed = repeat_mask(features[column]) if (is_driver and drop_filled) else None
+        if kind == "returns":
+            return to_returns(features[column], observed)
+        return features[column].where(observed) if observed is not None else features[column]
+
+    series = {}
+    for driver in drivers:
+        x = prepared(driver, True)
+        for target in targets:
+            series[(driver, target)] = xcorr(x, prepared(target, False), max_lag)
+    table = pd.DataFrame(series)
+    table.columns.names = ["driver", "target"]
+    return table
+
+
+def peak_lags(table, min_lag=0):
+    """Per (driver, target): the lag >= min_lag with the largest |correlation|, and that correlation."""
+    table = table.loc[table.index >= min_lag]
+    best = table.abs().idxmax()
+    rows = [(driver, target, lag, table.at[lag, (driver, target)])
+            for (driver, target), lag in best.items() if pd.notna(lag)]
+    return pd.DataFrame(rows, columns=["driver", "target", "lag", "corr"])
+
+
+# --- Benchmark ---
+def _loop_xcorr(x, y, max_lag):
+    """What analysis.py would do: one shift().corr() per lag."""
+    return pd.Series({lag: y.corr(x.shift(lag)) for lag in range(-max_lag, max_lag + 1)})
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark FFT cross-correlation against a shift().corr() loop.")
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--max-lag", type=int, default=250)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    for rows in args.rows:
+        oil = pd.Series(80 * np.exp(np.cumsum(rng.normal(0, 0.02, rows))))
+        # pump price follows Brent 7 rows later; holidays forward-filled in Brent
+        fuel = 0.5 + 0.02 * oil.shift(7) + rng.normal(0, 0.01, rows)
+        oil[rng.random(rows) < 0.03] = np.nan
+        oil = oil.ffill()
+        x = to_returns(oil, repeat_mask(oil))
+        y = to_returns(fuel)
+
+        start = time.perf_counter()
+        fast = xcorr(x, y, args.max_lag)
+        fast_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        slow = _loop_xcorr(x, y, args.max_lag)
+        slow_s = time.perf_counter() - start
+
+        diff = np.nanmax(np.abs(fast.to_numpy() - slow.to_numpy()))
+        print(f"{rows:>9,} rows, {2 * args.max_lag + 1} lags: FFT {fast_s * 1000:8.2f} ms, "
+              f"shift().corr() loop {slow_s * 1000:10.2f} ms ({slow_s / fast_s:,.0f}x), "
+              f"max abs diff {diff:.1e}, peak lag {fast.idxmax()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""
+- Batch model search over every fuel grade x lag set x feature combination
+- Each spec is an OLS of one grade on lagged Brent and/or GEL/USD columns,
+  fitted with NumPy least squares, scored in-sample (R2, adj. R2, AIC, BIC,
+  RMSE) and out-of-sample (RMSE/MAE on the last holdout share of dates)
+- Specs run on a process pool (feature_matrix.pool_map); the joined feature
+  matrix is placed once in shared memory and every worker maps it
+  read-only, so it is never pickled
+- All specs are fitted on the same rows (from the largest lag onwards), so
+  their metrics are comparable
+
+Run directly (reads gold.fuel_features, or a CSV export of it):
+    python model_search.py [--csv gold.csv] [--workers 4] [--top 20]
+"""
+
+import argparse
+import itertools
+import os
+import time
+import numpy as np
+import pandas as pd
+from feature_matrix import load_features, pool_map
+
+# --- CONFIG ---
+GRADES = ("super", "premium", "g_force_regular", "regular")
+FEATURES = ("oil_price", "currency_rate")
+# Lags in business days (rows of gold.fuel_features)
+LAG_SETS = ((0,), (5,), (10,), (20,), (0, 5), (0, 10), (0, 5, 10, 20))
+HOLDOUT_SHARE = 0.2
+DEFAULT_WORKERS = max(1, min(8, (os.cpu_count() or 2) - 1))
+
+
+def build_specs(grades=GRADES, features=FEATURES, lag_sets=LAG_SETS):
+    """Every grade x non-empty feature subset x lag set, as plain dicts."""
+    combos = [c for r in range(1, len(features) + 1) for c in itertools.combinations(features, r)]
+    return [{"grade": g, "features": c, "lags": lags}
+            for g, c, lags in itertools.product(grades, combos, lag_sets)]
+
+
+def _design(data, col, spec, start):
+    """Regressor matrix [1, x(t - lag) ...] and target for rows start.. of data."""
+    n = data.shape[0]
+    columns = [np.ones(n - start)]
+    names = ["const"]
+    for feature in spec["features"]:
+        for lag in spec["lags"]:
+            columns.append(data[start - lag:n - lag, col[feature]])
+            names.append(feature if lag == 0 else f"{feature}_lag{lag}")
+    return np.column_stack(columns), data[start:, col[spec["grade"]]], names
+
+
+def fit_spec(data, columns, spec, start, holdout_share=HOLDOUT_SHARE):
+    """Fit one spec on rows start.. and return its metrics row."""
+    col = {c: i for i, c in enumerate(columns)}
+    X, y, names = _design(data, col, spec, start)
+    ok = np.isfinite(y) & np.isfinite(X).all(axis=1)
+    X, y = X[ok], y[ok]
+    n, k = X.shape
+
+    row = {"grade": spec["grade"], "features": "+".join(spec["features"]),
+           "lags": ",".join(map(str, spec["lags"])), "nobs": n, "n_params": k}
+    if n <= k:
+        return row
+
+    beta, _, rank, _ = np.linalg.lstsq(X, y, rcond=None)
+    ssr = float(np.sum((y - X @ beta) ** 2))
+    tss = float(np.sum((y - y.mean()) ** 2))
+    llf = -n / 2 * (np.log(2 * np.pi) + np.log(ssr / n) + 1) if ssr > 0 else np.inf
+    row.update({
+        "r2": 1 - ssr / tss if tss > 0 else np.nan,
+        "adj_r2": 1 - (ssr / (n - rank)) / (tss / (n - 1)) if tss > 0 and n > rank else np.nan,
+        "aic": -2 * llf + 2 * rank,
+        "bic": -2 * llf + rank * np.log(n),
+        "rmse": np.sqrt(ssr / n),
+    })
+
+    # Out of sample: fit on the earlier dates, score on the last holdout_share of them
+    split = int(n * (1 - holdout_share))
+    if k < split < n:
+        beta_train = np.linalg.lstsq(X[:split], y[:split], rcond=None)[0]
+        err = y[split:] - X[split:] @ beta_train
+        row["test_rmse"] = float(np.sqrt(np.mean(err ** 2)))
+        row["test_mae"] = float(np.mean(np.abs(err)))
+    row["coefficients"] = dict(zip(names, np.round(beta, 6)))
+    return row
+
+
+def _fit_task(data, columns, task):
+    spec, start, holdout_share = task
+    return fit_spec(data, columns, spec, start, holdout_share)
+
+
+def search(features, specs=None, workers=DEFAULT_WORKERS, holdout_share=HOLDOUT_SHARE, sort_by="test_rmse"):
+    """
+    Fit every spec on the joined features (gold.fuel_features columns, in
+    date order) and return the leaderboard, best first by sort_by.
+    """
+    specs = build_specs() if specs is None else specs
+    columns = list(dict.fromkeys(
+        [s["grade"] for s in specs] + [f for s in specs for f in s["features"]]))
+    data = features[columns].to_numpy(dtype=np.float64)
+    start = max(max(s["lags"]) for s in specs)
+
+    if workers <= 1:
+        rows = [fit_spec(data, columns, s, start, holdout_share) for s in specs]
+    else:
+        tasks = [(s, start, holdout_share) for s in specs]
+        rows = pool_map(_fit_task, data, columns, tasks, workers,
+                        chunksize=max(1, len(tasks) // (workers * 4)))
+
+    board = pd.DataFrame(rows)
+    for metric in ("r2", "adj_r2", "aic", "bic", "rmse", "test_rmse", "test_mae"):
+        if metric not in board.columns:
+            board[metric] = np.nan
+    # Error metrics rank ascending, fit metrics (r2/adj_r2) descending
+    ascending = sort_by not in ("r2", "adj_r2")
+    board = board.sort_values([sort_by, "bic"], ascending=[ascending, True], na_position="last", kind="stable")
+    board.insert(0, "rank", range(1, len(board) + 1))
+    return board.reset_index(drop=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fit every grade x lag set x feature combination.")
+    parser.add_argument("--csv", help="gold feature CSV (default: read gold.fuel_features)")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    parser.add_argument("--sort-by", default="test_rmse",
+                        choices=["test_rmse", "test_mae", "rmse", "aic", "bic", "r2", "adj_r2"])
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--out", help="write the full leaderboard to this CSV")
+    args = parser.parse_args()
+
+    features = load_features(args.csv)
+    specs = build_specs()
+    start = time.perf_counter()
+    board = search(features, specs, workers=args.workers, sort_by=args.sort_by)
+    print(f"⏱ {len(specs)} models on {len(features):,} rows with {args.workers} workers "
+          f"in {time.perf_counter() - start:.2f}s")
+
+    shown = ["rank", "grade", "features", "lags", "nobs", "r2", "adj_r2", "bic", "rmse", "test_rmse", "test_mae"]
+    with pd.option_context("display.width", 160, "display.max_columns", 20):
+        print(board[[c for c in shown if c in board.columns]].head(args.top).round(4).to_string(index=False))
+    if args.out:
+        board.to_csv(args.out, index=False)
+        print(f"✅ Saved to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+"""
+- Historical backfill for NBG exchange rates over a date range
+- One request per date (?date=YYYY-MM-DD) from a thread pool, throttled by a
+  shared rate limiter
+- Raw JSON responses are cached on disk, one file per date, so re-runs and
+  reprocessing never hit the network for dates already fetched; dates that
+  failed (request error or unparseable payload) are not cached, so a re-run
+  retries them
+- MockNBGServer serves NBG-shaped JSON on localhost for offline runs
+"""
+
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import urlparse, parse_qs
+import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter
+from instrumentation import span
+
+# --- CONFIG ---
+NBG_URL = "https://nbg.gov.ge/gw/api/ct/monetarypolicy/currencies/en/json"
+CACHE_DIR = r"C:\Users\gpaghava\Desktop\Gulf fuel prices analysis\nbg_cache"
+DEFAULT_WORKERS = 4
+DEFAULT_RATE_LIMIT = 5  # requests per second
+
+
+# --- Cache ---
+class ResponseCache:
+    """Raw NBG JSON payloads on disk, one <YYYY-MM-DD>.json file per date."""
+
+    def __init__(self, cache_dir=CACHE_DIR):
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, day):
+        return os.path.join(self.cache_dir, f"{day:%Y-%m-%d}.json")
+
+    def get(self, day):
+        try:
+            with open(self._path(day), encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def put(self, day, payload):
+        # write-then-rename so a crash never leaves a truncated cache file
+        path = self._path(day)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(payload, f)
+        os.replace(tmp, path)
+
+    def drop(self, day):
+        try:
+            os.remove(self._path(day))
+        except FileNotFoundError:
+            pass
+
+
+# --- Rate limiting ---
+class RateLimiter:
+    """Space calls at least 1/rate seconds apart across all threads."""
+
+    def __init__(self, rate_per_sec):
+        self.interval = 1.0 / rate_per_sec if rate_per_sec else 0.0
+        self._lock = threading.Lock()
+        self._next = time.monotonic()
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next)
+            self._next = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+# --- Fetching ---
+def fetch_payload(session, url, day, limiter=None, timeout=15):
+    if limiter is not None:
+        limiter.wait()
+    with span("http_fetch", source="nbg") as s:
+        resp = session.get(url, params={"date": f"{day:%Y-%m-%d}"}, timeout=timeout)
+        resp.raise_for_status()
+        s.add(bytes=len(resp.content))
+    return resp.json()
+
+
+def backfill(start, end, parse_payload, url=NBG_URL, cache_dir=CACHE_DIR,
+             workers=DEFAULT_WORKERS, rate_limit=DEFAULT_RATE_LIMIT, session=None, verbose=True):
+    """
+    Return a DataFrame (Date, rate) for every calendar day in [start, end].
+
+    parse_payload(json) -> (datetime, rate) turns one NBG response into a row;
+    the date is the payload's own validity date, so days on which NBG
+    published nothing new collapse onto the previous rate's date.
+
+    A date whose request fails (after the adapter's retries) or whose
+    payload parse_payload rejects with ValueError is skipped, not fatal:
+    the failed dates are reported and listed in df.attrs["failed_dates"].
+    Neither is left in the cache, so re-running the range retries them.
+    """
+    days = pd.date_range(pd.Timestamp(start).normalize(), pd.Timestamp(end).normalize(), freq="D")
+    if days.empty:
+        return pd.DataFrame(columns=["Date", "rate"])
+    cache = ResponseCache(cache_dir)
+
+    payloads = {}
+    failed = {}
+    missing = []
+    for day in days:
+        cached = cache.get(day)
+        if cached is None:
+            missing.append(day)
+        else:
+            payloads[day] = cached
+
+    started = time.perf_counter()
+    if missing:
+        own_session = session is None
+        if own_session:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_maxsize=workers, max_retries=3)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+        limiter = RateLimiter(rate_limit)
+
+        def fetch_and_cache(day):
+            try:
+                payload = fetch_payload(session, url, day, limiter)
+            except (requests.RequestException, ValueError) as e:
+                return day, None, e
+            cache.put(day, payload)
+            return day, payload, None
+
+        try:
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                for day, payload, error in pool.map(fetch_and_cache, missing):
+                    if error is None:
+                        payloads[day] = payload
+                    else:
+                        failed[day] = f"request: {error}"
+        finally:
+            if own_session:
+                session.close()
+
+    rows = []
+    for day in days:
+        if day not in payloads:
+            continue
+        try:
+            date_dt, rate = parse_payload(payloads[day])
+        except ValueError as e:
+            failed[day] = f"parse: {e}"
+            cache.drop(day)
+            continue
+        rows.append((date_dt or day.to_pydatetime(), rate))
+    df = pd.DataFrame(rows, columns=["Date", "rate"])
+    df["Date"] = pd.to_datetime(df["Date"]).dt.normalize()
+    df = df.drop_duplicates("Date").sort_values("Date").reset_index(drop=True)
+    df.attrs["failed_dates"] = [f"{day:%Y-%m-%d}" for day in sorted(failed)]
+
+    if verbose:
+        elapsed = time.perf_counter() - started
+        print(f"Backfill {days[0]:%Y-%m-%d}..{days[-1]:%Y-%m-%d}: {len(days) - len(missing)} cached, "
+              f"{len(missing)} fetched in {elapsed:.2f}s -> {len(df)} distinct rates")
+        if failed:
+            print(f"⚠️ {len(failed)} dates failed and were skipped:")
+            for day in sorted(failed):
+                print(f"   {day:%Y-%m-%d}: {failed[day]}")
+    return df
+
+
+# --- Local mock of the NBG endpoint ---
+def mock_payload(day, rates):
+    """NBG-shaped JSON for one date; rates maps currency code -> rate."""
+    stamp = f"{day:%Y-%m-%d}T00:00:00.000Z"
+    return [{
+        "date": stamp,
+        "currencies": [
+            {"code": code, "quantity": 1, "rate": rate, "rateFormated": f"{rate:.4f}",
+             "date": stamp, "validFromDate": stamp}
+            for code, rate in rates.items()
+        ],
+    }]
+
+
+class MockNBGServer:
+    """
+    Context manager serving mock_payload(date, rates_for(date)) for
+    GET ...?date=YYYY-MM-DD on a free localhost port. .url works as backfill()'s url.
+    A date for which rates_for returns None gets a 503, as during an outage.
+    """
+
+    def __init__(self, rates_for):
+        self.rates_for = rates_for
+        self.requests = 0
+        self._server = None
+
+    def __enter__(self):
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                query = parse_qs(urlparse(self.path).query)
+                day = pd.Timestamp(query.get("date", [pd.Timestamp.today().date().isoformat()])[0])
+                mock.requests += 1
+                rates = mock.rates_for(day)
+                if rates is None:
+                    self.send_error(503)
+                    return
+                body = json.dumps(mock_payload(day, rates)).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = HTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    @property
+    def url(self):
+        host, port = self._server.server_address
+        return f"http://{host}:{port}/gw/api/ct/monetarypolicy/currencies/en/json"
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
@@ -0,0 +1,90 @@
+"""
+- Single-pass extraction of several currencies from one NBG JSON payload
+- The JSON tree is walked once, collecting raw fields for every requested
+  code; dates and rates are then parsed column-wise (each distinct date
+  string is parsed only once)
+- Result is columnar: one row per (date, code) with rate and quantity
+"""
+
+import pandas as pd
+
+DEFAULT_CODES = ("USD", "EUR", "TRY", "RUB")
+COLUMNS = ["date", "code", "rate", "quantity"]
+
+
+def _parse_dates(raw):
+    """Vectorized ISO date parsing; each distinct string is parsed once."""
+    codes, uniques = pd.factorize(pd.Series(raw, dtype=object))
+    cleaned = pd.Index(uniques, dtype=object).str.strip().str.replace(r"Z$", "", regex=True)
+    parsed = pd.to_datetime(cleaned, format="ISO8601", errors="coerce")
+    # factorize marks missing values with -1, which take() turns into NaT
+    return pd.Series(parsed.take(codes, allow_fill=True, fill_value=pd.NaT))
+
+
+def extract_rates(json_data, codes=DEFAULT_CODES):
+    """
+    Return a DataFrame (date, code, rate, quantity) for every entry of the
+    requested currency codes, in payload order.
+
+    The date is the currency's validFromDate, else its date, else the
+    enclosing container's validFromDate/date. The rate falls back to
+    rateFormated when rate is missing or not numeric; entries whose
+    rateFormated is present but unparseable are dropped, as before.
+    """
+    if not isinstance(json_data, list):
+        raise ValueError("Unexpected JSON structure: expected a list at top level.")
+
+    wanted = set(codes)
+    out_code, out_date, out_rate, out_rf, out_qty = [], [], [], [], []
+
+    def collect(cur, fallback_date):
+        out_code.append(cur["code"])
+        out_date.append(cur.get("validFromDate") or cur.get("date") or fallback_date)
+        out_rate.append(cur.get("rate"))
+        out_rf.append(cur.get("rateFormated"))
+        out_qty.append(cur.get("quantity", 1))
+
+    for entry in json_data:
+        if not isinstance(entry, dict):
+            continue
+        currencies = entry.get("currencies")
+        if isinstance(currencies, list):
+            # container-level validFromDate wins over date when the key exists
+            container_date = entry.get("validFromDate") if "validFromDate" in entry else entry.get("date")
+            for cur in currencies:
+                if isinstance(cur, dict) and cur.get("code") in wanted:
+                    collect(cur, container_date)
+        elif entry.get("code") in wanted:
+            collect(entry, None)
+
+    df = pd.DataFrame({"code": out_code})
+    if df.empty:
+        return pd.DataFrame(columns=COLUMNS)
+
+    df["date"] = _parse_dates([d if isinstance(d, str) else None for d in out_date])
+
+    rate = pd.to_numeric(pd.Series(out_rate, dtype=object), errors="coerce")
+    rf_raw = pd.Series(out_rf, dtype=object)
+    rf = pd.to_numeric(rf_raw.astype(str).str.replace(",", "", regex=False), errors="coerce")
+    rf_present = rf_raw.notna() & (rf_raw.astype(str) != "")
+    df["rate"] = rate.fillna(rf.where(rf_present))
+    df["quantity"] = pd.to_numeric(pd.Series(out_qty, dtype=object), errors="coerce").fillna(1)
+
+    # old behaviour: a non-numeric rate with an unparseable rateFormated skipped the entry
+    bad = rate.isna() & rf_present & rf.isna()
+    return df.loc[~bad, COLUMNS].reset_index(drop=True)
+
+
+def latest_rates_wide(json_data, codes=DEFAULT_CODES):
+    """
+    One row (Date + one column per code) with the most recent rate of each
+    currency, converted to GEL per single unit (rate / quantity).
+    """
+    rates = extract_rates(json_data, codes).dropna(subset=["date", "rate"])
+    if rates.empty:
+        return pd.DataFrame(columns=["Date", *codes])
+    latest = rates.sort_values("date", kind="stable").groupby("code").tail(1).set_index("code")
+    row = {"Date": latest["date"].max().normalize()}
+    for code in codes:
+        row[code] = float(latest.at[code, "rate"] / latest.at[code, "quantity"]) if code in latest.index else None
+    return pd.DataFrame([row])
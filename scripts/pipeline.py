@@ -0,0 +1,231 @@
+"""
+- Runs the whole refresh as a dependency graph instead of script by script:
+    gulf ──────────────┐
+    brent_scrape ─> brent_load ─> gold ─> analysis
+    nbg ───────────────┘
+- Stages whose inputs are ready run concurrently on a thread pool (they
+  are network/database bound), so the sources load side by side and the
+  total is close to the slowest source, not the sum
+- A failing stage is retried with exponential backoff; if it still fails
+  only the stages that depend on it are skipped, the rest keep going
+- Stages borrow connections from db.py's pool (SQL Server, or a local
+  SQLite / DuckDB warehouse with FUEL_DB_BACKEND)
+- Prints each stage's status, attempts and duration as it finishes, then the
+  wall time against the summed stage time
+- With FUEL_METRICS_DIR set, every stage attempt and the steps inside it are
+  recorded as instrumentation spans (see instrumentation.py)
+
+Run directly:
+    python pipeline.py [--only gulf nbg] [--skip analysis] [--retries 2] [--workers 4]
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from instrumentation import span
+
+# --- CONFIG ---
+DEFAULT_RETRIES = 2
+DEFAULT_BACKOFF = 5.0  # seconds before the first retry, doubled after each
+DEFAULT_WORKERS = 4
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+class Stage:
+    def __init__(self, name, func, deps=(), retries=DEFAULT_RETRIES, backoff=DEFAULT_BACKOFF):
+        self.name = name
+        self.func = func
+        self.deps = tuple(deps)
+        self.retries = retries
+        self.backoff = backoff
+
+
+class Pipeline:
+    """A set of named stages (callables without arguments) and their dependencies."""
+
+    def __init__(self):
+        self.stages = {}
+
+    def add(self, name, func, deps=(), retries=DEFAULT_RETRIES, backoff=DEFAULT_BACKOFF):
+        if name in self.stages:
+            raise ValueError(f"Stage {name!r} is already defined.")
+        self.stages[name] = Stage(name, func, deps, retries, backoff)
+        return self
+
+    def order(self):
+        """Stage names in dependency order; raises ValueError on unknown deps or a cycle."""
+        for stage in self.stages.values():
+            unknown = [d for d in stage.deps if d not in self.stages]
+            if unknown:
+                raise ValueError(f"Stage {stage.name!r} depends on unknown stage(s) {unknown}.")
+        ordered, state = [], {}
+
+        def visit(name, path):
+            if state.get(name) == "done":
+                return
+            if state.get(name) == "visiting":
+                raise ValueError(f"Dependency cycle: {' -> '.join(path + [name])}")
+            state[name] = "visiting"
+            for dep in self.stages[name].deps:
+                visit(dep, path + [name])
+            state[name] = "done"
+            ordered.append(name)
+
+        for name in self.stages:
+            visit(name, [])
+        return ordered
+
+    def _attempt(self, stage, started):
+        """Run one stage with retries (in a worker thread) and return its result row."""
+        result = {"stage": stage.name, "attempts": 0, "start": time.perf_counter() - started}
+        for attempt in range(1, stage.retries + 2):
+            result["attempts"] = attempt
+            t = time.perf_counter()
+            try:
+                with span("pipeline_stage", stage=stage.name):
+                    stage.func()
+                result.update(status="ok", seconds=time.perf_counter() - t, error=None)
+                break
+            except Exception as e:
+                result.update(status="failed", seconds=time.perf_counter() - t, error=f"{type(e).__name__}: {e}")
+                if attempt <= stage.retries:
+                    delay = stage.backoff * 2 ** (attempt - 1)
+                    print(f"⚠️ {stage.name} failed (attempt {attempt}): {e} — retrying in {delay:.0f}s")
+                    time.sleep(delay)
+        result["end"] = time.perf_counter() - started
+        return result
+
+    def run(self, only=None, skip=(), max_workers=DEFAULT_WORKERS, verbose=True):
+        """
+        Run the selected stages (all by default, minus skip) as soon as their
+        dependencies have succeeded. Dependencies outside the selection are
+        treated as already done. Returns {name: result row}.
+        """
+        selected = [n for n in self.order() if (only is None or n in only) and n not in skip]
+        results = {}
+        pending = list(selected)
+        running = {}
+        started = time.perf_counter()
+
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            while pending or running:
+                for name in list(pending):
+                    deps = [d for d in self.stages[name].deps if d in selected]
+                    statuses = [results[d]["status"] if d in results else None for d in deps]
+                    if any(s in ("failed", "skipped") for s in statuses):
+                        blocked = [d for d, s in zip(deps, statuses) if s in ("failed", "skipped")]
+                        results[name] = {"stage": name, "status": "skipped", "attempts": 0, "seconds": 0.0,
+                                         "error": f"dependency failed: {', '.join(blocked)}"}
+                        pending.remove(name)
+                        if verbose:
+                            print(f"⏭ {name} skipped ({results[name]['error']})")
+                    elif all(s == "ok" for s in statuses):
+                        if verbose:
+                            print(f"▶ {name} started")
+                        running[pool.submit(self._attempt, self.stages[name], started)] = name
+                        pending.remove(name)
+
+                if not running:
+                    continue
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    name = running.pop(future)
+                    results[name] = future.result()
+                    if verbose:
+                        r = results[name]
+                        line = f"{name} {r['status']} in {r['seconds']:.1f}s"
+                        if r["attempts"] > 1:
+                            line += f" after {r['attempts']} attempts"
+                        if r["error"]:
+                            line += f": {r['error']}"
+                        print(("✅ " if r["status"] == "ok" else "❌ ") + line)
+
+        wall = time.perf_counter() - started
+        if verbose:
+            busy = sum(r["seconds"] for r in results.values())
+            print(f"⏱ Pipeline finished in {wall:.1f}s (stages took {busy:.1f}s in total)")
+        return results
+
+
+# --- Stages of the fuel-price pipeline ---
+def _with_connection(work):
+    import db
+    # Borrowed from db.py's pool, so stages running one after another reuse connections
+    conn = db.connect()
+    try:
+        return work(conn)
+    finally:
+        conn.close()
+
+
+def run_gulf():
+    import gulf_scraper_to_sql
+    _with_connection(gulf_scraper_to_sql.run)
+
+
+def run_brent_scrape():
+    import brent_oil_scraper
+    brent_oil_scraper.main(export_csv=True)
+
+
+def run_brent_load():
+    import brent_oli_sql_exec_stored_procedure as brent_load
+    timings = _with_connection(brent_load.load_brent_oil_incremental)
+    print(f"Merged {timings['rows']} new Brent rows (after {timings['watermark_date']}).")
+
+
+def run_nbg():
+    import gel_to_usd_rates_to_sql
+    _with_connection(lambda conn: gel_to_usd_rates_to_sql.update_rates(conn=conn))
+
+
+def run_gold():
+    import gold_features
+    _with_connection(gold_features.refresh_gold_features)
+
+
+def run_analysis():
+    # analysis.py is a notebook-style script; run it in its own process with a
+    # non-interactive matplotlib backend so nothing tries to open a window.
+    # The gold stage has just refreshed gold.fuel_features, so analysis.py does not
+    env = dict(os.environ, MPLBACKEND="Agg")
+    subprocess.run([sys.executable, os.path.join(SCRIPTS_DIR, "analysis.py"), "--no-refresh"],
+                   cwd=SCRIPTS_DIR, env=env, check=True)
+
+
+def build_pipeline(retries=DEFAULT_RETRIES, backoff=DEFAULT_BACKOFF):
+    pipeline = Pipeline()
+    pipeline.add("gulf", run_gulf, retries=retries, backoff=backoff)
+    pipeline.add("brent_scrape", run_brent_scrape, retries=retries, backoff=backoff)
+    pipeline.add("brent_load", run_brent_load, deps=["brent_scrape"], retries=retries, backoff=backoff)
+    pipeline.add("nbg", run_nbg, retries=retries, backoff=backoff)
+    pipeline.add("gold", run_gold, deps=["gulf", "brent_load", "nbg"], retries=retries, backoff=backoff)
+    # analysis.py only needs the gold table; a crash there is not transient, so no retries
+    pipeline.add("analysis", run_analysis, deps=["gold"], retries=0)
+    return pipeline
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the ingestion stages and the analysis as a dependency graph.")
+    parser.add_argument("--only", nargs="+", help="run only these stages (their other dependencies count as done)")
+    parser.add_argument("--skip", nargs="+", default=[], help="leave these stages out")
+    parser.add_argument("--retries", type=int, default=DEFAULT_RETRIES)
+    parser.add_argument("--backoff", type=float, default=DEFAULT_BACKOFF)
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    args = parser.parse_args()
+
+    pipeline = build_pipeline(args.retries, args.backoff)
+    unknown = [n for n in (args.only or []) + args.skip if n not in pipeline.stages]
+    if unknown:
+        parser.error(f"unknown stage(s) {unknown}; choose from {list(pipeline.stages)}")
+
+    results = pipeline.run(only=args.only, skip=args.skip, max_workers=args.workers)
+    if any(r["status"] != "ok" for r in results.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,320 @@
+"""
+- Headless chart report for the fuel-price features: every chart is drawn
+  with matplotlib's Agg backend and written to PNG and/or SVG, plus an
+  index.html (and index.json) listing them; nothing needs a display
+- Line charts are downsampled with LTTB (largest triangle three buckets):
+  at most MAX_LINE_POINTS points per series, chosen so peaks and troughs
+  survive, instead of one vertex per row
+- Scatter charts are drawn as a 2-D density grid (rows per bin), with the
+  regression's mean fitted price per bin on top, instead of one marker per
+  row; the drawing cost depends on the bins, not the rows
+- Charts render on a process pool (feature_matrix.pool_map, as in
+  model_search.py): the numeric columns are placed once in shared memory
+  and every worker maps them read-only, so the data is never pickled per chart
+- default_charts() builds the analysis.py chart set for whatever columns
+  are there: all grades over time, Brent, GEL/USD, and every grade against
+  Brent and against GEL/USD
+
+Run directly (reads gold.fuel_features, or a CSV export of it):
+    python report_charts.py [--csv gold.csv] [--out-dir report] [--formats png svg] [--workers 4]
+    python report_charts.py --benchmark --rows 10000 100000 1000000 10000000
+"""
+
+import argparse
+import html
+import json
+import os
+import time
+import numpy as np
+import pandas as pd
+from chunked_analytics import NormalEquations
+from feature_matrix import DATE_COLUMN, load_features, pool_map
+
+# --- CONFIG ---
+GRADES = ("super", "premium", "g_force_regular", "regular")
+REGRESSORS = ("oil_price", "currency_rate")
+LABELS = {
+    "feature_date": "Date",
+    "super": "Super",
+    "premium": "Premium",
+    "g_force_regular": "G-Force Regular",
+    "regular": "Regular",
+    "oil_price": "Oil Price",
+    "currency_rate": "Currency Rate",
+}
+MAX_LINE_POINTS = 2_000
+DENSITY_BINS = 200
+DEFAULT_FORMATS = ("png",)
+DEFAULT_WORKERS = max(1, min(8, (os.cpu_count() or 2) - 1))
+
+
+# --- Downsampling ---
+def lttb(x, y, threshold=MAX_LINE_POINTS):
+    """
+    Largest-triangle-three-buckets: indices of at most threshold points of
+    (x, y) that keep the shape of the line. x must be sorted.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    # Points 1..n-2 split into threshold-2 buckets; first and last points are always kept
+    edges = (np.arange(threshold - 1) * ((n - 2) / (threshold - 2))).astype(np.int64) + 1
+    edges[-1] = n - 1
+    # Mean point of every bucket (the "third" vertex for the bucket before it), from running sums
+    cx = np.concatenate([[0.0], np.cumsum(x)])
+    cy = np.concatenate([[0.0], np.cumsum(y)])
+    counts = np.diff(edges)
+    mean_x = np.append((cx[edges[1:]] - cx[edges[:-1]]) / counts, x[-1])
+    mean_y = np.append((cy[edges[1:]] - cy[edges[:-1]]) / counts, y[-1])
+
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        lo, hi = edges[i], edges[i + 1]
+        # Twice the triangle area between the last pick, each candidate and the next bucket's mean
+        area = np.abs((x[a] - mean_x[i + 1]) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (mean_y[i + 1] - y[a]))
+        a = lo + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
+
+
+def _bin_index(values, edges):
+    """Bin of every value on equal-width edges, by arithmetic rather than a search."""
+    bins = len(edges) - 1
+    width = (edges[-1] - edges[0]) or 1.0
+    index = ((values - edges[0]) * (bins / width)).astype(np.int64)
+    return np.clip(index, 0, bins - 1, out=index)
+
+
+def density_grid(x, y, bins=DENSITY_BINS):
+    """Row counts on a bins x bins grid over the data's range: (counts, x_edges, y_edges)."""
+    ok = np.isfinite(x) & np.isfinite(y)
+    if not ok.all():
+        x, y = x[ok], y[ok]
+    if not len(x):
+        return np.zeros((bins, bins)), np.linspace(0, 1, bins + 1), np.linspace(0, 1, bins + 1)
+    x_edges = np.linspace(x.min(), x.max(), bins + 1)
+    y_edges = np.linspace(y.min(), y.max(), bins + 1)
+    cells = _bin_index(x, x_edges) * bins + _bin_index(y, y_edges)
+    counts = np.bincount(cells, minlength=bins * bins).reshape(bins, bins)
+    return counts, x_edges, y_edges
+
+
+def binned_mean(x, values, x_edges):
+    """Mean of values per x bin (NaN for empty bins) and the bin centres."""
+    ok = np.isfinite(x) & np.isfinite(values)
+    if not ok.all():
+        x, values = x[ok], values[ok]
+    bins = _bin_index(x, x_edges)
+    counts = np.bincount(bins, minlength=len(x_edges) - 1)
+    sums = np.bincount(bins, weights=values, minlength=len(x_edges) - 1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return (x_edges[:-1] + x_edges[1:]) / 2, sums / counts
+
+
+# --- Chart set ---
+def default_charts(columns):
+    """The analysis.py charts for the columns present, as plain dicts."""
+    columns = set(columns)
+    grades = [g for g in GRADES if g in columns]
+    charts = []
+    if DATE_COLUMN in columns:
+        if grades:
+            charts.append({"name": "fuel_prices", "kind": "line", "title": "Fuel prices by grade",
+                           "x": DATE_COLUMN, "y": grades, "ylabel": "GEL per litre"})
+        for column, unit in [("oil_price", "USD per barrel"), ("currency_rate", "GEL per USD")]:
+            if column in columns:
+                charts.append({"name": column, "kind": "line", "title": LABELS[column],
+                               "x": DATE_COLUMN, "y": [column], "ylabel": unit})
+    regressors = [r for r in REGRESSORS if r in columns]
+    for grade in grades:
+        for regressor in regressors:
+            charts.append({"name": f"{grade}_vs_{regressor}", "kind": "density",
+                           "title": f"{LABELS[grade]} vs {LABELS[regressor]}",
+                           "x": regressor, "y": grade, "fit": regressors})
+    return charts
+
+
+def _fitted(data, col, grade, regressors):
+    """
+    Fitted values of an OLS of grade on a constant and the regressors, solved
+    with chunked_analytics.NormalEquations (NaN where a value is missing, or
+    all NaN if the fit cannot be solved).
+    """
+    x = data[:, [col[r] for r in regressors]]
+    ols = NormalEquations(regressors)
+    ols.update(x, data[:, col[grade]])
+    try:
+        beta = ols.solve()["params"].to_numpy()
+    except (ValueError, np.linalg.LinAlgError):
+        return np.full(data.shape[0], np.nan)
+    return beta[0] + x @ beta[1:]
+
+
+def render_chart(data, columns, chart, out_dir, formats=DEFAULT_FORMATS, max_points=MAX_LINE_POINTS,
+                 bins=DENSITY_BINS):
+    """Reduce and draw one chart from the column matrix; returns its index entry."""
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    from matplotlib.colors import LogNorm
+
+    col = {c: i for i, c in enumerate(columns)}
+    start = time.perf_counter()
+    fig, ax = plt.subplots(figsize=(10, 5) if chart["kind"] == "line" else (7, 5))
+    drawn = 0
+    if chart["kind"] == "line":
+        x = data[:, col[chart["x"]]]
+        for name in chart["y"]:
+            y = data[:, col[name]]
+            ok = np.isfinite(x) & np.isfinite(y)
+            xs, ys = x[ok], y[ok]
+            keep = lttb(xs, ys, max_points)
+            ax.plot(xs[keep], ys[keep], linewidth=1, label=LABELS.get(name, name))
+            drawn += len(keep)
+        if chart["x"] == DATE_COLUMN:
+            # Stored as days since 1970-01-01, matplotlib's own date unit
+            ax.xaxis_date()
+        if len(chart["y"]) > 1:
+            ax.legend()
+        ax.set_ylabel(chart.get("ylabel", ""))
+    else:
+        x, y = data[:, col[chart["x"]]], data[:, col[chart["y"]]]
+        counts, x_edges, y_edges = density_grid(x, y, bins)
+        counts = np.ma.masked_equal(counts, 0)
+        # One image for the whole grid; pcolormesh would build a path per cell
+        image = ax.imshow(counts.T, origin="lower", aspect="auto", interpolation="nearest", cmap="viridis",
+                          extent=(x_edges[0], x_edges[-1], y_edges[0], y_edges[-1]),
+                          norm=LogNorm(vmin=1, vmax=max(float(counts.max() or 1), 1.0)))
+        fig.colorbar(image, ax=ax, label="rows")
+        drawn = int(counts.count())
+        if chart.get("fit"):
+            centres, mean_fit = binned_mean(x, _fitted(data, col, chart["y"], chart["fit"]), x_edges)
+            ax.plot(centres, mean_fit, linewidth=2, color="tab:orange", label="mean fitted price")
+            ax.legend()
+        ax.set_ylabel(LABELS.get(chart["y"], chart["y"]))
+    ax.set_xlabel(LABELS.get(chart["x"], chart["x"]))
+    ax.set_title(chart.get("title", chart["name"]))
+    fig.tight_layout()
+    built = time.perf_counter()
+
+    files = []
+    for fmt in formats:
+        path = os.path.join(out_dir, f"{chart['name']}.{fmt}")
+        fig.savefig(path, dpi=110)
+        files.append(os.path.basename(path))
+    plt.close(fig)
+    end = time.perf_counter()
+    return {"name": chart["name"], "title": chart.get("title", chart["name"]), "kind": chart["kind"],
+            "files": files, "rows": int(data.shape[0]), "drawn": drawn,
+            "seconds": end - start, "draw_seconds": end - built}
+
+
+def _render_task(data, columns, task):
+    chart, out_dir, formats, max_points, bins = task
+    return render_chart(data, columns, chart, out_dir, formats, max_points, bins)
+
+
+def to_matrix(frame):
+    """Numeric columns of frame as float64, with DATE_COLUMN as days since 1970-01-01."""
+    frame = frame.copy()
+    if DATE_COLUMN in frame.columns:
+        dates = pd.to_datetime(frame[DATE_COLUMN]).to_numpy(dtype="datetime64[ns]")
+        frame[DATE_COLUMN] = dates.astype(np.int64) / 86_400e9
+    numeric = [c for c in frame.columns if pd.api.types.is_numeric_dtype(frame[c])]
+    return frame[numeric].to_numpy(dtype=np.float64), numeric
+
+
+def write_index(entries, out_dir):
+    """index.json with every chart's entry and an index.html showing them."""
+    with open(os.path.join(out_dir, "index.json"), "w", encoding="utf-8") as f:
+        json.dump(entries, f, indent=2)
+    items = []
+    for e in entries:
+        image = next((name for name in e["files"] if name.endswith((".png", ".svg"))), None)
+        links = " ".join(f'<a href="{html.escape(name)}">{html.escape(name)}</a>' for name in e["files"])
+        items.append(f"<section><h2>{html.escape(e['title'])}</h2>"
+                     + (f'<img src="{html.escape(image)}" alt="{html.escape(e["title"])}">' if image else "")
+                     + f"<p>{links} &middot; {e['rows']:,} rows, {e['drawn']:,} drawn</p></section>")
+    page = ("<!DOCTYPE html><html><head><meta charset=\"utf-8\"><title>Fuel price charts</title>"
+            "<style>body{font-family:sans-serif}img{max-width:100%}</style></head><body>"
+            "<h1>Fuel price charts</h1>" + "".join(items) + "</body></html>")
+    path = os.path.join(out_dir, "index.html")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(page)
+    return path
+
+
+def render_report(frame, out_dir="report", charts=None, formats=DEFAULT_FORMATS, workers=DEFAULT_WORKERS,
+                  max_points=MAX_LINE_POINTS, bins=DENSITY_BINS):
+    """
+    Render charts (default_charts(frame.columns) by default) from frame into
+    out_dir and write the index. Returns the index entries, in chart order.
+    """
+    charts = default_charts(frame.columns) if charts is None else charts
+    os.makedirs(out_dir, exist_ok=True)
+    data, columns = to_matrix(frame)
+
+    if workers <= 1 or len(charts) <= 1:
+        entries = [render_chart(data, columns, c, out_dir, formats, max_points, bins) for c in charts]
+    else:
+        tasks = [(c, out_dir, formats, max_points, bins) for c in charts]
+        entries = pool_map(_render_task, data, columns, tasks, workers)
+    write_index(entries, out_dir)
+    return entries
+
+
+# --- Benchmark ---
+def synthetic_features(rows, seed=0):
+    """gold.fuel_features-like rows; minutes apart so any row count fits the date range."""
+    rng = np.random.default_rng(seed)
+    oil = 80 + 20 * np.sin(np.arange(rows) / 5_000) + rng.normal(0, 1, rows)
+    rate = 2.7 + 0.2 * np.sin(np.arange(rows) / 20_000) + rng.normal(0, 0.01, rows)
+    df = pd.DataFrame({
+        DATE_COLUMN: pd.Timestamp("2021-10-01") + pd.to_timedelta(np.arange(rows), unit="min"),
+        "oil_price": oil,
+        "currency_rate": rate,
+    })
+    for i, grade in enumerate(GRADES):
+        df[grade] = 0.5 + 0.02 * oil + 0.2 * rate + 0.1 * i + rng.normal(0, 0.02, rows)
+    return df
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render the fuel-price charts headlessly.")
+    parser.add_argument("--csv", help="gold feature CSV (default: read gold.fuel_features)")
+    parser.add_argument("--out-dir", default="report")
+    parser.add_argument("--formats", nargs="+", default=list(DEFAULT_FORMATS), choices=["png", "svg"])
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    parser.add_argument("--max-points", type=int, default=MAX_LINE_POINTS)
+    parser.add_argument("--bins", type=int, default=DENSITY_BINS)
+    parser.add_argument("--benchmark", action="store_true", help="render synthetic data of --rows sizes instead")
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    args = parser.parse_args(argv)
+
+    if not args.benchmark:
+        start = time.perf_counter()
+        entries = render_report(load_features(args.csv), args.out_dir, formats=args.formats,
+                                workers=args.workers, max_points=args.max_points, bins=args.bins)
+        print(f"⏱ {len(entries)} charts in {time.perf_counter() - start:.2f}s")
+        print(f"✅ Index written to {os.path.join(args.out_dir, 'index.html')}")
+        return
+
+    for rows in args.rows:
+        df = synthetic_features(rows)
+        start = time.perf_counter()
+        entries = render_report(df, os.path.join(args.out_dir, f"bench_{rows}"), formats=args.formats,
+                                workers=args.workers, max_points=args.max_points, bins=args.bins)
+        elapsed = time.perf_counter() - start
+        drawn = sum(e["drawn"] for e in entries)
+        draw = sum(e["draw_seconds"] for e in entries)
+        reduce = sum(e["seconds"] for e in entries) - draw
+        # per-chart times are summed, so with several workers they can exceed the wall time
+        print(f"⏱ {rows:>11,} rows: {len(entries)} charts in {elapsed:6.2f}s "
+              f"(charts: reduce {reduce:5.2f}s, draw {draw:5.2f}s), {drawn:,} points/bins drawn")
+        del df
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+"""
+- Rolling and expanding-window OLS (time-varying coefficients) in NumPy
+- Cross-products of [X, y] are accumulated once as running sums, so the
+  sums for any window come from a couple of subtractions: cost does not
+  depend on the window size, and several window sizes share one pass
+- Running sums restart and re-center every block of rows, so windows deep
+  into a long series stay as precise as the first ones
+- Per window: coefficients, R-squared, RMSE and nobs; matches sm.OLS fitted
+  on the same rows (rows with a missing value are dropped, as missing='drop')
+- Windows where X is rank-deficient have no unique coefficients; there the
+  minimum-norm slopes are returned (fitted values, R2 and RMSE still match)
+
+Run directly to benchmark against refitting sm.OLS on every window:
+    python rolling_ols.py --rows 5000 --window 250
+"""
+
+import argparse
+import time
+import numpy as np
+import pandas as pd
+
+# Eigenvalues of the scaled X'X below RCOND * largest are treated as zero
+RCOND = 1e-10
+
+
+def _scaled(y, X):
+    """[X, y] divided by each column's standard deviation; rows with a missing value zeroed."""
+    valid = np.isfinite(y) & np.isfinite(X).all(axis=1)
+    if not valid.any():
+        raise ValueError("No rows without missing values.")
+    Z = np.column_stack([X, y])
+    scale = Z[valid].std(axis=0)
+    scale[scale == 0] = 1.0
+    Z = Z / scale
+    Z[~valid] = 0.0
+    return Z, valid, scale
+
+
+def _block_sums(Z, valid, block):
+    """
+    Rows are cut into blocks of `block` rows. Within each block b, rows are
+    centered on the block's mean c[b], and Q[b, j] holds the sums over its
+    first j rows: count, sum of (z - c[b]) and sum of (z - c[b])(z - c[b])'.
+    Centering locally keeps the sums small, so windows anywhere in a long
+    series are as precise as at its start.
+    """
+    n, k = Z.shape
+    n_blocks = -(-n // block)
+    pad = n_blocks * block - n
+    Zb = np.vstack([Z, np.zeros((pad, k))]).reshape(n_blocks, block, k)
+    vb = np.concatenate([valid, np.zeros(pad, dtype=bool)]).reshape(n_blocks, block)
+
+    counts = vb.sum(axis=1)
+    centers = Zb.sum(axis=1) / np.maximum(counts, 1)[:, None]
+    D = np.where(vb[:, :, None], Zb - centers[:, None, :], 0.0)
+
+    Qn = np.zeros((n_blocks, block + 1))
+    Qs = np.zeros((n_blocks, block + 1, k))
+    Qm = np.zeros((n_blocks, block + 1, k, k))
+    np.cumsum(vb, axis=1, out=Qn[:, 1:])
+    np.cumsum(D, axis=1, out=Qs[:, 1:])
+    np.cumsum(D[:, :, :, None] * D[:, :, None, :], axis=1, out=Qm[:, 1:])
+    return centers, Qn, Qs, Qm
+
+
+def _window_moments(sums, block, starts, add_constant):
+    """
+    Count, mean and cross-products of z over rows [starts[t], t] for every t,
+    centered on the window mean (with an intercept) or uncentered. A window
+    no longer than a block spans at most two blocks: the tail of block(start)
+    and the head of the next one.
+    """
+    centers, Qn, Qs, Qm = sums
+    n_blocks = len(centers)
+    ends = np.arange(1, len(starts) + 1)
+
+    b1 = starts // block
+    lo1 = starts - b1 * block
+    hi1 = np.minimum(ends - b1 * block, block)
+    b2 = np.minimum(b1 + 1, n_blocks - 1)
+    hi2 = np.where(b1 + 1 < n_blocks, np.maximum(ends - (b1 + 1) * block, 0), 0)
+
+    parts = [
+        (centers[b1], Qn[b1, hi1] - Qn[b1, lo1], Qs[b1, hi1] - Qs[b1, lo1], Qm[b1, hi1] - Qm[b1, lo1]),
+        (centers[b2], Qn[b2, hi2], Qs[b2, hi2], Qm[b2, hi2]),
+    ]
+    nobs = parts[0][1] + parts[1][1]
+    total = sum(p_n[:, None] * c + s for c, p_n, s, _ in parts)
+    mean = total / np.maximum(nobs, 1)[:, None]
+    target = mean if add_constant else np.zeros_like(mean)
+
+    C = np.zeros((len(starts),) + Qm.shape[2:])
+    for c, p_n, s, m in parts:
+        d = c - target
+        C += m + d[:, :, None] * s[:, None, :] + s[:, :, None] * d[:, None, :] \
+            + p_n[:, None, None] * d[:, :, None] * d[:, None, :]
+
+    # Rounding noise in C is about eps times the magnitude of what went into it
+    k = C.shape[1] - 1
+    noise = 1e3 * np.finfo(float).eps * sum(
+        Qm[b, block, k, k] + p_n * (c[:, k] - target[:, k]) ** 2 for b, (c, p_n, _, _) in zip((b1, b2), parts))
+    return nobs.astype(np.int64), mean, C, noise
+
+
+def _fit_windows(sums, block, starts, add_constant, scale, min_nobs):
+    """Solve every window [starts[t], t]; returns coefficients, r2, rmse, nobs in original units."""
+    nobs, mean, C, noise = _window_moments(sums, block, starts, add_constant)
+    k = C.shape[1] - 1
+    Cxx, Cxy, Cyy = C[:, :k, :k], C[:, :k, k], C[:, k, k]
+    beta = np.einsum("nij,nj->ni", np.linalg.pinv(Cxx, rcond=RCOND, hermitian=True), Cxy)
+
+    ssr = np.clip(Cyy - np.einsum("ni,ni->n", beta, Cxy), 0.0, None)
+    # Cyy is the centered total sum of squares with an intercept, uncentered without (as statsmodels)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        r2 = np.where(Cyy > noise, 1.0 - ssr / Cyy, np.nan)
+    rmse = scale[k] * np.sqrt(ssr / np.maximum(nobs, 1))
+
+    slopes = beta * scale[k] / scale[:k]
+    if add_constant:
+        means = mean * scale
+        const = means[:, k] - np.einsum("ni,ni->n", slopes, means[:, :k])
+        params = np.column_stack([const, slopes])
+    else:
+        params = slopes
+
+    enough = nobs >= min_nobs
+    params[~enough] = np.nan
+    r2[~enough] = np.nan
+    rmse[~enough] = np.nan
+    return params, r2, rmse, nobs
+
+
+def _as_arrays(y, X):
+    X = pd.DataFrame(X) if not isinstance(X, pd.DataFrame) else X
+    y = pd.Series(y, index=X.index) if not isinstance(y, pd.Series) else y
+    if len(y) != len(X):
+        raise ValueError(f"y has {len(y)} rows, X has {len(X)}.")
+    return y.to_numpy(dtype=float), X.to_numpy(dtype=float), X.index, [str(c) for c in X.columns]
+
+
+def _window_starts(n, window):
+    ends = np.arange(1, n + 1)
+    if window is None:
+        return np.zeros(n, dtype=np.int64)
+    if window < 1:
+        raise ValueError("window must be >= 1 (or None for an expanding window).")
+    return np.maximum(ends - window, 0)
+
+
+def rolling_ols_windows(y, X, windows, min_nobs=None, add_constant=True):
+    """
+    rolling_ols() for several window sizes at once; all rolling windows share
+    one pass of block sums. Returns {window: DataFrame}; None in windows = expanding.
+    """
+    y_arr, X_arr, index, names = _as_arrays(y, X)
+    n = len(y_arr)
+    Z, valid, scale = _scaled(y_arr, X_arr)
+    columns = (["const"] if add_constant else []) + names
+    need = len(columns) + 1 if min_nobs is None else min_nobs
+
+    # Blocks as long as the longest window, so every window spans at most two;
+    # an expanding window uses a single block
+    rolling = [w for w in windows if w is not None]
+    blocks = {None: max(n, 1)}
+    if rolling:
+        blocks.update(dict.fromkeys(rolling, min(max(rolling), max(n, 1))))
+    cached = {}
+
+    results = {}
+    for window in windows:
+        block = blocks[window]
+        if block not in cached:
+            cached[block] = _block_sums(Z, valid, block)
+        starts = _window_starts(n, window)
+        params, r2, rmse, nobs = _fit_windows(cached[block], block, starts, add_constant, scale, need)
+        if window is not None:
+            # Rolling windows only start once a full window of rows has been seen
+            partial = np.arange(n) + 1 < window
+            params[partial], r2[partial], rmse[partial] = np.nan, np.nan, np.nan
+        out = pd.DataFrame(params, index=index, columns=columns)
+        out["r2"] = r2
+        out["rmse"] = rmse
+        out["nobs"] = nobs
+        results[window] = out
+    return results
+
+
+def rolling_ols(y, X, window=None, min_nobs=None, add_constant=True):
+    """
+    OLS of y on X over a trailing window of `window` rows ending at each row
+    (window=None: an expanding window from the first row).
+
+    Returns a DataFrame on X's index: one column per coefficient ('const'
+    first when add_constant), then r2, rmse (sqrt(SSR / nobs), as
+    mean_squared_error) and nobs. Rows are NaN until a full window is
+    available, or while it has fewer than min_nobs complete rows
+    (default: number of coefficients + 1).
+    """
+    return rolling_ols_windows(y, X, [window], min_nobs=min_nobs, add_constant=add_constant)[window]
+
+
+# --- Benchmark ---
+def _synthetic(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    oil = 80 + np.cumsum(rng.normal(0, 1, rows))
+    rate = 2.7 + np.cumsum(rng.normal(0, 0.005, rows))
+    # pass-through drifts over time, which is what the rolling fit should pick up
+    beta = np.linspace(0.01, 0.03, rows)
+    fuel = 0.5 + beta * oil + 0.2 * rate + rng.normal(0, 0.02, rows)
+    return pd.Series(fuel, name="Fuel_price"), pd.DataFrame({"Oil_price": oil, "Currency_rate": rate})
+
+
+def main():
+    import statsmodels.api as sm
+
+    parser = argparse.ArgumentParser(description="Benchmark rolling_ols against refitting sm.OLS per window.")
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--window", type=int, default=250)
+    parser.add_argument("--check", type=int, default=1000, help="windows refitted with sm.OLS")
+    args = parser.parse_args()
+
+    y, X = _synthetic(args.rows)
+    start = time.perf_counter()
+    fast = rolling_ols(y, X, window=args.window)
+    fast_s = time.perf_counter() - start
+
+    Xc = sm.add_constant(X)
+    ends = np.linspace(args.window - 1, args.rows - 1, min(args.check, args.rows - args.window + 1)).astype(int)
+    worst = 0.0
+    start = time.perf_counter()
+    for end in ends:
+        rows = slice(end - args.window + 1, end + 1)
+        fit = sm.OLS(y.iloc[rows], Xc.iloc[rows]).fit()
+        got = fast.iloc[end]
+        worst = max(worst,
+                    np.max(np.abs(got[fit.params.index].to_numpy() - fit.params.to_numpy())),
+                    abs(got["r2"] - fit.rsquared),
+                    abs(got["rmse"] - np.sqrt(fit.ssr / fit.nobs)))
+    slow_s = (time.perf_counter() - start) / len(ends) * (args.rows - args.window + 1)
+
+    print(f"{args.rows:,} rows, window {args.window}: prefix sums {fast_s * 1000:8.1f} ms, "
+          f"sm.OLS per window ~{slow_s * 1000:10.1f} ms ({slow_s / fast_s:,.0f}x), "
+          f"max abs diff over {len(ends)} windows: {worst:.2e}")
+
+    start = time.perf_counter()
+    windows = [None, 20, 60, 250, 1000]
+    rolling_ols_windows(y, X, windows)
+    print(f"{len(windows)} window sizes in one pass: {(time.perf_counter() - start) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
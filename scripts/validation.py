@@ -0,0 +1,322 @@
+"""
+- Declarative, vectorized checks for every ingested frame, run right after
+  parsing / normalizing and before anything reaches the store or bronze
+- RULES describes each dataset: date column, numeric columns, which are
+  required, value ranges and day-over-day jump thresholds
+- One columnar pass sets a bit per failed check for every row:
+    schema          a rule column is missing (raises: the whole batch is wrong)
+    bad_date        date present in the source but unparseable
+    missing_date    no date
+    not_numeric     value present in the source but unparseable (what
+                    errors="coerce" used to turn into NaN silently)
+    missing_value   required value is empty
+    out_of_range    value outside the dataset's plausible range
+    duplicate_date  date already seen earlier in the batch (first one kept)
+    out_of_order    date breaks the order the source is expected to be in
+    jump            value moved more than the threshold against the previous
+                    date and the next date moved away again: a spike. A move
+                    the next date holds (within the threshold) is a real
+                    level change and passes
+    jump_pending    the same move on the newest date, with nothing after it
+                    yet: held back until a later batch shows whether the new
+                    level holds (the loaders re-read it on their next run)
+- Failing rows go to bronze.quarantine (dataset, date, reasons, the row as
+  JSON) instead of being loaded; the rest continue unchanged. A row already
+  quarantined (same dataset and JSON) is not added again, so re-validating
+  history (rebuilds, re-read pending rows) does not pile up duplicates
+
+Run directly to benchmark the checks on synthetic Brent rows:
+    python validation.py --rows 1000000 10000000
+"""
+
+import argparse
+import time
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from date_parsing import parse_date_column
+
+# --- CONFIG ---
+QUARANTINE_TABLE = "bronze.quarantine"
+QUARANTINE_COLUMNS = ["dataset", "row_date", "reason", "payload", "quarantined_at"]
+
+GULF_GRADES = ["Super", "Premium", "G-Force Regular", "Regular"]
+RULES = {
+    # Crawled Gulf pages (gulf_crawler.crawl), GEL per litre
+    "gulf": {
+        "date_column": "Date",
+        "numeric": GULF_GRADES,
+        "required": GULF_GRADES,
+        "ranges": {grade: (0.5, 10.0) for grade in GULF_GRADES},
+        "max_jump": {grade: 0.25 for grade in GULF_GRADES},
+    },
+    # investing.com Brent history after normalize_dataframe, USD per barrel
+    "brent_oil": {
+        "date_column": "Date",
+        "numeric": ["Price", "Open", "High", "Low", "Change %"],
+        "required": ["Price", "Open", "High", "Low"],
+        "ranges": {**{col: (1.0, 300.0) for col in ["Price", "Open", "High", "Low"]}, "Change %": (-60.0, 60.0)},
+        # Brent fell 24% in a day twice in 2020
+        "max_jump": {"Price": 0.35},
+    },
+    # NBG GEL per USD, as kept in the store / Excel
+    "currency_rates": {
+        "date_column": "Date",
+        "numeric": ["rate"],
+        "required": ["rate"],
+        "ranges": {"rate": (0.5, 10.0)},
+        "max_jump": {"rate": 0.15},
+    },
+}
+
+CHECKS = ("bad_date", "missing_date", "not_numeric", "missing_value", "out_of_range",
+          "duplicate_date", "out_of_order", "jump", "jump_pending")
+BIT = {check: i for i, check in enumerate(CHECKS)}
+
+
+def _present(series):
+    """True where the source had something (not null, not blank / 'nan' / 'None')."""
+    series = pd.Series(series)
+    if series.dtype != object and not pd.api.types.is_string_dtype(series):
+        return series.notna().to_numpy()
+    text = series.astype(str).str.strip()
+    return (series.notna() & ~text.isin(["", "nan", "None", "NaN", "NaT"])).to_numpy()
+
+
+def _chronological(d, nat, order):
+    """
+    Row positions in date order, earlier rows first among equal dates.
+    Positional (no sort) when the batch already is in the given order.
+    """
+    n = len(d)
+    if order is not None and not nat.any():
+        if order == "ascending" and (d[1:] >= d[:-1]).all():
+            return np.arange(n)
+        if order == "descending" and (d[1:] <= d[:-1]).all():
+            # reversed, then each run of equal dates back in row order
+            positions = np.arange(n)[::-1].copy()
+            ties = np.flatnonzero(d[1:] == d[:-1])
+            if len(ties):
+                positions = np.lexsort((np.arange(n), d.view("i8")))
+            return positions
+    return np.argsort(d, kind="stable")
+
+
+def _jumps(values, positions, threshold):
+    """
+    (spike, pending): rows whose value moved more than threshold (relative)
+    against the previous date and that the next date does not hold, and
+    such moves with no next value to tell yet.
+    """
+    x = values[positions]
+    prev = np.roll(x, 1)
+    prev2 = np.roll(x, 2)
+    following = np.roll(x, -1)
+    prev[:1] = np.nan
+    prev2[:2] = np.nan
+    following[-1:] = np.nan
+    with np.errstate(divide="ignore", invalid="ignore"):
+        moved = np.abs(x / prev - 1) > threshold
+        holds = np.abs(following / x - 1) <= threshold
+        back = np.abs(x / prev2 - 1) <= threshold
+    unknown = np.isnan(following)
+    # Coming back to the level before a spike is not a move of its own
+    moved &= ~(np.roll(moved & ~holds & ~unknown, 1) & back)
+    spike = np.zeros(len(values), dtype=bool)
+    pending = np.zeros(len(values), dtype=bool)
+    spike[positions] = moved & ~holds & ~unknown
+    pending[positions] = moved & unknown
+    return spike, pending
+
+
+def validate(df, dataset, raw=None, order=None):
+    """
+    Check df against RULES[dataset] and return (valid, rejected).
+
+    raw: the same rows before normalizing (aligned by position), so values
+    the normalizer coerced to NaN are reported as unparseable rather than
+    missing. Object-typed numeric columns are parsed here the same way.
+    order: "ascending" / "descending" if the source guarantees a date order
+    (checked as out_of_order), else None. valid keeps df's index and has the
+    numeric columns as floats; rejected holds the incoming rows (from raw
+    when given) plus a "reason" column.
+    """
+    rules = RULES[dataset]
+    date_column = rules["date_column"]
+    missing = [c for c in [date_column, *rules["numeric"]] if c not in df.columns]
+    if missing:
+        raise ValueError(f"{dataset}: missing column(s) {missing}; got {list(df.columns)}.")
+
+    n = len(df)
+    flags = np.zeros(n, dtype=np.uint16)
+
+    def flag(check, mask):
+        flags[np.asarray(mask, dtype=bool)] |= np.uint16(1 << BIT[check])
+
+    source = raw if raw is not None else df
+    if not all(pd.api.types.is_numeric_dtype(df[c]) for c in rules["numeric"]):
+        df = df.copy()
+    dates = df[date_column]
+    if not pd.api.types.is_datetime64_any_dtype(dates):
+        dates = pd.to_datetime(dates, errors="coerce")
+    d = dates.to_numpy(dtype="datetime64[ns]")
+    nat = np.isnat(d)
+    source_dates = raw[date_column] if raw is not None else df[date_column]
+    unparseable = nat & _present(source_dates)
+    flag("bad_date", unparseable)
+    flag("missing_date", nat & ~unparseable)
+
+    values = {}
+    for col in rules["numeric"]:
+        s = df[col]
+        bad = np.zeros(n, dtype=bool)
+        if not pd.api.types.is_numeric_dtype(s):
+            parsed = pd.to_numeric(s.astype(str).str.replace(",", "", regex=False), errors="coerce")
+            bad |= parsed.isna().to_numpy() & _present(s)
+            df[col] = s = parsed.where(pd.Series(_present(s), index=s.index))
+        v = s.to_numpy(dtype=float, na_value=np.nan)
+        if raw is not None:
+            bad |= np.isnan(v) & _present(raw[col])
+        flag("not_numeric", bad)
+        if col in rules["required"]:
+            flag("missing_value", np.isnan(v) & ~bad)
+        if col in rules["ranges"]:
+            low, high = rules["ranges"][col]
+            flag("out_of_range", (v < low) | (v > high))
+        values[col] = v
+
+    if order is not None and n > 1:
+        step = d[1:] > d[:-1] if order == "descending" else d[1:] < d[:-1]
+        flag("out_of_order", np.concatenate([[False], step & ~nat[1:] & ~nat[:-1]]))
+
+    # Sorting (skipped for an already ordered batch) finds duplicates without hashing
+    positions = _chronological(d, nat, order)
+    ordered = d[positions]
+    repeat = np.concatenate([[False], (ordered[1:] == ordered[:-1]) & ~np.isnat(ordered[1:])])
+    duplicate = np.zeros(n, dtype=bool)
+    duplicate[positions[repeat]] = True
+    flag("duplicate_date", duplicate)
+
+    if rules["max_jump"] and n > 2:
+        for col, threshold in rules["max_jump"].items():
+            spike, pending = _jumps(values[col], positions, threshold)
+            flag("jump", spike)
+            flag("jump_pending", pending)
+
+    bad = flags != 0
+    if not bad.any():
+        return df, df.iloc[:0].assign(reason=pd.Series(dtype=object))
+    # Rejected rows keep the values as they came in, so the quarantine shows what was wrong
+    rejected = source[bad].copy()
+    codes, uniques = pd.factorize(flags[bad])
+    names = np.array([";".join(c for c in CHECKS if u & (1 << BIT[c])) for u in uniques], dtype=object)
+    rejected["reason"] = names[codes]
+    return df[~bad], rejected
+
+
+def summarize(rejected):
+    """'out_of_range=2, jump=1' for a rejected frame."""
+    counts = rejected["reason"].str.split(";").explode().value_counts()
+    return ", ".join(f"{reason}={count}" for reason, count in counts.items())
+
+
+def _quarantined_payloads(conn, dataset, row_dates):
+    """payload of every bronze.quarantine row of dataset, within row_dates' range when all are known."""
+    import db
+
+    sql = f"SELECT payload FROM {QUARANTINE_TABLE} WHERE dataset = ?"
+    params = [dataset]
+    if row_dates.notna().all():
+        sql += " AND row_date BETWEEN ? AND ?"
+        params += [row_dates.min(), row_dates.max()]
+    return db.read_sql(conn, sql, params)["payload"]
+
+
+def quarantine(rejected, conn, dataset):
+    """
+    Append rejected rows to bronze.quarantine in one transaction, skipping
+    rows already there; returns the number of rows added.
+    """
+    from bulk_loader import bulk_load
+
+    if rejected.empty:
+        return 0
+    date_column = RULES[dataset]["date_column"]
+    payload = rejected.drop(columns="reason").to_json(
+        orient="records", lines=True, date_format="iso", default_handler=str).splitlines()
+    rows = pd.DataFrame({
+        "dataset": dataset,
+        "row_date": parse_date_column(rejected[date_column]).dt.date.to_numpy(),
+        "reason": rejected["reason"].to_numpy(),
+        "payload": payload,
+        "quarantined_at": datetime.now().replace(microsecond=0),
+    })
+    rows = rows[~rows["payload"].isin(_quarantined_payloads(conn, dataset, rows["row_date"]))]
+    if rows.empty:
+        return 0
+    bulk_load(rows, conn, QUARANTINE_TABLE, QUARANTINE_COLUMNS, verbose=False)
+    return len(rows)
+
+
+def validate_and_quarantine(df, dataset, conn=None, raw=None, order=None, verbose=True):
+    """
+    validate(), quarantine the failures and return only the valid rows.
+    Without conn a pooled db.connect() connection is used, only if needed.
+    """
+    valid, rejected = validate(df, dataset, raw=raw, order=order)
+    if rejected.empty:
+        return valid
+    if conn is not None:
+        added = quarantine(rejected, conn, dataset)
+    else:
+        import db
+
+        with db.connect() as own_conn:
+            added = quarantine(rejected, own_conn, dataset)
+    if verbose:
+        print(f"⚠️ Rejected {len(rejected)} of {len(df)} {dataset} rows ({summarize(rejected)}), "
+              f"{added} new in {QUARANTINE_TABLE}")
+    return valid
+
+
+# --- Benchmark ---
+def _synthetic_brent(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    # Stays within the plausible range however many rows are asked for
+    price = 80 + 30 * np.sin(np.arange(rows) / 400) + rng.normal(0, 0.5, rows)
+    df = pd.DataFrame({
+        # newest first, like the scraped table; minutes so 10M rows fit pandas' date range
+        "Date": pd.Timestamp("2025-11-14") - pd.to_timedelta(np.arange(rows), unit="min"),
+        "Price": price,
+        "Open": price * (1 + rng.normal(0, 0.005, rows)),
+        "High": price * 1.01,
+        "Low": price * 0.99,
+        "Vol.": "123.45K",
+        "Change %": rng.normal(0, 2, rows),
+    })
+    # A few bad rows of every kind
+    bad = rng.choice(rows, size=max(rows // 100_000, 8), replace=False)
+    df.loc[bad[0::4], "Price"] = np.nan
+    df.loc[bad[1::4], "Price"] *= 3
+    df.loc[bad[2::4], "Open"] = -1.0
+    df.loc[bad[3::4], "Date"] = df["Date"].iloc[0]
+    return df
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the vectorized validation checks.")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000_000])
+    args = parser.parse_args()
+
+    for rows in args.rows:
+        df = _synthetic_brent(rows)
+        start = time.perf_counter()
+        valid, rejected = validate(df, "brent_oil", order="descending")
+        elapsed = time.perf_counter() - start
+        print(f"{rows:>11,} rows: {elapsed:6.3f}s ({rows / elapsed:,.0f} rows/sec), "
+              f"rejected {len(rejected):,} ({summarize(rejected) if len(rejected) else 'none'})")
+        del df, valid, rejected
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+import os
+import sys
+import threading
+import time
+
+import pandas as pd
+import pytest
+import requests
+
+# The scripts import each other by module name, as when run from scripts/
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts"))
+
+
+def _gulf_page(rows):
+    body = "".join(f"<tr><td>{day:%Y-%m-%d}</td>" + f"<td>{price:.2f}</td>" * 4 + "</tr>"
+                   for day, price in rows)
+    return f"<html><body><table><tbody>{body}</tbody></table></body></html>"
+
+
+@pytest.fixture
+def gulf_pages(tmp_path):
+    """
+    write(dates, per_page=10, prices=None) saves one Gulf page per per_page
+    rows, newest first, into a directory for FixturePageServer; each date's
+    prices are 2.00 + 0.01 x its rank from the oldest (so they never depend on
+    the paging) unless prices ({date: price}) gives one.
+    """
+    directory = tmp_path / "pages"
+
+    def write(dates, per_page=10, prices=None):
+        directory.mkdir(exist_ok=True)
+        for old in directory.glob("page_*.html"):
+            old.unlink()
+        prices = {pd.Timestamp(day): price for day, price in (prices or {}).items()}
+        ranked = [(day, prices.get(day, 2.0 + 0.01 * i))
+                  for i, day in enumerate(sorted(pd.to_datetime(dates)))][::-1]
+        for start in range(0, len(ranked), per_page):
+            page = start // per_page + 1
+            (directory / f"page_{page}.html").write_text(_gulf_page(ranked[start:start + per_page]))
+        return str(directory)
+    return write
+
+
+class RecordingSession(requests.Session):
+    """requests.Session that records the pages asked for and the most requests in flight at once."""
+
+    def __init__(self, delay=0.0):
+        super().__init__()
+        self.delay = delay
+        self.pages = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def get(self, url, **kwargs):
+        with self._lock:
+            self.pages.append(int(url.rsplit("=", 1)[1]))
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            time.sleep(self.delay)
+            return super().get(url, **kwargs)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+
+@pytest.fixture
+def recording_session():
+    sessions = []
+
+    def make(delay=0.0):
+        session = RecordingSession(delay)
+        sessions.append(session)
+        return session
+    yield make
+    for session in sessions:
+        session.close()
+
+
+@pytest.fixture
+def warehouse():
+    """An in-memory SQLite warehouse with the bronze and gold tables."""
+    import db
+
+    conn = db.local_connection("sqlite")
+    yield conn
+    conn.close()
@@ -0,0 +1,48 @@
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from forecasting import simulate
+
+PARAMS = pd.Series({"const": 0.5, "Oil_price": 0.01, "Currency_rate": 0.2})
+
+
+def history(oil, rate):
+    return pd.DataFrame({"Oil_price": oil, "Currency_rate": rate})
+
+
+def test_bands_match_the_exact_quantiles_of_the_paths():
+    # Flat history: every path stays at the last level, so only the residual noise spreads
+    flat = history([80.0] * 5, [2.7] * 5)
+    sd = 0.05
+    bands = simulate(flat, PARAMS, residual_sd=sd, horizon=3, n_paths=200_000,
+                     chunk_paths=7_000, seed=1)
+    mu = 0.5 + 0.01 * 80 + 0.2 * 2.7
+    for q in (0.05, 0.25, 0.5, 0.75, 0.95):
+        expected = mu + NormalDist().inv_cdf(q) * sd
+        assert bands[f"q{q * 100:g}"].to_numpy() == pytest.approx([expected] * 3, abs=0.03 * sd)
+    assert bands["mean"].to_numpy() == pytest.approx([mu] * 3, abs=0.01 * sd)
+
+
+def test_deterministic_paths_collapse_onto_one_price():
+    # One historical return only: every path applies it each step
+    trend = history([80.0, 84.0], [2.7, 2.7])
+    bands = simulate(trend, PARAMS, horizon=4, n_paths=10_000, chunk_paths=3_000, seed=0)
+    oil = 84.0 * 1.05 ** np.arange(1, 5)
+    expected = 0.5 + 0.01 * oil + 0.2 * 2.7
+    assert list(bands.index) == [1, 2, 3, 4]
+    for column in bands.columns:
+        assert bands[column].to_numpy() == pytest.approx(expected, rel=1e-5)
+
+
+def test_later_chunks_outside_the_first_range_are_still_counted():
+    sd = 0.05
+    flat = history([80.0] * 5, [2.7] * 5)
+    # A first chunk of 2 paths sets a narrow range; the rest spill into the end bins
+    bands = simulate(flat, PARAMS, residual_sd=sd, horizon=1, n_paths=20_001,
+                     chunk_paths=2, seed=3)
+    mu = 0.5 + 0.01 * 80 + 0.2 * 2.7
+    assert bands["q50"].iloc[0] == pytest.approx(mu, abs=0.05 * sd)
+    assert bands["mean"].iloc[0] == pytest.approx(mu, abs=0.05 * sd)
@@ -0,0 +1,108 @@
+import pandas as pd
+
+import db
+import gulf_scraper_to_sql
+from gulf_crawler import FixturePageServer, cache_frame, crawl
+
+WEEKLY = pd.date_range(end="2025-11-07", periods=30, freq="7D")
+
+
+def test_crawl_stops_at_the_page_reaching_the_watermark(gulf_pages, recording_session):
+    directory = gulf_pages(WEEKLY)
+    session = recording_session()
+    # WEEKLY[-15] is on page 2 (rows 11-20, newest first)
+    with FixturePageServer(directory) as server:
+        df = crawl(server.base_url, stop_date=WEEKLY[-15], max_workers=1, session=session, verbose=False)
+    assert session.pages == [1, 2]
+    assert len(df) == 20
+    assert df["Date"].min() <= WEEKLY[-15]
+
+
+def test_crawl_ignores_pages_of_a_wave_past_the_stop(gulf_pages, recording_session):
+    directory = gulf_pages(WEEKLY)
+    session = recording_session()
+    with FixturePageServer(directory) as server:
+        df = crawl(server.base_url, stop_date=WEEKLY[-5], max_workers=4, session=session, verbose=False)
+    assert sorted(session.pages) == [1, 2, 3, 4]
+    assert len(df) == 10
+
+
+def test_crawl_keeps_requests_in_flight_within_max_workers(gulf_pages, recording_session):
+    directory = gulf_pages(pd.date_range(end="2025-11-07", periods=120, freq="7D"))
+    session = recording_session(delay=0.05)
+    with FixturePageServer(directory) as server:
+        df = crawl(server.base_url, max_workers=3, session=session, verbose=False)
+    assert len(df) == 120
+    assert session.max_in_flight <= 3
+    # 12 pages of rows, the empty page 13 ends the crawl, and its wave also asked for 14 and 15
+    assert sorted(session.pages) == list(range(1, 16))
+
+
+def test_crawl_ends_at_the_first_empty_page(gulf_pages, recording_session):
+    directory = gulf_pages(WEEKLY)
+    session = recording_session()
+    with FixturePageServer(directory) as server:
+        df = crawl(server.base_url, max_workers=1, session=session, verbose=False)
+    assert session.pages == [1, 2, 3, 4]
+    assert list(df["Date"]) == sorted(WEEKLY, reverse=True)
+
+
+def test_unchanged_first_page_is_the_only_request(gulf_pages, recording_session):
+    directory = gulf_pages(WEEKLY)
+    cache = {}
+    with FixturePageServer(directory) as server:
+        crawl(server.base_url, stop_date=WEEKLY[-1], page_cache=cache, session=recording_session(),
+              verbose=False)
+        session = recording_session()
+        crawl(server.base_url, stop_date=WEEKLY[-1], page_cache=cache, session=session, verbose=False)
+    assert session.pages == [1]
+    assert len(cache_frame(cache)) == 30
+
+
+def test_new_price_shifting_rows_to_the_next_page_is_not_lost(gulf_pages, recording_session):
+    cache = {}
+    with FixturePageServer(gulf_pages(WEEKLY)) as server:
+        crawl(server.base_url, page_cache=cache, session=recording_session(), verbose=False)
+    # The new row pushes every page's oldest row onto the next page
+    dates = WEEKLY.append(pd.DatetimeIndex(["2025-11-14"]))
+    with FixturePageServer(gulf_pages(dates)) as server:
+        crawl(server.base_url, stop_date=WEEKLY[-1], page_cache=cache, session=recording_session(),
+              verbose=False)
+    assert list(cache_frame(cache)["Date"]) == sorted(dates, reverse=True)
+
+
+def test_incremental_load_after_a_page_shift_matches_a_full_rebuild(gulf_pages, warehouse, tmp_path):
+    state = str(tmp_path / "state.json")
+    with FixturePageServer(gulf_pages(WEEKLY)) as server:
+        gulf_scraper_to_sql.run(warehouse, url=server.base_url, state_path=state)
+    with FixturePageServer(gulf_pages(WEEKLY.append(pd.DatetimeIndex(["2025-11-14"])))) as server:
+        gulf_scraper_to_sql.run(warehouse, url=server.base_url, state_path=state)
+        incremental = db.read_sql(warehouse, "SELECT * FROM bronze.gulf ORDER BY sales_date")
+        assert gulf_scraper_to_sql.run(warehouse, full_rebuild=True, url=server.base_url, state_path=state) == 0
+    rebuilt = db.read_sql(warehouse, "SELECT * FROM bronze.gulf ORDER BY sales_date")
+    pd.testing.assert_frame_equal(incremental, rebuilt)
+
+
+def test_rerun_writes_only_the_rows_whose_price_changed(gulf_pages, warehouse, tmp_path):
+    state = str(tmp_path / "state.json")
+    with FixturePageServer(gulf_pages(WEEKLY)) as server:
+        gulf_scraper_to_sql.run(warehouse, url=server.base_url, state_path=state)
+    # A correction to one published price: the weekdays it covers are rewritten, nothing else
+    with FixturePageServer(gulf_pages(WEEKLY, prices={WEEKLY[-3]: 2.5})) as server:
+        assert gulf_scraper_to_sql.run(warehouse, url=server.base_url, state_path=state) == 5
+        assert gulf_scraper_to_sql.run(warehouse, url=server.base_url, state_path=state) == 0
+
+        # Rows missing from the table are the only ones a full rebuild writes back
+        cur = db.cursor(warehouse)
+        cur.execute("DELETE FROM bronze.gulf WHERE sales_date < '2025-06-01'")
+        missing = cur.rowcount
+        warehouse.commit()
+        assert missing > 0
+        assert gulf_scraper_to_sql.run(warehouse, full_rebuild=True, url=server.base_url, state_path=state) == missing
+
+
+def test_fetch_state_is_saved_into_a_missing_directory(tmp_path):
+    path = str(tmp_path / "store" / "nested" / "state.json")
+    state = {'pages': {1: {'hash': 'abc', 'rows': []}}, 'rows': {'2025-11-07': 1}, 'quarantined': []}
+    gulf_scraper_to_sql.save_fetch_state(state, path)
+    assert gulf_scraper_to_sql.load_fetch_state(path) == state
@@ -0,0 +1,82 @@
+import time
+
+import pandas as pd
+import pytest
+
+from gel_to_usd_rates_to_sql import usd_rate_from_payload
+from nbg_backfill import MockNBGServer, RateLimiter, backfill
+
+START, END = "2024-03-01", "2024-03-10"
+DAYS = pd.date_range(START, END)
+
+
+def rate_on(day):
+    return {"USD": round(2.6 + day.day / 1000, 4), "EUR": 2.9}
+
+
+def run(server, cache_dir, **kwargs):
+    kwargs.setdefault("rate_limit", None)
+    return backfill(START, END, usd_rate_from_payload, url=server.url, cache_dir=str(cache_dir),
+                    verbose=False, **kwargs)
+
+
+def test_backfill_returns_one_rate_per_day(tmp_path):
+    with MockNBGServer(rate_on) as server:
+        df = run(server, tmp_path)
+    assert list(df["Date"]) == list(DAYS)
+    assert list(df["rate"]) == [rate_on(day)["USD"] for day in DAYS]
+    assert df.attrs["failed_dates"] == []
+
+
+def test_rerun_reads_the_cache_and_gives_the_same_result(tmp_path):
+    with MockNBGServer(rate_on) as server:
+        first = run(server, tmp_path)
+        assert server.requests == len(DAYS)
+        second = run(server, tmp_path)
+        assert server.requests == len(DAYS)
+    pd.testing.assert_frame_equal(first, second)
+
+
+def test_only_dates_missing_from_the_cache_are_fetched(tmp_path):
+    with MockNBGServer(rate_on) as server:
+        backfill(START, "2024-03-04", usd_rate_from_payload, url=server.url, cache_dir=str(tmp_path),
+                 rate_limit=None, verbose=False)
+        assert server.requests == 4
+        run(server, tmp_path)
+        assert server.requests == len(DAYS)
+
+
+def test_rate_limit_spaces_requests(tmp_path):
+    with MockNBGServer(rate_on) as server:
+        start = time.perf_counter()
+        run(server, tmp_path, workers=4, rate_limit=20)
+        elapsed = time.perf_counter() - start
+    # 10 requests at most 20 per second: the last starts at least 9/20 s after the first
+    assert elapsed >= 0.45
+
+
+def test_rate_limiter_is_shared_between_calls():
+    limiter = RateLimiter(50)
+    start = time.perf_counter()
+    for _ in range(6):
+        limiter.wait()
+    assert time.perf_counter() - start == pytest.approx(0.1, abs=0.05)
+
+
+@pytest.mark.parametrize("bad", [None, {}], ids=["http_error", "unparseable_payload"])
+def test_failed_dates_are_skipped_then_retried(tmp_path, bad):
+    outage = {pd.Timestamp("2024-03-05")}
+    rates_for = lambda day: bad if day in outage else rate_on(day)
+    with MockNBGServer(rates_for) as server:
+        df = run(server, tmp_path)
+        assert df.attrs["failed_dates"] == ["2024-03-05"]
+        assert pd.Timestamp("2024-03-05") not in set(df["Date"])
+        assert len(df) == len(DAYS) - 1
+
+        outage.clear()
+        requests_before = server.requests
+        retried = run(server, tmp_path)
+        # only the failed date goes back to the server
+        assert server.requests == requests_before + 1
+    assert retried.attrs["failed_dates"] == []
+    assert list(retried["Date"]) == list(DAYS)
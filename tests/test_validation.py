@@ -0,0 +1,69 @@
+import pandas as pd
+import pytest
+
+import columnar_store
+import db
+import gel_to_usd_rates_to_sql as gel
+import gulf_scraper_to_sql
+from gulf_crawler import FixturePageServer
+from validation import validate
+
+DAYS = pd.date_range("2024-01-01", periods=6)
+
+
+def reasons(rates, order=None):
+    df = pd.DataFrame({"Date": DAYS[:len(rates)], "rate": rates})
+    if order == "descending":
+        df = df.iloc[::-1]
+    _, rejected = validate(df, "currency_rates", order=order)
+    return dict(zip(rejected["Date"].dt.strftime("%m-%d"), rejected["reason"]))
+
+
+@pytest.mark.parametrize("order", [None, "descending"])
+def test_lone_spike_is_rejected_once(order):
+    assert reasons([2.7, 2.7, 4.0, 2.7, 2.7], order) == {"01-03": "jump"}
+
+
+def test_move_the_next_date_holds_is_a_level_change():
+    assert reasons([2.7, 2.7, 3.2, 3.2, 3.25]) == {}
+
+
+def test_move_on_the_newest_date_waits_for_the_next_one():
+    assert reasons([2.7, 2.7, 2.7, 3.2]) == {"01-04": "jump_pending"}
+    assert reasons([2.7, 2.7, 2.7, 3.2, 3.21]) == {}
+    assert reasons([2.7, 2.7, 2.7, 3.2, 2.7]) == {"01-04": "jump"}
+
+
+def test_gulf_price_move_is_loaded_once_the_next_price_holds(gulf_pages, warehouse, tmp_path):
+    state = str(tmp_path / "state.json")
+    dates = pd.date_range(end="2025-11-07", periods=12, freq="7D")
+    # A 40% rise on the newest date
+    prices = {dates[-1]: 3.0}
+    with FixturePageServer(gulf_pages(dates, prices=prices)) as server:
+        gulf_scraper_to_sql.run(warehouse, url=server.base_url, state_path=state)
+    held = db.read_sql(warehouse, "SELECT reason FROM bronze.quarantine WHERE dataset = 'gulf'")
+    assert list(held["reason"]) == ["jump_pending"]
+
+    # The next price stays at the new level: the move was real
+    dates = dates.append(pd.DatetimeIndex(["2025-11-14"]))
+    prices[dates[-1]] = 3.01
+    with FixturePageServer(gulf_pages(dates, prices=prices)) as server:
+        gulf_scraper_to_sql.run(warehouse, url=server.base_url, state_path=state)
+    loaded = db.read_sql(warehouse, "SELECT sales_date, premium FROM bronze.gulf "
+                                    "WHERE sales_date BETWEEN '2025-11-07' AND '2025-11-13' ORDER BY sales_date")
+    assert list(loaded["premium"]) == [3.0] * 5
+
+
+def test_gel_rebuild_quarantines_each_bad_row_once(warehouse, tmp_path):
+    store = str(tmp_path / "rates")
+    rates = pd.DataFrame({"Date": DAYS, "rate": [2.7, 2.7, -1.0, 2.7, 2.71, 2.72]})
+    columnar_store.append(store, rates)
+    for _ in range(2):
+        assert gel.load_store_into_sql_server(store, full_rebuild=True, conn=warehouse) == 5
+    held = db.read_sql(warehouse, "SELECT row_date FROM bronze.quarantine WHERE dataset = 'currency_rates'")
+    assert len(held) == 1
+
+
+@pytest.mark.parametrize("full_rebuild", [False, True])
+def test_gel_empty_store_loads_nothing(warehouse, tmp_path, full_rebuild):
+    assert gel.load_store_into_sql_server(str(tmp_path / "empty"), full_rebuild=full_rebuild, conn=warehouse) == 0